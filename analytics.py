@@ -0,0 +1,213 @@
+"""
+Analisi vettoriale della libreria Spotify tramite colonne NumPy
+"""
+import numpy as np
+
+
+UNKNOWN_GENRE = 'Other'
+
+
+class LibraryColumns:
+    """
+    Rappresentazione colonnare dei brani salvati
+
+    Ogni attributo è un array NumPy con un elemento per brano; artisti e
+    generi sono codificati come interi che indicizzano artist_names/genre_names.
+    """
+    def __init__(self, track_ids, track_names, duration_ms, popularity, added_at,
+                 release_year, artist_codes, artist_ids, artist_names, genre_codes, genre_names):
+        self.track_ids = track_ids
+        self.track_names = track_names
+        self.duration_ms = duration_ms
+        self.popularity = popularity
+        self.added_at = added_at
+        self.release_year = release_year
+        self.artist_codes = artist_codes
+        self.artist_ids = artist_ids
+        self.artist_names = artist_names
+        self.genre_codes = genre_codes
+        self.genre_names = genre_names
+
+    def __len__(self):
+        return len(self.track_ids)
+
+    @classmethod
+    def from_saved_tracks(cls, tracks_items, artist_genres=None):
+        """
+        Converte gli items dei brani salvati in colonne NumPy
+
+        Args:
+            tracks_items: Lista di items dai brani salvati (con 'track' e 'added_at')
+            artist_genres: Dizionario {artist_id: macro-genere} (opzionale)
+
+        Returns:
+            LibraryColumns: Colonne della libreria
+        """
+        artist_genres = artist_genres or {}
+
+        track_ids = []
+        track_names = []
+        durations = []
+        popularity = []
+        added_at = []
+        release_dates = []
+        artist_ids = []
+        artist_names = {}
+
+        for item in tracks_items:
+            track = item.get('track')
+
+            if not track or not track.get('artists'):
+                continue
+
+            artist = track['artists'][0]
+            track_ids.append(track['id'])
+            track_names.append(track['name'])
+            durations.append(track.get('duration_ms') or 0)
+            popularity.append(track.get('popularity') or 0)
+            added_at.append(item['added_at'][:19])
+            release_dates.append(track.get('album', {}).get('release_date') or '')
+            artist_ids.append(artist['id'])
+            artist_names.setdefault(artist['id'], artist['name'])
+
+        release_year = np.array(
+            [int(date[:4]) if date[:4].isdigit() else 0 for date in release_dates],
+            dtype=np.int16
+        )
+
+        unique_artists, artist_codes = np.unique(np.array(artist_ids, dtype=object), return_inverse=True)
+
+        # Il genere dipende solo dall'artista: si calcola una volta per artista
+        # e si propaga ai brani con un'indicizzazione vettoriale
+        artist_genre_labels = np.array(
+            [artist_genres.get(artist_id, UNKNOWN_GENRE) for artist_id in unique_artists],
+            dtype=object
+        )
+        genre_names, artist_genre_codes = np.unique(artist_genre_labels, return_inverse=True)
+        genre_codes = artist_genre_codes[artist_codes] if len(artist_codes) else artist_codes
+
+        return cls(
+            track_ids=np.array(track_ids, dtype=object),
+            track_names=np.array(track_names, dtype=object),
+            duration_ms=np.array(durations, dtype=np.int64),
+            popularity=np.array(popularity, dtype=np.int16),
+            added_at=np.array(added_at, dtype='datetime64[s]'),
+            release_year=release_year,
+            artist_codes=artist_codes.astype(np.int32),
+            artist_ids=unique_artists,
+            artist_names=np.array([artist_names[a] for a in unique_artists], dtype=object),
+            genre_codes=genre_codes.astype(np.int32),
+            genre_names=genre_names
+        )
+
+
+def artist_macro_genres(client, tracks_items):
+    """
+    Calcola il macro-genere dell'artista principale di ogni brano
+
+    Gli artisti vengono caricati con richieste multi-ID tramite il client.
+
+    Args:
+        client: SpotifyClient
+        tracks_items: Lista di items dai brani salvati
+
+    Returns:
+        dict: Dizionario {artist_id: macro-genere}
+    """
+    return macro_genres_for_artists(client, [
+        item['track']['artists'][0]['id']
+        for item in tracks_items
+        if item.get('track') and item['track'].get('artists')
+    ])
+
+
+def macro_genres_for_artists(client, artist_ids):
+    """
+    Calcola il macro-genere di una lista di artisti
+
+    Args:
+        client: SpotifyClient
+        artist_ids: ID degli artisti (anche ripetuti)
+
+    Returns:
+        dict: Dizionario {artist_id: macro-genere}
+    """
+    artists = client.prefetch_artists(artist_ids)
+
+    artist_genres = {}
+
+    for artist_id, artist_info in artists.items():
+        if artist_info and artist_info.get('genres'):
+            artist_genres[artist_id] = client.simplify_genre(artist_info['genres'][0])
+        else:
+            artist_genres[artist_id] = UNKNOWN_GENRE
+
+    return artist_genres
+
+
+def summarize_library(columns, top_n=10):
+    """
+    Calcola in un solo passaggio le statistiche principali della libreria
+
+    Args:
+        columns: LibraryColumns
+        top_n: Numero di artisti da includere nella classifica
+
+    Returns:
+        dict: Statistiche (generi, aggiunte per mese, popolarità, top artisti, anni)
+    """
+    total = len(columns)
+
+    if total == 0:
+        return {'total_tracks': 0}
+
+    # Conteggi e durate per genere
+    n_genres = len(columns.genre_names)
+    genre_counts = np.bincount(columns.genre_codes, minlength=n_genres)
+    genre_durations = np.bincount(columns.genre_codes, weights=columns.duration_ms, minlength=n_genres)
+    genre_order = np.argsort(-genre_counts, kind='stable')
+
+    # Brani aggiunti per mese
+    months, month_counts = np.unique(columns.added_at.astype('datetime64[M]'), return_counts=True)
+
+    # Distribuzione della popolarità (fasce da 10)
+    popularity_hist, _ = np.histogram(columns.popularity, bins=10, range=(0, 100))
+    percentiles = np.percentile(columns.popularity, [25, 50, 75, 90])
+
+    # Artisti più presenti
+    artist_counts = np.bincount(columns.artist_codes, minlength=len(columns.artist_ids))
+    top_artists = np.argsort(-artist_counts, kind='stable')[:top_n]
+
+    # Anni di uscita (0 = sconosciuto)
+    known_years = columns.release_year[columns.release_year > 0]
+
+    return {
+        'total_tracks': total,
+        'total_duration_ms': int(columns.duration_ms.sum()),
+        'genres': [
+            {
+                'genre': str(columns.genre_names[code]),
+                'count': int(genre_counts[code]),
+                'duration_ms': int(genre_durations[code])
+            }
+            for code in genre_order
+        ],
+        'added_per_month': [
+            (str(month), int(count)) for month, count in zip(months, month_counts)
+        ],
+        'popularity': {
+            'mean': float(columns.popularity.mean()),
+            'histogram': [int(count) for count in popularity_hist],
+            'percentiles': {
+                p: float(value) for p, value in zip((25, 50, 75, 90), percentiles)
+            }
+        },
+        'top_artists': [
+            (str(columns.artist_names[code]), int(artist_counts[code])) for code in top_artists
+        ],
+        'release_years': {
+            'min': int(known_years.min()) if len(known_years) else None,
+            'max': int(known_years.max()) if len(known_years) else None,
+            'median': float(np.median(known_years)) if len(known_years) else None
+        }
+    }
@@ -0,0 +1,68 @@
+"""
+Cache delle informazioni sugli artisti condivisa tra client
+"""
+import threading
+
+
+class ArtistCache:
+    """
+    Cache thread-safe {artist_id: info artista}
+
+    Gli artisti si ripetono molto tra le librerie di utenti diversi,
+    quindi una sola cache evita di richiedere più volte gli stessi dati.
+    """
+    def __init__(self):
+        self.artists = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, artist_id):
+        """
+        Restituisce le info dell'artista se presenti in cache
+
+        Args:
+            artist_id: ID dell'artista
+
+        Returns:
+            dict: Info dell'artista, oppure None se non in cache
+        """
+        with self.lock:
+            artist_info = self.artists.get(artist_id)
+
+            if artist_info is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+            return artist_info
+
+    def put(self, artist_id, artist_info):
+        """
+        Salva le info di un artista in cache
+
+        Args:
+            artist_id: ID dell'artista
+            artist_info: Info complete dell'artista
+        """
+        with self.lock:
+            self.artists[artist_id] = artist_info
+
+    def __contains__(self, artist_id):
+        with self.lock:
+            return artist_id in self.artists
+
+    def __len__(self):
+        with self.lock:
+            return len(self.artists)
+
+    def hit_rate(self):
+        """
+        Calcola la percentuale di richieste servite dalla cache
+
+        Returns:
+            float: Hit rate tra 0 e 1
+        """
+        with self.lock:
+            total = self.hits + self.misses
+            return self.hits / total if total else 0.0
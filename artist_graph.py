@@ -0,0 +1,228 @@
+"""
+Esplorazione del grafo degli artisti correlati per creare playlist di scoperta
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class RelatedArtistCrawler:
+    """
+    Visita in ampiezza (BFS) il grafo degli artisti correlati
+
+    Partendo da alcuni artisti "seed" scende di max_depth livelli; a ogni
+    livello tiene solo i fanout[livello] correlati più popolari di ogni
+    artista. Le richieste di uno stesso livello sono eseguite in parallelo.
+    Gli archi vengono scritti su file man mano, una riga per artista:
+    "<artist_id>\\t<id_correlato> <id_correlato> ..."
+    """
+    def __init__(self, client, max_depth=2, fanout=(20, 10, 5), max_workers=8, edges_path=None):
+        """
+        Inizializza il crawler
+
+        Args:
+            client: SpotifyClient
+            max_depth: Numero di livelli da esplorare oltre ai seed
+            fanout: Numero massimo di correlati seguiti per artista, per livello
+            max_workers: Numero massimo di richieste contemporanee
+            edges_path: File in cui salvare la lista di adiacenza (opzionale)
+        """
+        self.client = client
+        self.max_depth = max_depth
+        self.fanout = fanout
+        self.max_workers = max_workers
+        self.edges_path = edges_path
+        self.depth = {}       # {artist_id: livello a cui è stato scoperto}
+        self.in_degree = {}   # {artist_id: numero di artisti visitati che lo indicano}
+        self.edge_count = 0
+
+    def _related(self, artist_id):
+        """
+        Restituisce i correlati di un artista (lista vuota in caso di errore)
+        """
+        try:
+            return self.client.get_related_artists(artist_id)
+        except Exception:
+            return []
+
+    def crawl(self, seed_ids):
+        """
+        Esegue la visita partendo dagli artisti seed
+
+        Args:
+            seed_ids: Lista di ID degli artisti di partenza
+
+        Returns:
+            dict: Dizionario {artist_id: livello} di tutti gli artisti scoperti
+        """
+        frontier = list(dict.fromkeys(seed_ids))
+        for artist_id in frontier:
+            self.depth[artist_id] = 0
+
+        edges_file = open(self.edges_path, 'w', encoding='utf-8') if self.edges_path else None
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for level in range(self.max_depth):
+                    fanout = self.fanout[min(level, len(self.fanout) - 1)]
+                    next_frontier = []
+
+                    for artist_id, related in zip(frontier, executor.map(self._related, frontier)):
+                        related_ids = [artist['id'] for artist in related]
+
+                        if edges_file and related_ids:
+                            edges_file.write(f"{artist_id}\t{' '.join(related_ids)}\n")
+                        self.edge_count += len(related_ids)
+
+                        for related_id in related_ids:
+                            self.in_degree[related_id] = self.in_degree.get(related_id, 0) + 1
+
+                        # Segue solo i correlati più popolari non ancora visitati
+                        candidates = sorted(related, key=lambda a: a.get('popularity', 0), reverse=True)
+                        for artist in candidates[:fanout]:
+                            if artist['id'] not in self.depth:
+                                self.depth[artist['id']] = level + 1
+                                next_frontier.append(artist['id'])
+
+                    print(f"  Livello {level + 1}: {len(next_frontier)} nuovi artisti")
+                    frontier = next_frontier
+
+                    if not frontier:
+                        break
+        finally:
+            if edges_file:
+                edges_file.close()
+
+        return self.depth
+
+    def rank(self, seed_ids, genre_weight=1.0, top_n=50):
+        """
+        Ordina gli artisti scoperti per connettività e affinità di genere con i seed
+
+        Args:
+            seed_ids: ID degli artisti seed (esclusi dalla classifica)
+            genre_weight: Peso dell'affinità di genere rispetto alla connettività
+            top_n: Numero di artisti da restituire
+
+        Returns:
+            list: Lista di tuple (artist_id, punteggio) in ordine decrescente
+        """
+        seeds = set(seed_ids)
+        seed_genres = set()
+        for artist_id in seeds:
+            artist_info = self.client.get_artist_info(artist_id)
+            if artist_info:
+                seed_genres.update(artist_info.get('genres', []))
+
+        candidates = [artist_id for artist_id in self.in_degree if artist_id not in seeds]
+        if not candidates:
+            return []
+
+        self.client.prefetch_artists(candidates)
+
+        in_degree = np.array([self.in_degree[artist_id] for artist_id in candidates], dtype=np.float64)
+        genre_overlap = np.zeros(len(candidates))
+
+        for i, artist_id in enumerate(candidates):
+            genres = (self.client.get_artist_info(artist_id) or {}).get('genres', [])
+            if genres:
+                genre_overlap[i] = len(seed_genres.intersection(genres)) / len(genres)
+
+        scores = in_degree / in_degree.max() + genre_weight * genre_overlap
+        order = np.argsort(-scores, kind='stable')[:top_n]
+
+        return [(candidates[i], float(scores[i])) for i in order]
+
+
+def load_adjacency(path):
+    """
+    Legge la lista di adiacenza scritta dal crawler
+
+    Args:
+        path: Percorso del file degli archi
+
+    Returns:
+        dict: Dizionario {artist_id: [id correlati]}
+    """
+    adjacency = {}
+
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            artist_id, _, related = line.rstrip('\n').partition('\t')
+            adjacency[artist_id] = related.split()
+
+    return adjacency
+
+
+def create_discovery_playlist(client, name="Discovery Mix", time_range='medium_term', seeds=10,
+                              max_depth=2, artists=30, tracks_per_artist=3, edges_path=None,
+                              make_public=False):
+    """
+    Crea una playlist di scoperta partendo dai propri top artisti
+
+    Args:
+        client: SpotifyClient
+        name: Nome della playlist
+        time_range: Periodo dei top artisti usati come seed
+        seeds: Numero di top artisti usati come seed
+        max_depth: Livelli di artisti correlati da esplorare
+        artists: Numero di artisti scoperti da includere
+        tracks_per_artist: Brani più popolari per ogni artista
+        edges_path: File in cui salvare il grafo (opzionale)
+        make_public: Se True, crea una playlist pubblica
+
+    Returns:
+        dict: Informazioni della playlist creata, con 'errors' (artist_id, errore) degli artisti saltati
+    """
+    print("\nRecupero i tuoi top artisti...")
+    seed_ids = [artist['id'] for artist in client.get_top_artists(time_range=time_range, limit=seeds)]
+
+    if not seed_ids:
+        raise Exception("Nessun top artista trovato")
+
+    print(f"🔍 Esploro gli artisti correlati ({max_depth} livelli)...")
+    crawler = RelatedArtistCrawler(client, max_depth=max_depth, edges_path=edges_path)
+    crawler.crawl(seed_ids)
+    ranking = crawler.rank(seed_ids, top_n=artists)
+
+    if not ranking:
+        raise Exception("Nessun artista correlato trovato")
+
+    print(f"✓ {len(crawler.depth)} artisti scoperti, {crawler.edge_count} collegamenti")
+
+    # Un artista che non risponde (404, tentativi esauriti) viene saltato senza fermare gli altri
+    def top_tracks(artist_id):
+        try:
+            return artist_id, client.get_artist_top_tracks(artist_id), None
+        except Exception as e:
+            return artist_id, [], e
+
+    with ThreadPoolExecutor(max_workers=crawler.max_workers) as executor:
+        results = list(executor.map(top_tracks, [artist_id for artist_id, _ in ranking]))
+
+    errors = [(artist_id, error) for artist_id, _, error in results if error]
+    track_uris = [
+        track['uri']
+        for _, tracks, _ in results
+        for track in tracks[:tracks_per_artist]
+    ]
+
+    if not track_uris:
+        raise Exception(f"Nessun brano trovato per gli artisti scoperti ({len(errors)} non raggiungibili)")
+
+    description = f"{len(ranking)} artisti scoperti a partire dai miei preferiti - Creata automaticamente"
+    playlist = client.create_playlist(name, description, make_public)
+    client.add_tracks_to_playlist(playlist['id'], track_uris)
+
+    print(f"\n✓ Playlist completata!")
+    print(f"  {len(track_uris)} brani aggiunti")
+    print(f"  Apri su Spotify: {playlist['external_urls']['spotify']}")
+
+    if errors:
+        print(f"\n⚠️  Brani non recuperati per {len(errors)} artisti:")
+        for artist_id, error in errors:
+            artist_name = (client.get_artist_info(artist_id) or {}).get('name', artist_id)
+            print(f"  {artist_name}: {error}")
+
+    playlist['errors'] = errors
+    return playlist
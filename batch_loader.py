@@ -0,0 +1,146 @@
+"""
+Raggruppamento automatico delle richieste per singolo ID (stile DataLoader)
+"""
+import threading
+from concurrent.futures import Future
+
+
+class BatchLoader:
+    """
+    Raccoglie le richieste per singolo ID e le invia come un'unica
+    richiesta multi-ID (es. /artists?ids=...)
+
+    Le richieste arrivate entro una breve finestra di tempo, o da più
+    thread contemporaneamente, vengono unite in un solo lotto di al massimo
+    max_batch_size ID. Richieste identiche ancora in corso condividono lo
+    stesso risultato.
+    """
+    def __init__(self, batch_fn, max_batch_size, wait=0.005):
+        """
+        Inizializza il loader
+
+        Args:
+            batch_fn: Funzione che riceve una lista di ID e restituisce
+                      una lista di risultati nello stesso ordine
+            max_batch_size: Numero massimo di ID per richiesta
+            wait: Secondi di attesa per raccogliere altre richieste
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.wait = wait
+        self.pending = []   # ID in attesa di essere inviati
+        self.futures = {}   # {id: Future} per le richieste in attesa o in corso
+        self.timer = None
+        self.lock = threading.Lock()
+
+    def load(self, key):
+        """
+        Richiede un singolo ID
+
+        Args:
+            key: ID da caricare
+
+        Returns:
+            Future: Future che conterrà il risultato per l'ID
+
+        Raises:
+            ValueError: Se l'ID è None o vuoto
+        """
+        # Un ID vuoto finirebbe nella richiesta multi-ID e farebbe fallire tutto il lotto
+        if key is None or not str(key).strip():
+            raise ValueError(f"ID non valido: {key!r}")
+
+        batch = None
+
+        with self.lock:
+            future = self.futures.get(key)
+
+            if future is not None:
+                return future
+
+            future = Future()
+            self.futures[key] = future
+            self.pending.append(key)
+
+            if len(self.pending) >= self.max_batch_size:
+                # Lotto pieno: si invia subito senza aspettare il timer
+                batch = self.pending[:self.max_batch_size]
+                del self.pending[:self.max_batch_size]
+            elif self.timer is None:
+                self.timer = threading.Timer(self.wait, self._flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+        if batch:
+            self._run_batch(batch)
+
+        return future
+
+    def load_many(self, keys):
+        """
+        Richiede più ID
+
+        Args:
+            keys: Lista di ID
+
+        Returns:
+            list: Lista di Future nello stesso ordine degli ID
+        """
+        return [self.load(key) for key in keys]
+
+    def get(self, key):
+        """
+        Richiede un singolo ID e attende il risultato
+
+        Args:
+            key: ID da caricare
+
+        Returns:
+            Il risultato restituito da batch_fn per quell'ID
+        """
+        return self.load(key).result()
+
+    def _flush(self):
+        """
+        Invia tutte le richieste in attesa (chiamata dal timer)
+        """
+        with self.lock:
+            self.timer = None
+            keys = self.pending
+            self.pending = []
+
+        for i in range(0, len(keys), self.max_batch_size):
+            self._run_batch(keys[i:i + self.max_batch_size])
+
+    def _run_batch(self, keys):
+        """
+        Esegue una richiesta multi-ID e distribuisce i risultati
+
+        Args:
+            keys: Lista di ID (al massimo max_batch_size)
+        """
+        # Ogni Future viene sempre risolto, anche se batch_fn fallisce o
+        # restituisce un numero sbagliato di risultati
+        error = RuntimeError("Lotto interrotto prima di restituire i risultati")
+        futures = []
+
+        try:
+            results = list(self.batch_fn(keys))
+            if len(results) != len(keys):
+                raise ValueError(f"batch_fn ha restituito {len(results)} risultati per {len(keys)} ID")
+
+            with self.lock:
+                futures = [self.futures.pop(key) for key in keys]
+
+            for future, result in zip(futures, results):
+                future.set_result(result)
+        except Exception as e:
+            error = e
+        finally:
+            if not futures:
+                with self.lock:
+                    futures = [self.futures.pop(key) for key in keys]
+
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
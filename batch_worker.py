@@ -0,0 +1,185 @@
+"""
+Esecuzione batch della divisione per genere su più account Spotify
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from spotify_client import SpotifyClient
+from artist_cache import ArtistCache
+from rate_limiter import RateLimiter
+from profiling import FlowProfiler
+from config import CLIENT_ID, CLIENT_SECRET, REDIRECT_URI, RATE_LIMIT_PER_SECOND
+
+
+def load_user_tokens(path):
+    """
+    Carica i token utente salvati da un file JSON
+
+    Il file deve contenere un oggetto {nome_utente: access_token}
+
+    Args:
+        path: Percorso del file JSON
+
+    Returns:
+        dict: Dizionario {nome_utente: access_token}
+    """
+    with open(path, encoding='utf-8') as f:
+        user_tokens = json.load(f)
+
+    if not isinstance(user_tokens, dict):
+        raise ValueError("Il file dei token deve contenere un oggetto {utente: token}")
+
+    return user_tokens
+
+
+def process_user(user, user_token, artist_cache, rate_limiter,
+                 min_tracks=5, create_playlists=False, make_public=False):
+    """
+    Esegue la divisione per genere per un singolo utente
+
+    Args:
+        user: Nome dell'utente (solo per il report)
+        user_token: Access token dell'utente
+        artist_cache: ArtistCache condivisa tra tutti gli utenti
+        rate_limiter: RateLimiter condiviso tra tutti gli utenti
+        min_tracks: Numero minimo di brani per genere
+        create_playlists: Se True crea davvero le playlist, altrimenti calcola solo i gruppi
+        make_public: Se True, crea playlist pubbliche
+
+    Returns:
+        dict: Report con tempo impiegato, chiamate API e generi trovati
+    """
+    client = SpotifyClient(
+        CLIENT_ID,
+        CLIENT_SECRET,
+        redirect_uri=REDIRECT_URI,
+        user_access_token=user_token,
+        artist_cache=artist_cache,
+        rate_limiter=rate_limiter
+    )
+
+    report = {
+        'user': user,
+        'wall_time': 0.0,
+        'api_calls': 0,
+        'tracks': 0,
+        'genres': {},
+        'playlists': 0,
+        'error': None
+    }
+
+    start = time.perf_counter()
+
+    try:
+        if create_playlists:
+            playlists = client.create_playlists_by_genre(min_tracks, make_public, confirm=False)
+            report['playlists'] = len(playlists)
+        else:
+            saved_tracks = client.get_all_saved_tracks()
+            genre_groups = client.group_tracks_by_genre(saved_tracks, min_tracks)
+            report['tracks'] = len(saved_tracks)
+            report['genres'] = {genre: len(tracks) for genre, tracks in genre_groups.items()}
+    except Exception as e:
+        report['error'] = str(e)
+
+    report['wall_time'] = time.perf_counter() - start
+    report['api_calls'] = client.request_count
+
+    return report
+
+
+def run_batch(user_tokens, max_workers=4, requests_per_second=RATE_LIMIT_PER_SECOND,
+              min_tracks=5, create_playlists=False, make_public=False):
+    """
+    Processa le librerie di più utenti in parallelo
+
+    Tutti i worker condividono la stessa cache degli artisti e lo stesso
+    budget di richieste al secondo.
+
+    Args:
+        user_tokens: Dizionario {nome_utente: access_token}
+        max_workers: Numero di utenti processati contemporaneamente
+        requests_per_second: Budget globale di richieste al secondo
+        min_tracks: Numero minimo di brani per genere
+        create_playlists: Se True crea le playlist per ogni utente
+        make_public: Se True, crea playlist pubbliche
+
+    Returns:
+        list: Lista di report, uno per utente (nello stesso ordine di user_tokens)
+    """
+    artist_cache = ArtistCache()
+    rate_limiter = RateLimiter(requests_per_second)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                process_user, user, token, artist_cache, rate_limiter,
+                min_tracks, create_playlists, make_public
+            )
+            for user, token in user_tokens.items()
+        ]
+        reports = [future.result() for future in futures]
+
+    return reports
+
+
+def display_batch_report(reports):
+    """
+    Visualizza il report dell'esecuzione batch
+
+    Args:
+        reports: Lista di report restituita da run_batch
+    """
+    print(f"\n{'='*70}")
+    print(f"REPORT BATCH ({len(reports)} utenti)")
+    print(f"{'='*70}\n")
+
+    for report in reports:
+        status = f"❌ {report['error']}" if report['error'] else "✓"
+        print(f"• {report['user']} {status}")
+        print(f"   Tempo: {report['wall_time']:.1f}s")
+        print(f"   Chiamate API: {report['api_calls']}")
+
+        if report['tracks']:
+            print(f"   Brani: {report['tracks']} in {len(report['genres'])} generi")
+        if report['playlists']:
+            print(f"   Playlist create: {report['playlists']}")
+
+        print()
+
+    total_calls = sum(report['api_calls'] for report in reports)
+    print(f"Totale chiamate API: {total_calls}")
+
+
+def main():
+    """
+    Funzione principale
+    """
+    parser = argparse.ArgumentParser(description="Divisione per genere su più account")
+    parser.add_argument('tokens_file', help="File JSON {utente: access_token}")
+    parser.add_argument('--workers', type=int, default=4, help="Utenti processati in parallelo")
+    parser.add_argument('--rate', type=float, default=RATE_LIMIT_PER_SECOND,
+                        help="Richieste al secondo (budget globale)")
+    parser.add_argument('--min-tracks', type=int, default=5, help="Brani minimi per genere")
+    parser.add_argument('--create', action='store_true', help="Crea davvero le playlist")
+    parser.add_argument('--public', action='store_true', help="Crea playlist pubbliche")
+    args = parser.parse_args()
+
+    user_tokens = load_user_tokens(args.tokens_file)
+    reports = run_batch(
+        user_tokens,
+        max_workers=args.workers,
+        requests_per_second=args.rate,
+        min_tracks=args.min_tracks,
+        create_playlists=args.create,
+        make_public=args.public
+    )
+    display_batch_report(reports)
+
+
+if __name__ == "__main__":
+    # Con PROFILE=true nel .env il comando viene profilato
+    with FlowProfiler().profile('batch_worker'):
+        main()
@@ -1,6 +1,7 @@
 """
 File di configurazione per le credenziali Spotify
 """
+import json
 import os
 from dotenv import load_dotenv
 
@@ -29,6 +30,34 @@ REDIRECT_URI = 'http://127.0.0.1:8888/callback'
 DEFAULT_SEARCH_LIMIT = int(os.getenv('SEARCH_LIMIT', 10))
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
 
+# Budget globale di richieste al secondo verso l'API (usato dal RateLimiter)
+RATE_LIMIT_PER_SECOND = float(os.getenv('RATE_LIMIT_PER_SECOND', 10))
+
+# Cartella della cache su disco delle playlist (indicizzata per snapshot_id)
+PLAYLIST_CACHE_DIR = os.getenv('PLAYLIST_CACHE_DIR', '.cache/playlists')
+
+# Cache su disco delle audio features (divisione per mood)
+AUDIO_FEATURES_CACHE = os.getenv('AUDIO_FEATURES_CACHE', '.cache/audio_features.npz')
+
+# Snapshot colonnare locale della libreria (brani salvati e playlist)
+LIBRARY_SNAPSHOT_FILE = os.getenv('LIBRARY_SNAPSHOT_FILE', 'library.snap')
+
+# Cartella delle esportazioni della libreria (JSONL, CSV, M3U)
+EXPORT_DIR = os.getenv('EXPORT_DIR', 'export')
+
+# Stato del radar delle nuove uscite (ultima uscita vista per artista)
+RELEASE_RADAR_STATE = os.getenv('RELEASE_RADAR_STATE', '.cache/release_radar.json')
+
+# Registrazione del traffico HTTP e riproduzione senza rete ('original' o 'fast')
+HTTP_RECORD_FILE = os.getenv('HTTP_RECORD_FILE')
+HTTP_REPLAY_FILE = os.getenv('HTTP_REPLAY_FILE')
+HTTP_REPLAY_TIMING = os.getenv('HTTP_REPLAY_TIMING', 'fast')
+
+# Profilazione CPU/memoria dei flussi (report in PROFILE_DIR)
+PROFILE = os.getenv('PROFILE', 'False').lower() == 'true'
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_TOP_N = int(os.getenv('PROFILE_TOP_N', 25))
+
 # Mapping dei generi specifici a macro-categorie
 GENRE_MAPPING = {
     # Pop
@@ -219,3 +248,28 @@ GENRE_MAPPING = {
     'sheffield indie': 'Indie',
     'neo-psychedelic': 'Indie'
 }
+
+
+def load_genre_mapping_file(path):
+    """
+    Carica una mappatura generi -> macro-categorie generata da genre_taxonomy.py
+    
+    Args:
+        path: Percorso del file JSON
+        
+    Returns:
+        dict: Dizionario {genere: macro-categoria}
+    """
+    with open(path, encoding='utf-8') as f:
+        artifact = json.load(f)
+    
+    categories = artifact['categories']
+    return {genre: categories[code] for genre, code in artifact['genres'].items()}
+
+
+# Mappatura generata automaticamente (opzionale): completa quella scritta a mano,
+# che ha sempre la precedenza
+GENRE_MAPPING_FILE = os.getenv('GENRE_MAPPING_FILE')
+
+if GENRE_MAPPING_FILE and os.path.exists(GENRE_MAPPING_FILE):
+    GENRE_MAPPING = {**load_genre_mapping_file(GENRE_MAPPING_FILE), **GENRE_MAPPING}
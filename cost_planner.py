@@ -0,0 +1,276 @@
+"""
+Stima del costo (richieste, tempo, scritture) delle operazioni sulle playlist, senza scrivere nulla
+"""
+import math
+import time
+
+from config import RATE_LIMIT_PER_SECOND
+from genre_scoring import OTHER_GENRE, assign_labels, build_genre_matrix, score_tracks
+from spotify_client import PLAYLIST_MAX_ITEMS, shard_names
+
+
+SAVED_TRACKS_PAGE = 50     # Brani per pagina di /me/tracks
+ARTISTS_PER_REQUEST = 50   # ID per richiesta di /artists
+TRACKS_PER_WRITE = 100     # Brani per POST su /playlists/{id}/tracks
+PLAYLIST_TRACKS_PAGE = 100  # Brani per pagina di /playlists/{id}/tracks
+GENRE_PLAYLIST_PAUSE = 0.5  # Pausa tra una playlist e l'altra in create_playlists_by_genre
+
+
+class _TimedClient:
+    """
+    Conta e cronometra le richieste fatte dal planner stesso
+    """
+    def __init__(self, client):
+        self.client = client
+        self.requests = 0
+        self.elapsed = 0.0
+
+    def call(self, method, *args, **kwargs):
+        before = self.client.request_count
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self.elapsed += time.perf_counter() - start
+            self.requests += self.client.request_count - before
+
+    def latency(self):
+        return self.elapsed / self.requests if self.requests else 0.0
+
+
+def _pages(count, page_size):
+    return math.ceil(count / page_size) if count > 0 else 0
+
+
+def estimate_distinct(sample_ids, population):
+    """
+    Stima il numero di valori distinti in tutta la libreria partendo da un campione
+
+    Usa una semplice proporzione, quindi la stima è per eccesso: nelle
+    librerie grandi gli stessi artisti si ripetono più spesso che nel campione.
+
+    Args:
+        sample_ids: Valori osservati nel campione (con ripetizioni)
+        population: Numero totale di valori nella libreria (con ripetizioni)
+
+    Returns:
+        int: Numero stimato di valori distinti
+    """
+    if not sample_ids:
+        return 0
+
+    distinct = len(set(sample_ids))
+    return max(distinct, min(population, math.ceil(population * distinct / len(sample_ids))))
+
+
+def _artist_requests(client, sample_artist_ids, population):
+    """
+    Stima le richieste a /artists necessarie, tenendo conto della cache
+
+    Returns:
+        tuple: (artisti distinti stimati, quota mancante dalla cache, richieste)
+    """
+    distinct = list(dict.fromkeys(sample_artist_ids))
+    if not distinct:
+        return 0, 0.0, 0
+
+    # "in" non altera le statistiche di hit/miss della cache
+    missing = sum(1 for artist_id in distinct if artist_id not in client.artist_cache)
+    miss_rate = missing / len(distinct)
+
+    estimated = estimate_distinct(sample_artist_ids, population)
+    return estimated, miss_rate, _pages(math.ceil(estimated * miss_rate), ARTISTS_PER_REQUEST)
+
+
+def _existing_names(timed, names):
+    """
+    Trova le playlist dell'utente che hanno già uno dei nomi indicati
+    """
+    playlists = timed.call(timed.client.get_all_user_playlists)
+    wanted = set(names)
+    return sorted({playlist['name'] for playlist in playlists if playlist['name'] in wanted})
+
+
+def _finish_plan(plan, timed, requests_per_second, extra_seconds=0.0):
+    """
+    Completa il piano con totali e tempo stimato
+    """
+    total_requests = sum(plan['requests'].values())
+
+    # Ogni richiesta costa almeno 1/rate secondi; se la rete è più lenta conta la latenza
+    per_request = max(1 / requests_per_second, timed.latency())
+
+    plan['total_requests'] = total_requests
+    plan['write_requests'] = sum(n for endpoint, n in plan['requests'].items() if endpoint.startswith(('POST', 'PUT')))
+    plan['planning_requests'] = timed.requests
+    plan['requests_per_second'] = requests_per_second
+    plan['latency'] = timed.latency()
+    plan['estimated_seconds'] = total_requests * per_request + extra_seconds
+
+    return plan
+
+
+def _rate(client, requests_per_second):
+    if requests_per_second:
+        return requests_per_second
+    if client.rate_limiter:
+        return client.rate_limiter.rate
+    return RATE_LIMIT_PER_SECOND
+
+
+def plan_saved_tracks_playlist(client, name="My Liked Songs Backup", max_tracks=None, requests_per_second=None):
+    """
+    Stima il costo di create_playlist_from_saved_tracks senza creare nulla
+
+    Args:
+        client: SpotifyClient con autorizzazione utente
+        name: Nome della playlist che verrebbe creata
+        max_tracks: Numero massimo di brani (None = tutti)
+        requests_per_second: Budget di richieste al secondo (default: quello del client)
+
+    Returns:
+        dict: Piano con richieste per endpoint, tempo stimato e brani da scrivere
+    """
+    timed = _TimedClient(client)
+    first_page = timed.call(client.get_saved_tracks, limit=SAVED_TRACKS_PAGE, offset=0)
+    total = first_page['total']
+
+    track_count = min(total, max_tracks) if max_tracks else total
+    shards = max(1, _pages(track_count, PLAYLIST_MAX_ITEMS))
+    existing = _existing_names(timed, shard_names(name, shards))
+
+    plan = {
+        'operation': f"Playlist dai brani salvati '{name}'",
+        'library_size': total,
+        'requests': {
+            'GET /me/tracks': _pages(total, SAVED_TRACKS_PAGE),
+            'GET /me': shards,
+            'POST /users/{id}/playlists': shards,
+            'POST /playlists/{id}/tracks': _pages(track_count, TRACKS_PER_WRITE),
+            # Controllo finale del contenuto di ogni playlist
+            'GET /playlists/{id}': shards,
+            'GET /playlists/{id}/tracks': _pages(track_count, PLAYLIST_TRACKS_PAGE)
+        },
+        'playlists': shards,
+        'tracks_written': track_count,
+        'existing_playlists': existing,
+        'cache_hit_rate': None
+    }
+
+    return _finish_plan(plan, timed, _rate(client, requests_per_second))
+
+
+def _sample_genre_counts(client, sample, artists, weighted, multi_label, min_tracks, scale):
+    """
+    Conta i brani del campione per genere come farebbe create_playlists_by_genre
+
+    Con weighted i generi vengono assegnati con gli stessi punteggi di
+    group_tracks_by_genre_scores (tutti gli artisti accreditati); con
+    multi_label un brano conta una volta per ogni genere assegnato.
+
+    Returns:
+        dict: Dizionario {genere: brani del campione}
+    """
+    if not weighted:
+        genre_counts = {}
+        for track in sample:
+            artist_info = artists.get(track['artists'][0]['id'])
+            if artist_info and artist_info.get('genres'):
+                genre = client.simplify_genre(artist_info['genres'][0])
+            else:
+                genre = OTHER_GENRE
+            genre_counts[genre] = genre_counts.get(genre, 0) + 1
+        return genre_counts
+
+    rows, cols, values, macro_genres = build_genre_matrix(sample, artists, client.simplify_genre)
+    scores = score_tracks(rows, cols, values, len(sample), len(macro_genres))
+    labels = assign_labels(scores, multi_label)
+
+    # Soglia sul valore proiettato: i brani rimasti senza genere vanno in "Other"
+    kept = labels.sum(axis=0) * scale >= min_tracks
+    labels &= kept[None, :]
+
+    genre_counts = {macro_genres[code]: int(count) for code, count in enumerate(labels.sum(axis=0)) if count}
+    unlabeled = int((~labels.any(axis=1)).sum())
+    if unlabeled:
+        genre_counts[OTHER_GENRE] = genre_counts.get(OTHER_GENRE, 0) + unlabeled
+
+    return genre_counts
+
+
+def plan_genre_playlists(client, min_tracks=5, weighted=False, multi_label=False, requests_per_second=None):
+    """
+    Stima il costo di create_playlists_by_genre senza creare nulla
+
+    Legge solo la prima pagina dei brani salvati: la distribuzione dei
+    generi del campione viene proiettata sull'intera libreria. Gli artisti
+    del campione vengono caricati (una richiesta ogni 50) per conoscerne i generi.
+
+    Args:
+        client: SpotifyClient con autorizzazione utente
+        min_tracks: Numero minimo di brani per creare una playlist
+        weighted: Se True, stima la variante che considera tutti gli artisti di ogni brano
+        multi_label: Se True (solo con weighted), un brano può finire in più playlist
+        requests_per_second: Budget di richieste al secondo (default: quello del client)
+
+    Returns:
+        dict: Piano con richieste per endpoint, tempo stimato e brani da scrivere
+    """
+    timed = _TimedClient(client)
+    first_page = timed.call(client.get_saved_tracks, limit=SAVED_TRACKS_PAGE, offset=0)
+    total = first_page['total']
+
+    sample = [
+        item['track'] for item in first_page['items']
+        if item['track'] and item['track'].get('artists')
+    ]
+
+    if weighted:
+        sample_artist_ids = [artist['id'] for track in sample for artist in track['artists']]
+    else:
+        sample_artist_ids = [track['artists'][0]['id'] for track in sample]
+
+    # Da misurare prima di caricare il campione, che riempie la cache
+    cache_hit_rate = client.artist_cache.hit_rate()
+    artist_population = round(len(sample_artist_ids) * total / len(sample)) if sample else 0
+    distinct_artists, miss_rate, artist_requests = _artist_requests(client, sample_artist_ids, artist_population)
+
+    artists = timed.call(client.prefetch_artists, sample_artist_ids)
+
+    scale = total / len(sample) if sample else 0
+    genre_counts = _sample_genre_counts(client, sample, artists, weighted, weighted and multi_label,
+                                        min_tracks, scale)
+
+    # Proiezione sull'intera libreria; i generi sotto soglia finiscono in "Other"
+    projected = {}
+    for genre, count in genre_counts.items():
+        estimated = round(count * scale)
+        target = genre if estimated >= min_tracks else OTHER_GENRE
+        projected[target] = projected.get(target, 0) + estimated
+
+    names = [f"My {genre} Favorites" for genre in projected]
+    existing = _existing_names(timed, names)
+
+    playlists = len(projected)
+    plan = {
+        'operation': 'Playlist per genere' + (' (tutti gli artisti)' if weighted else '')
+                     + (', più generi per brano' if weighted and multi_label else ''),
+        'library_size': total,
+        'requests': {
+            'GET /me/tracks': _pages(total, SAVED_TRACKS_PAGE),
+            'GET /artists': artist_requests,
+            'GET /me': playlists,
+            'POST /users/{id}/playlists': playlists,
+            'POST /playlists/{id}/tracks': sum(_pages(count, TRACKS_PER_WRITE) for count in projected.values())
+        },
+        'playlists': playlists,
+        'tracks_written': sum(projected.values()),
+        'genres': dict(sorted(projected.items(), key=lambda x: x[1], reverse=True)),
+        'distinct_artists': distinct_artists,
+        'artist_miss_rate': miss_rate,
+        'existing_playlists': existing,
+        'cache_hit_rate': cache_hit_rate
+    }
+
+    return _finish_plan(plan, timed, _rate(client, requests_per_second),
+                        extra_seconds=playlists * GENRE_PLAYLIST_PAUSE)
@@ -0,0 +1,80 @@
+"""
+Eccezioni tipizzate per gli errori dell'API di Spotify
+"""
+
+
+class SpotifyAPIError(Exception):
+    """
+    Errore restituito dall'API di Spotify
+
+    Attributes:
+        status_code: Codice HTTP della risposta (None per errori di connessione)
+        retryable: True se ripetere la stessa richiesta può avere successo
+    """
+    retryable = False
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class AuthenticationError(SpotifyAPIError):
+    """
+    Token mancante, scaduto o senza i permessi necessari (401/403)
+    """
+
+
+class NotFoundError(SpotifyAPIError):
+    """
+    Risorsa inesistente (404)
+    """
+
+
+class RateLimitError(SpotifyAPIError):
+    """
+    Troppe richieste (429): si può riprovare dopo retry_after secondi
+    """
+    retryable = True
+
+    def __init__(self, message, status_code=429, retry_after=None):
+        super().__init__(message, status_code)
+        self.retry_after = retry_after
+
+
+class TransientError(SpotifyAPIError):
+    """
+    Errore temporaneo del server (5xx) o della connessione
+    """
+    retryable = True
+
+
+class CircuitOpenError(SpotifyAPIError):
+    """
+    Richiesta non inviata perché l'API risulta non disponibile (circuit breaker aperto)
+    """
+
+
+def api_error(response, message):
+    """
+    Crea l'eccezione tipizzata adatta al codice HTTP della risposta
+
+    Args:
+        response: Risposta HTTP non riuscita
+        message: Messaggio dell'errore
+
+    Returns:
+        SpotifyAPIError: Eccezione da sollevare
+    """
+    status = response.status_code
+
+    if status in (401, 403):
+        return AuthenticationError(message, status)
+    if status == 404:
+        return NotFoundError(message, status)
+    if status == 429:
+        retry_after = response.headers.get('Retry-After')
+        return RateLimitError(message, status, float(retry_after) if retry_after else None)
+    if status >= 500:
+        return TransientError(message, status)
+
+    return SpotifyAPIError(message, status)
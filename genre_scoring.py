@@ -0,0 +1,201 @@
+"""
+Assegnazione dei generi pesata su tutti gli artisti e tutti i generi di ogni brano
+"""
+import numpy as np
+
+
+OTHER_GENRE = 'Other'
+
+
+def position_weights(n):
+    """
+    Pesi decrescenti per posizione: 1, 1/2, 1/3, ...
+
+    Args:
+        n: Numero di posizioni
+
+    Returns:
+        numpy.ndarray: Array di n pesi
+    """
+    return 1.0 / np.arange(1, n + 1)
+
+
+def build_genre_matrix(tracks, artists, simplify_genre):
+    """
+    Costruisce la matrice sparsa brano × macro-genere in formato COO
+
+    Ogni artista di un brano contribuisce con tutti i suoi generi; il peso
+    di un genere è (1 / posizione dell'artista) × (1 / posizione del genere).
+    I generi che non corrispondono a nessuna macro-categoria vengono ignorati.
+
+    Args:
+        tracks: Lista di brani (con 'artists')
+        artists: Dizionario {artist_id: info artista} con i 'genres'
+        simplify_genre: Funzione genere specifico -> macro-categoria
+
+    Returns:
+        tuple: (righe, colonne, pesi, lista delle macro-categorie)
+    """
+    macro_genres = []
+    macro_index = {}
+    artist_codes = {}
+
+    # Contributo di ogni artista in formato CSR: offsets[a]:offsets[a+1] in genre_codes/genre_weights
+    offsets = [0]
+    genre_codes = []
+    genre_weights = []
+
+    for artist_id, artist_info in artists.items():
+        genres = (artist_info or {}).get('genres') or []
+        contributions = {}
+
+        for genre, weight in zip(genres, position_weights(len(genres))):
+            macro = simplify_genre(genre)
+            if macro == OTHER_GENRE:
+                continue
+            if macro not in macro_index:
+                macro_index[macro] = len(macro_genres)
+                macro_genres.append(macro)
+            code = macro_index[macro]
+            contributions[code] = contributions.get(code, 0.0) + weight
+
+        artist_codes[artist_id] = len(offsets) - 1
+        genre_codes.extend(contributions.keys())
+        genre_weights.extend(contributions.values())
+        offsets.append(len(genre_codes))
+
+    offsets = np.array(offsets, dtype=np.int64)
+    genre_codes = np.array(genre_codes, dtype=np.int32)
+    genre_weights = np.array(genre_weights, dtype=np.float64)
+
+    # Coppie (brano, artista) con il peso della posizione dell'artista
+    pair_tracks = []
+    pair_artists = []
+    pair_positions = []
+
+    for i, track in enumerate(tracks):
+        for position, artist in enumerate(track.get('artists') or []):
+            code = artist_codes.get(artist['id'])
+            if code is not None:
+                pair_tracks.append(i)
+                pair_artists.append(code)
+                pair_positions.append(position)
+
+    pair_tracks = np.array(pair_tracks, dtype=np.int64)
+    pair_artists = np.array(pair_artists, dtype=np.int64)
+    pair_weights = 1.0 / (np.array(pair_positions, dtype=np.float64) + 1)
+
+    # Espansione vettoriale: ogni coppia genera una voce per ciascun genere dell'artista
+    starts = offsets[pair_artists]
+    lengths = offsets[pair_artists + 1] - starts
+    total = int(lengths.sum())
+
+    rows = np.repeat(pair_tracks, lengths)
+    entry_starts = np.cumsum(lengths) - lengths
+    gather = np.repeat(starts - entry_starts, lengths) + np.arange(total)
+    cols = genre_codes[gather]
+    values = genre_weights[gather] * np.repeat(pair_weights, lengths)
+
+    return rows, cols, values, macro_genres
+
+
+def score_tracks(rows, cols, values, n_tracks, n_genres):
+    """
+    Somma i contributi COO e normalizza ogni riga (i punteggi di un brano sommano a 1)
+
+    Args:
+        rows, cols, values: Matrice in formato COO
+        n_tracks: Numero di brani
+        n_genres: Numero di macro-categorie
+
+    Returns:
+        numpy.ndarray: Matrice n_tracks × n_genres dei punteggi
+    """
+    scores = np.bincount(
+        rows * n_genres + cols, weights=values, minlength=n_tracks * n_genres
+    ).astype(np.float64, copy=False).reshape(n_tracks, n_genres)
+
+    totals = scores.sum(axis=1, keepdims=True)
+    np.divide(scores, totals, out=scores, where=totals > 0)
+
+    return scores
+
+
+def assign_labels(scores, multi_label=False, threshold=0.35):
+    """
+    Sceglie i generi di ogni brano
+
+    Args:
+        scores: Matrice dei punteggi normalizzati
+        multi_label: Se True, un brano può avere più generi
+        threshold: Punteggio minimo per un genere secondario (solo multi_label)
+
+    Returns:
+        numpy.ndarray: Maschera booleana n_tracks × n_genres
+    """
+    n_tracks = scores.shape[0]
+    labels = np.zeros(scores.shape, dtype=bool)
+
+    if scores.shape[1] == 0:
+        return labels
+
+    has_genre = scores.max(axis=1) > 0
+    labels[np.arange(n_tracks), scores.argmax(axis=1)] = True
+    labels &= has_genre[:, None]
+
+    if multi_label:
+        labels |= scores >= threshold
+
+    return labels
+
+
+def group_tracks_by_genre_scores(client, tracks_items, min_tracks=5, multi_label=False, threshold=0.35,
+                                 progress_callback=None):
+    """
+    Raggruppa i brani per genere usando tutti gli artisti e tutti i generi
+
+    Args:
+        client: SpotifyClient (per caricare gli artisti e semplificare i generi)
+        tracks_items: Lista di items dai brani salvati
+        min_tracks: Numero minimo di brani per creare una playlist
+        multi_label: Se True, un brano può finire in più playlist
+        threshold: Punteggio minimo per un genere secondario
+        progress_callback: Funzione chiamata come (fase, completati, totale) (opzionale)
+
+    Returns:
+        dict: Dizionario {genere: [lista di brani]}
+    """
+    tracks = [
+        item['track'] for item in tracks_items
+        if item['track'] and item['track'].get('artists')
+    ]
+
+    print(f"\n🔍 Analizzo {len(tracks)} brani per genere (tutti gli artisti)...")
+
+    artists = client.prefetch_artists([
+        artist['id'] for track in tracks for artist in track['artists']
+    ])
+
+    if progress_callback:
+        progress_callback('artists', len(artists), len(artists))
+
+    rows, cols, values, macro_genres = build_genre_matrix(tracks, artists, client.simplify_genre)
+    scores = score_tracks(rows, cols, values, len(tracks), len(macro_genres))
+    labels = assign_labels(scores, multi_label, threshold)
+
+    # Le categorie con pochi brani vengono scartate; i brani rimasti senza genere vanno in "Other"
+    kept = labels.sum(axis=0) >= min_tracks
+    labels &= kept[None, :]
+    unlabeled = ~labels.any(axis=1)
+
+    genre_groups = {}
+    for code in np.nonzero(kept)[0]:
+        genre_groups[macro_genres[code]] = [tracks[i] for i in np.nonzero(labels[:, code])[0]]
+
+    if unlabeled.any():
+        genre_groups[OTHER_GENRE] = [tracks[i] for i in np.nonzero(unlabeled)[0]]
+
+    if progress_callback:
+        progress_callback('genres', len(tracks), len(tracks))
+
+    return genre_groups
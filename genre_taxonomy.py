@@ -0,0 +1,327 @@
+"""
+Tassonomia dei generi ricavata dai dati: raggruppa i generi di allgenere.txt
+in macro-categorie in base a quanto compaiono insieme sugli stessi artisti
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from config import GENRE_MAPPING, load_genre_mapping_file
+from profiling import FlowProfiler
+
+
+def load_genre_list(path='allgenere.txt'):
+    """
+    Legge l'elenco dei generi (una riga "N: genere" per genere)
+
+    Args:
+        path: Percorso del file
+
+    Returns:
+        list: Lista dei generi, nell'ordine del file
+    """
+    genres = []
+
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            _, _, genre = line.partition(':')
+            genre = genre.strip().lower()
+            if genre:
+                genres.append(genre)
+
+    return genres
+
+
+def build_cooccurrence(artist_genre_lists):
+    """
+    Costruisce la matrice sparsa di co-occorrenza dei generi
+
+    Due generi co-occorrono quando compaiono sullo stesso artista. La
+    diagonale contiene il numero di artisti di ciascun genere.
+
+    Args:
+        artist_genre_lists: Lista di liste di generi (una per artista, senza ripetizioni di artisti)
+
+    Returns:
+        tuple: (generi, frequenze, righe, colonne, conteggi) con la matrice in formato COO
+    """
+    genres = []
+    genre_index = {}
+    artist_codes = []
+
+    for artist_genres in artist_genre_lists:
+        codes = []
+        for genre in dict.fromkeys(g.lower() for g in artist_genres):
+            if genre not in genre_index:
+                genre_index[genre] = len(genres)
+                genres.append(genre)
+            codes.append(genre_index[genre])
+        if codes:
+            artist_codes.append(np.array(codes, dtype=np.int64))
+
+    n_genres = len(genres)
+    if not artist_codes:
+        empty = np.zeros(0, dtype=np.int64)
+        return genres, np.zeros(n_genres, dtype=np.int64), empty, empty, empty
+
+    # Tutte le coppie ordinate (i, j) di ogni artista, diagonale inclusa
+    rows = np.concatenate([np.repeat(codes, len(codes)) for codes in artist_codes])
+    cols = np.concatenate([np.tile(codes, len(codes)) for codes in artist_codes])
+
+    pair_keys, counts = np.unique(rows * n_genres + cols, return_counts=True)
+    rows, cols = np.divmod(pair_keys, n_genres)
+    frequencies = counts[rows == cols]  # Le chiavi sono ordinate: la diagonale è già in ordine
+
+    return genres, frequencies, rows, cols, counts
+
+
+def _normalize_rows(rows, values, n):
+    """
+    Normalizza in norma L2 le righe di una matrice COO
+    """
+    norms = np.sqrt(np.bincount(rows, weights=values ** 2, minlength=n))
+    return values / np.where(norms > 0, norms, 1)[rows]
+
+
+def _similarity(rows, cols, values, centroids, n):
+    """
+    Similarità coseno tra le righe (COO normalizzate) e i centroidi (densi, normalizzati)
+
+    Returns:
+        numpy.ndarray: Matrice n × k
+    """
+    similarity = np.zeros((n, centroids.shape[0]))
+    np.add.at(similarity, rows, values[:, None] * centroids[:, cols].T)
+    return similarity
+
+
+def cluster_genres(genres, frequencies, rows, cols, counts, n_clusters=20, iterations=25):
+    """
+    Raggruppa i generi con uno spherical k-means sulla matrice di co-occorrenza
+
+    I centroidi iniziali sono scelti tra i generi più frequenti, prendendo
+    ogni volta quello meno simile ai centroidi già scelti.
+
+    Args:
+        genres: Lista dei generi
+        frequencies: Numero di artisti per genere
+        rows, cols, counts: Matrice di co-occorrenza in formato COO
+        n_clusters: Numero di macro-categorie
+        iterations: Numero massimo di iterazioni
+
+    Returns:
+        numpy.ndarray: Indice della categoria di ogni genere
+    """
+    n = len(genres)
+    n_clusters = min(n_clusters, n)
+
+    if n_clusters == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # Peso PMI-like: riduce l'influenza dei generi onnipresenti (es. "pop")
+    values = counts / np.sqrt(frequencies[rows] * frequencies[cols])
+    values = _normalize_rows(rows, values, n)
+
+    def dense_row(i):
+        mask = rows == i
+        vector = np.zeros(n)
+        vector[cols[mask]] = values[mask]
+        return vector
+
+    candidates = np.argsort(-frequencies, kind='stable')[:max(10 * n_clusters, n_clusters)]
+    centroids = [dense_row(candidates[0])]
+
+    while len(centroids) < n_clusters:
+        similarity = _similarity(rows, cols, values, np.array(centroids), n).max(axis=1)
+        next_genre = candidates[np.argmin(similarity[candidates])]
+        centroids.append(dense_row(next_genre))
+
+    centroids = np.array(centroids)
+    labels = np.full(n, -1)
+
+    for _ in range(iterations):
+        new_labels = _similarity(rows, cols, values, centroids, n).argmax(axis=1)
+
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+        centroids = np.zeros((n_clusters, n))
+        np.add.at(centroids, (labels[rows], cols), values)
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        centroids /= np.where(norms > 0, norms, 1)
+
+    return labels
+
+
+def name_clusters(genres, frequencies, labels, seed_mapping=GENRE_MAPPING):
+    """
+    Assegna un nome a ogni categoria
+
+    Il nome è la macro-categoria della mappatura scritta a mano più votata
+    dai generi del gruppo (pesati per frequenza); se nessun genere del
+    gruppo è mappato, si usa il genere più frequente.
+
+    Args:
+        genres: Lista dei generi
+        frequencies: Numero di artisti per genere
+        labels: Indice della categoria di ogni genere
+        seed_mapping: Mappatura {genere: macro-categoria} usata per i nomi
+
+    Returns:
+        list: Nome di ogni categoria
+    """
+    names = []
+
+    for cluster in range(labels.max() + 1 if len(labels) else 0):
+        members = np.nonzero(labels == cluster)[0]
+        if len(members) == 0:
+            names.append(f'Cluster {cluster + 1}')
+            continue
+
+        votes = {}
+        for i in members:
+            name = seed_mapping.get(genres[i])
+            if name and name != 'Other':
+                votes[name] = votes.get(name, 0) + int(frequencies[i])
+
+        if votes:
+            names.append(max(votes, key=votes.get))
+        else:
+            top = members[np.argmax(frequencies[members])]
+            names.append(genres[top].title())
+
+    return names
+
+
+def build_mapping(genres, labels, names, vocabulary=()):
+    """
+    Costruisce la mappatura {genere: macro-categoria}
+
+    I generi del vocabolario mai visti nelle librerie vengono assegnati alla
+    categoria del genere visto che coincide con le loro ultime parole
+    (es. "sheffield indie rock" -> "indie rock" o "rock").
+
+    Args:
+        genres: Generi visti nelle librerie
+        labels: Categoria di ogni genere visto
+        names: Nome di ogni categoria
+        vocabulary: Elenco completo dei generi (es. da allgenere.txt)
+
+    Returns:
+        dict: Dizionario {genere: macro-categoria}
+    """
+    mapping = {genre: names[label] for genre, label in zip(genres, labels)}
+
+    for genre in vocabulary:
+        if genre in mapping:
+            continue
+        words = genre.split()
+        for k in range(len(words) - 1, 0, -1):
+            suffix = ' '.join(words[-k:])
+            if suffix in mapping:
+                mapping[genre] = mapping[suffix]
+                break
+
+    return mapping
+
+
+def save_mapping(mapping, path):
+    """
+    Salva la mappatura in un file JSON compatto (caricabile da config.py)
+
+    Args:
+        mapping: Dizionario {genere: macro-categoria}
+        path: Percorso del file
+    """
+    categories = sorted(set(mapping.values()))
+    category_index = {name: i for i, name in enumerate(categories)}
+
+    artifact = {
+        'version': 1,
+        'categories': categories,
+        'genres': {genre: category_index[name] for genre, name in sorted(mapping.items())}
+    }
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(artifact, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def collect_artist_genres(client):
+    """
+    Raccoglie i generi di tutti gli artisti dei brani salvati di un utente
+
+    Args:
+        client: SpotifyClient con autorizzazione utente
+
+    Returns:
+        dict: Dizionario {artist_id: lista di generi}
+    """
+    saved_tracks = client.get_all_saved_tracks()
+    artists = client.prefetch_artists([
+        artist['id']
+        for item in saved_tracks if item['track']
+        for artist in item['track'].get('artists', [])
+    ])
+
+    return {
+        artist_id: artist_info.get('genres', [])
+        for artist_id, artist_info in artists.items()
+        if artist_info
+    }
+
+
+def main():
+    """
+    Funzione principale
+    """
+    from spotify_client import SpotifyClient
+    from batch_worker import load_user_tokens
+    from artist_cache import ArtistCache
+    from config import CLIENT_ID, CLIENT_SECRET, REDIRECT_URI
+
+    parser = argparse.ArgumentParser(description="Genera la tassonomia dei generi dalle librerie")
+    parser.add_argument('--clusters', type=int, default=20, help="Numero di macro-categorie")
+    parser.add_argument('--tokens', help="File JSON {utente: access_token} per usare più librerie")
+    parser.add_argument('--genres', default='allgenere.txt', help="Elenco completo dei generi")
+    parser.add_argument('--output', default='genre_mapping.json', help="File della mappatura generata")
+    args = parser.parse_args()
+
+    # Gli artisti in comune tra più librerie vengono contati una volta sola
+    artist_cache = ArtistCache()
+    artist_genres = {}
+
+    if args.tokens:
+        for user, token in load_user_tokens(args.tokens).items():
+            print(f"\n👤 {user}")
+            client = SpotifyClient(CLIENT_ID, CLIENT_SECRET, redirect_uri=REDIRECT_URI,
+                                   user_access_token=token, artist_cache=artist_cache)
+            artist_genres.update(collect_artist_genres(client))
+    else:
+        client = SpotifyClient(CLIENT_ID, CLIENT_SECRET, redirect_uri=REDIRECT_URI,
+                               artist_cache=artist_cache)
+        artist_genres.update(collect_artist_genres(client))
+
+    start = time.perf_counter()
+    genres, frequencies, rows, cols, counts = build_cooccurrence(artist_genres.values())
+    labels = cluster_genres(genres, frequencies, rows, cols, counts, args.clusters)
+    names = name_clusters(genres, frequencies, labels)
+    mapping = build_mapping(genres, labels, names, load_genre_list(args.genres))
+    save_mapping(mapping, args.output)
+
+    print(f"\n✓ {len(genres)} generi da {len(artist_genres)} artisti raggruppati "
+          f"in {len(set(names))} categorie ({time.perf_counter() - start:.2f}s)")
+    print(f"✓ {len(mapping)} generi mappati, salvati in '{args.output}'")
+
+    start = time.perf_counter()
+    load_genre_mapping_file(args.output)
+    print(f"  Caricamento della mappatura: {(time.perf_counter() - start) * 1000:.1f} ms")
+    print(f"\n💡 Imposta GENRE_MAPPING_FILE={args.output} nel .env per usarla")
+
+
+if __name__ == "__main__":
+    # Con PROFILE=true nel .env il comando viene profilato
+    with FlowProfiler().profile('genre_taxonomy'):
+        main()
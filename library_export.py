@@ -0,0 +1,349 @@
+"""
+Esportazione della libreria (brani salvati e playlist) in JSONL, CSV o M3U e importazione delle playlist
+"""
+import csv
+import json
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+EXPORT_FORMATS = ('jsonl', 'csv', 'm3u')
+
+# Colonne del CSV (una riga per brano; 'playlist' ripete il nome della playlist)
+CSV_FIELDS = ('playlist', 'position', 'uri', 'name', 'artists', 'album', 'duration_ms', 'added_at')
+
+SAVED_TRACKS_NAME = 'Liked Songs'
+
+TRACK_URL_PATTERN = re.compile(r'https?://open\.spotify\.com/(?:[\w-]+/)?track/([A-Za-z0-9]+)')
+
+
+def _iter_pages(fetch_page, page_size, prefetch):
+    """
+    Restituisce gli item di tutte le pagine, nell'ordine
+
+    La prima pagina indica il totale; le successive vengono scaricate in
+    anticipo, al massimo prefetch alla volta: la memoria usata resta
+    limitata a prefetch pagine qualunque sia il totale.
+
+    Args:
+        fetch_page: Funzione (limit, offset) -> risposta con 'items' e 'total'
+        page_size: Item per pagina
+        prefetch: Pagine scaricate in anticipo
+
+    Yields:
+        dict: Item nell'ordine dell'API
+    """
+    first = fetch_page(page_size, 0)
+    yield from first['items']
+
+    offsets = iter(range(page_size, first['total'], page_size))
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=prefetch) as executor:
+        try:
+            for offset in offsets:
+                pending.append(executor.submit(fetch_page, page_size, offset))
+                if len(pending) >= prefetch:
+                    yield from pending.popleft().result()['items']
+
+            while pending:
+                yield from pending.popleft().result()['items']
+        finally:
+            # Se chi legge si ferma prima, le pagine non ancora iniziate vengono annullate
+            for future in pending:
+                future.cancel()
+
+
+def iter_saved_tracks(client, page_size=50, prefetch=4):
+    """
+    Restituisce i brani salvati pagina dopo pagina, senza tenerli tutti in memoria
+
+    Yields:
+        dict: Item dei brani salvati (con 'track' e 'added_at')
+    """
+    return _iter_pages(lambda limit, offset: client.get_saved_tracks(limit=limit, offset=offset),
+                       page_size, prefetch)
+
+
+def iter_playlist_tracks(client, playlist_id, page_size=100, prefetch=2):
+    """
+    Restituisce i brani di una playlist pagina dopo pagina, senza tenerli tutti in memoria
+
+    Yields:
+        dict: Item della playlist (con 'track' e 'added_at')
+    """
+    return _iter_pages(lambda limit, offset: client.get_playlist_tracks_page(playlist_id, limit=limit, offset=offset),
+                       page_size, prefetch)
+
+
+def track_record(item):
+    """
+    Estrae da un item dell'API i campi esportati
+
+    Returns:
+        dict: Record del brano, None per brani non più disponibili
+    """
+    track = item.get('track')
+    if not track or not track.get('uri'):
+        return None
+
+    return {
+        'uri': track['uri'],
+        'name': track.get('name'),
+        'artists': [artist.get('name') for artist in track.get('artists') or []],
+        'album': (track.get('album') or {}).get('name'),
+        'duration_ms': track.get('duration_ms'),
+        'added_at': item.get('added_at')
+    }
+
+
+class JSONLWriter:
+    """
+    Una riga JSON per la playlist, poi una per ogni brano
+    """
+    def __init__(self, f, collection):
+        self.f = f
+        self._write({'type': 'playlist', **collection})
+
+    def _write(self, record):
+        self.f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def write(self, position, record):
+        self._write({'type': 'track', 'position': position, **record})
+
+
+class CSVWriter:
+    """
+    Una riga per brano con le colonne CSV_FIELDS
+    """
+    def __init__(self, f, collection):
+        self.name = collection['name']
+        self.writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        self.writer.writeheader()
+
+    def write(self, position, record):
+        self.writer.writerow({
+            **record,
+            'playlist': self.name,
+            'position': position,
+            'artists': '; '.join(record['artists'])
+        })
+
+
+class M3UWriter:
+    """
+    M3U esteso: nome della playlist in #PLAYLIST, durata e titolo in #EXTINF, poi l'URI
+    """
+    def __init__(self, f, collection):
+        self.f = f
+        name = ' '.join(collection['name'].splitlines())
+        self.f.write(f"#EXTM3U\n#PLAYLIST:{name}\n")
+
+    def write(self, position, record):
+        seconds = round((record['duration_ms'] or 0) / 1000) or -1
+        title = ' '.join(f"{', '.join(record['artists'])} - {record['name']}".splitlines())
+        self.f.write(f"#EXTINF:{seconds},{title}\n{record['uri']}\n")
+
+
+WRITERS = {'jsonl': JSONLWriter, 'csv': CSVWriter, 'm3u': M3UWriter}
+
+
+def _file_name(name, playlist_id, fmt):
+    """
+    Nome del file di una playlist (caratteri sicuri e ID per evitare collisioni)
+    """
+    slug = re.sub(r'[^\w-]+', '_', name).strip('_')[:60] or 'playlist'
+    return f"{slug}-{playlist_id}.{fmt}" if playlist_id else f"{slug}.{fmt}"
+
+
+def export_collection(items, path, collection, fmt='jsonl'):
+    """
+    Scrive i brani di una collezione man mano che arrivano
+
+    In memoria c'è un solo brano alla volta; il file viene scritto in un
+    file temporaneo e sostituito solo a esportazione completata.
+
+    Args:
+        items: Iterabile di item dell'API (es. iter_playlist_tracks)
+        path: File di destinazione
+        collection: Dizionario con almeno 'name' (scritto nell'intestazione)
+        fmt: Formato (tra EXPORT_FORMATS)
+
+    Returns:
+        int: Numero di brani esportati
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Formato non supportato: '{fmt}'")
+
+    count = 0
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+
+    try:
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            writer = WRITERS[fmt](f, collection)
+
+            for item in items:
+                record = track_record(item)
+                if record is None:
+                    continue
+                writer.write(count, record)
+                count += 1
+
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return count
+
+
+def export_library(client, directory, fmt='jsonl', include_saved=True, include_playlists=True, max_workers=4):
+    """
+    Esporta brani salvati e playlist in una cartella, un file per collezione
+
+    Le pagine vengono scritte appena arrivano, quindi la memoria usata non
+    dipende dalla dimensione della libreria. Più playlist vengono
+    esportate contemporaneamente, ognuna nel proprio file.
+
+    Args:
+        client: SpotifyClient con autorizzazione utente
+        directory: Cartella di destinazione
+        fmt: Formato (tra EXPORT_FORMATS)
+        include_saved: Se True, esporta i brani salvati
+        include_playlists: Se True, esporta tutte le playlist dell'utente
+        max_workers: Playlist esportate contemporaneamente
+
+    Returns:
+        list: Un dizionario per file con 'name', 'path' e 'tracks'
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Formato non supportato: '{fmt}'")
+
+    os.makedirs(directory, exist_ok=True)
+    exported = []
+
+    if include_saved:
+        path = os.path.join(directory, _file_name('saved_tracks', None, fmt))
+        count = export_collection(iter_saved_tracks(client), path, {'name': SAVED_TRACKS_NAME}, fmt)
+        print(f"  ✓ {SAVED_TRACKS_NAME}: {count} brani")
+        exported.append({'name': SAVED_TRACKS_NAME, 'path': path, 'tracks': count})
+
+    if include_playlists:
+        playlists = [playlist for playlist in client.get_all_user_playlists() if playlist]
+
+        def export_playlist(playlist):
+            path = os.path.join(directory, _file_name(playlist['name'], playlist['id'], fmt))
+            collection = {
+                'name': playlist['name'],
+                'id': playlist['id'],
+                'description': playlist.get('description') or '',
+                'public': playlist.get('public'),
+                'snapshot_id': playlist.get('snapshot_id')
+            }
+            count = export_collection(iter_playlist_tracks(client, playlist['id']), path, collection, fmt)
+            print(f"  ✓ {playlist['name']}: {count} brani")
+            return {'name': playlist['name'], 'path': path, 'tracks': count}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            exported.extend(executor.map(export_playlist, playlists))
+
+    return exported
+
+
+def _to_uri(value):
+    """
+    Converte un URI o un link open.spotify.com di un brano in URI
+
+    Returns:
+        str: URI del brano, None se non importabile (es. file locali)
+    """
+    value = value.strip()
+
+    if value.startswith('spotify:track:'):
+        return value
+
+    match = TRACK_URL_PATTERN.match(value)
+    return f"spotify:track:{match.group(1)}" if match else None
+
+
+def read_export(path):
+    """
+    Legge un file esportato (il formato dipende dall'estensione)
+
+    Il file viene letto riga per riga: in memoria restano solo gli URI.
+
+    Args:
+        path: File .jsonl, .csv o .m3u/.m3u8
+
+    Returns:
+        tuple: (nome della playlist, lista di URI nell'ordine, brani non importabili)
+    """
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    name = None
+    values = []
+
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if extension == 'jsonl':
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get('type') == 'playlist':
+                    name = record.get('name')
+                else:
+                    values.append(record.get('uri') or '')
+        elif extension == 'csv':
+            for row in csv.DictReader(f):
+                name = name or row.get('playlist')
+                values.append(row.get('uri') or '')
+        elif extension in ('m3u', 'm3u8'):
+            for line in f:
+                line = line.strip()
+                if line.startswith('#PLAYLIST:'):
+                    name = line[len('#PLAYLIST:'):].strip()
+                elif line and not line.startswith('#'):
+                    values.append(line)
+        else:
+            raise ValueError(f"Formato non supportato: '{extension}'")
+
+    uris = []
+    skipped = 0
+    for value in values:
+        uri = _to_uri(value)
+        if uri:
+            uris.append(uri)
+        else:
+            skipped += 1
+
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    return name, uris, skipped
+
+
+def import_playlist(client, path, name=None, public=False):
+    """
+    Ricrea una playlist da un file esportato
+
+    I brani vengono caricati a lotti di 100 URI; oltre il limite di una
+    playlist vengono create più playlist "Nome (1/N)".
+
+    Args:
+        client: SpotifyClient con autorizzazione utente
+        path: File esportato (.jsonl, .csv, .m3u)
+        name: Nome della nuova playlist (default: quello salvato nel file)
+        public: Se True, la playlist è pubblica
+
+    Returns:
+        dict: 'playlists' (playlist create), 'tracks' (brani caricati) e 'skipped' (non importabili)
+    """
+    saved_name, uris, skipped = read_export(path)
+
+    if not uris:
+        raise ValueError(f"Nessun brano importabile in '{path}'")
+
+    description = f"Importata da {os.path.basename(path)}"
+    playlists = client.create_sharded_playlist(name or saved_name, uris, description, public)
+
+    return {'playlists': playlists, 'tracks': len(uris), 'skipped': skipped}
@@ -0,0 +1,600 @@
+"""
+Snapshot colonnare della libreria (brani salvati e playlist) letto con mmap, senza copie
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+from collections.abc import Sequence
+from datetime import datetime, timezone
+
+import numpy as np
+
+from analytics import LibraryColumns, UNKNOWN_GENRE, macro_genres_for_artists
+
+
+MAGIC = b'SPSNAP\x00\x01'
+FORMAT_VERSION = 1
+ALIGNMENT = 8  # Le colonne numeriche iniziano a offset multipli di 8
+
+# Struttura del file:
+#   MAGIC | inizio delle colonne (uint64) | intestazione JSON | colonne
+# L'intestazione indica per ogni tabella il numero di righe e, per ogni
+# colonna, dtype, offset e numero di elementi. Le colonne di testo sono un
+# array di offset (n + 1 elementi) più un blocco di byte UTF-8: la stringa i
+# occupa i byte [offsets[i], offsets[i + 1]).
+#
+# Tabelle:
+#   tracks:    brani distinti (id, name, album, release_date, duration_ms,
+#              popularity, release_year, artist_start: inizio in track_artists)
+#   track_artists: artist (riga in artists) per ogni brano, in ordine
+#   artists:   id, name
+#   saved:     track (riga in tracks), added_at (secondi Unix)
+#   playlists: id, name, owner, snapshot_id, public, total,
+#              entry_start (inizio in entries)
+#   entries:   track, added_at dei brani di ogni playlist, in ordine
+
+
+def _parse_timestamp(value):
+    """
+    Converte una data ISO 8601 (es. "2024-05-01T10:00:00Z") in secondi Unix (0 se assente)
+    """
+    if not value:
+        return 0
+    return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp())
+
+
+def _format_timestamp(seconds):
+    """
+    Converte secondi Unix nel formato ISO usato dall'API
+    """
+    if not seconds:
+        return ''
+    return datetime.fromtimestamp(int(seconds), timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _string_pool(strings):
+    """
+    Codifica una lista di stringhe come (array di offset, byte UTF-8)
+    """
+    encoded = [(s or '').encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+    if encoded:
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, b''.join(encoded)
+
+
+class _SnapshotBuilder:
+    """
+    Raccoglie brani, artisti e playlist in colonne prima della scrittura
+    """
+    def __init__(self):
+        self.track_rows = {}
+        self.artist_rows = {}
+        self.tracks = {'id': [], 'name': [], 'album': [], 'release_date': [], 'duration_ms': [],
+                       'popularity': [], 'release_year': [], 'artist_start': [0]}
+        self.track_artists = []
+        self.artists = {'id': [], 'name': []}
+
+    def _artist_row(self, artist):
+        row = self.artist_rows.get(artist['id'])
+
+        if row is None:
+            row = len(self.artists['id'])
+            self.artist_rows[artist['id']] = row
+            self.artists['id'].append(artist['id'])
+            self.artists['name'].append(artist.get('name') or '')
+
+        return row
+
+    def track_row(self, track):
+        """
+        Riga del brano nella tabella tracks (None per brani senza ID, es. file locali)
+        """
+        if not track or not track.get('id'):
+            return None
+
+        row = self.track_rows.get(track['id'])
+        if row is not None:
+            return row
+
+        row = len(self.tracks['id'])
+        self.track_rows[track['id']] = row
+
+        album = track.get('album') or {}
+        release_date = album.get('release_date') or ''
+        self.tracks['id'].append(track['id'])
+        self.tracks['name'].append(track.get('name') or '')
+        self.tracks['album'].append(album.get('name') or '')
+        self.tracks['release_date'].append(release_date)
+        self.tracks['duration_ms'].append(track.get('duration_ms') or 0)
+        self.tracks['popularity'].append(track.get('popularity') or 0)
+        self.tracks['release_year'].append(int(release_date[:4]) if release_date[:4].isdigit() else 0)
+
+        for artist in track.get('artists') or []:
+            if artist.get('id'):
+                self.track_artists.append(self._artist_row(artist))
+        self.tracks['artist_start'].append(len(self.track_artists))
+
+        return row
+
+    def items_columns(self, items):
+        """
+        Colonne (track, added_at) di una lista di items con 'track' e 'added_at'
+        """
+        rows = []
+        added_at = []
+
+        for item in items:
+            row = self.track_row(item.get('track'))
+            if row is not None:
+                rows.append(row)
+                added_at.append(_parse_timestamp(item.get('added_at')))
+
+        return rows, added_at
+
+
+def write_snapshot(path, saved_items, playlists=None, playlist_items=None):
+    """
+    Scrive lo snapshot colonnare della libreria
+
+    Args:
+        path: File dello snapshot
+        saved_items: Items dei brani salvati (da get_all_saved_tracks)
+        playlists: Playlist dell'utente (da get_all_user_playlists, opzionale)
+        playlist_items: Dizionario {playlist_id: items della playlist} (opzionale)
+
+    Returns:
+        dict: Righe scritte per tabella
+    """
+    builder = _SnapshotBuilder()
+    playlists = playlists or []
+    playlist_items = playlist_items or {}
+
+    saved_rows, saved_added = builder.items_columns(saved_items)
+
+    entry_rows = []
+    entry_added = []
+    entry_start = [0]
+    for playlist in playlists:
+        rows, added_at = builder.items_columns(playlist_items.get(playlist['id']) or [])
+        entry_rows.extend(rows)
+        entry_added.extend(added_at)
+        entry_start.append(len(entry_rows))
+
+    tables = {
+        'tracks': (len(builder.tracks['id']), {
+            'id': builder.tracks['id'],
+            'name': builder.tracks['name'],
+            'album': builder.tracks['album'],
+            'release_date': builder.tracks['release_date'],
+            'duration_ms': np.array(builder.tracks['duration_ms'], dtype='<i4'),
+            'popularity': np.array(builder.tracks['popularity'], dtype='<i2'),
+            'release_year': np.array(builder.tracks['release_year'], dtype='<i2'),
+            'artist_start': np.array(builder.tracks['artist_start'], dtype='<u4')
+        }),
+        'track_artists': (len(builder.track_artists), {
+            'artist': np.array(builder.track_artists, dtype='<i4')
+        }),
+        'artists': (len(builder.artists['id']), builder.artists),
+        'saved': (len(saved_rows), {
+            'track': np.array(saved_rows, dtype='<i4'),
+            'added_at': np.array(saved_added, dtype='<i8')
+        }),
+        'playlists': (len(playlists), {
+            'id': [p['id'] for p in playlists],
+            'name': [p.get('name') or '' for p in playlists],
+            'owner': [(p.get('owner') or {}).get('display_name') or '' for p in playlists],
+            'snapshot_id': [p.get('snapshot_id') or '' for p in playlists],
+            'public': np.array([bool(p.get('public')) for p in playlists], dtype='u1'),
+            'total': np.array([(p.get('tracks') or {}).get('total', 0) for p in playlists], dtype='<i4'),
+            'entry_start': np.array(entry_start, dtype='<u8')
+        }),
+        'entries': (len(entry_rows), {
+            'track': np.array(entry_rows, dtype='<i4'),
+            'added_at': np.array(entry_added, dtype='<i8')
+        })
+    }
+
+    # Prima si calcola la posizione di ogni blocco, poi si scrive tutto in ordine
+    blocks = []
+    header = {'version': FORMAT_VERSION, 'created': datetime.now().strftime('%Y-%m-%d %H:%M'), 'tables': {}}
+    position = 0
+
+    def place(data):
+        nonlocal position
+        position += -position % ALIGNMENT
+        offset = position
+        blocks.append((offset, data))
+        position += len(data)
+        return offset
+
+    for table, (rows, columns) in tables.items():
+        specs = {}
+        for name, values in columns.items():
+            if isinstance(values, np.ndarray):
+                specs[name] = {'dtype': values.dtype.str, 'offset': place(values.tobytes()), 'count': len(values)}
+            else:
+                offsets, data = _string_pool(values)
+                specs[name] = {'dtype': 'str', 'offset': place(offsets.tobytes()), 'count': len(offsets),
+                               'data': place(data), 'size': len(data)}
+        header['tables'][table] = {'rows': rows, 'columns': specs}
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    prefix = len(MAGIC) + 8 + len(header_bytes)
+    data_start = prefix + (-prefix % ALIGNMENT)
+
+    # Scrittura atomica: prima un file temporaneo, poi la sostituzione
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', data_start))
+        f.write(header_bytes)
+        for offset, data in blocks:
+            f.write(b'\0' * (data_start + offset - f.tell()))
+            f.write(data)
+    os.replace(tmp_path, path)
+
+    return {table: rows for table, (rows, _) in tables.items()}
+
+
+class StringColumn(Sequence):
+    """
+    Colonna di testo letta direttamente dalla mappa del file
+
+    Le stringhe vengono decodificate solo quando richieste. Con rows la
+    colonna è una vista sulle righe indicate (es. i brani salvati).
+    """
+    def __init__(self, offsets, buffer, base, rows=None):
+        self.offsets = offsets
+        self.buffer = buffer
+        self.base = base
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.offsets) - 1 if self.rows is None else len(self.rows)
+
+    def _decode(self, row):
+        start = self.base + int(self.offsets[row])
+        end = self.base + int(self.offsets[row + 1])
+        return self.buffer[start:end].decode('utf-8')
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError(index)
+            return self._decode(index if self.rows is None else int(self.rows[index]))
+
+        # Slice, array di indici o maschera booleana: array di stringhe
+        rows = np.arange(len(self))[index] if self.rows is None else self.rows[index]
+        return np.array([self._decode(int(row)) for row in rows], dtype=object)
+
+    def take(self, rows):
+        """
+        Vista della colonna sulle righe indicate, senza decodificare nulla
+        """
+        rows = np.asarray(rows)
+        return StringColumn(self.offsets, self.buffer, self.base, rows if self.rows is None else self.rows[rows])
+
+
+class TrackItemsView(Sequence):
+    """
+    Sequenza di items {'added_at', 'track'} ricostruiti su richiesta dallo snapshot
+
+    Ha la stessa forma degli items dell'API, quindi funziona con le funzioni
+    di visualizzazione e di raggruppamento esistenti; un item viene creato
+    solo quando viene letto (es. la pagina visualizzata).
+    """
+    def __init__(self, snapshot, track_rows, added_at):
+        """
+        Args:
+            snapshot: LibrarySnapshot
+            track_rows: Righe della tabella tracks (array NumPy)
+            added_at: Secondi Unix di aggiunta, uno per riga
+        """
+        self.snapshot = snapshot
+        self.track_rows = track_rows
+        self.added_at = added_at
+
+    def __len__(self):
+        return len(self.track_rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._item(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._item(index)
+
+    def _item(self, index):
+        return {
+            'added_at': _format_timestamp(self.added_at[index]),
+            'track': self.snapshot.track(int(self.track_rows[index]))
+        }
+
+    def primary_artist_rows(self):
+        """
+        Riga nella tabella artists dell'artista principale di ogni brano (-1 se assente)
+        """
+        snapshot = self.snapshot
+        start = snapshot.column('tracks', 'artist_start')
+        track_artists = snapshot.column('track_artists', 'artist')
+
+        first = start[self.track_rows].astype(np.int64)
+        has_artist = start[self.track_rows + 1] > first
+        rows = np.full(len(self), -1, dtype=np.int64)
+        rows[has_artist] = track_artists[first[has_artist]]
+        return rows
+
+    def group_by_genre(self, client, min_tracks=5):
+        """
+        Raggruppa i brani per macro-genere dell'artista principale
+
+        Equivalente a SpotifyClient.group_tracks_by_genre, ma lavora sulle
+        colonne: si caricano solo gli artisti distinti e i brani vengono
+        assegnati al genere con operazioni vettoriali.
+
+        Args:
+            client: SpotifyClient
+            min_tracks: Numero minimo di brani per genere (gli altri vanno in 'Other')
+
+        Returns:
+            dict: Dizionario {genere: TrackView dei brani}
+        """
+        artist_rows = self.primary_artist_rows()
+        valid = np.nonzero(artist_rows >= 0)[0]
+        unique_rows, codes = np.unique(artist_rows[valid], return_inverse=True)
+
+        artist_ids = self.snapshot.strings('artists', 'id')
+        unique_ids = [artist_ids[int(row)] for row in unique_rows]
+
+        print(f"\n🔍 Analizzo {len(self)} brani per genere ({len(unique_ids)} artisti)...")
+        artist_genres = macro_genres_for_artists(client, unique_ids)
+
+        genre_names, artist_genre_codes = np.unique(
+            np.array([artist_genres.get(a, UNKNOWN_GENRE) for a in unique_ids] + [UNKNOWN_GENRE], dtype=object),
+            return_inverse=True
+        )
+        track_genres = artist_genre_codes[:-1][codes]
+        counts = np.bincount(track_genres, minlength=len(genre_names))
+
+        # I generi con pochi brani confluiscono in 'Other'
+        other = int(np.nonzero(genre_names == UNKNOWN_GENRE)[0][0])
+        track_genres = np.where(counts[track_genres] >= min_tracks, track_genres, other)
+
+        groups = {}
+        for code in np.unique(track_genres):
+            positions = valid[track_genres == code]
+            groups[str(genre_names[code])] = TrackView(self.snapshot, self.track_rows[positions],
+                                                       self.added_at[positions])
+        return groups
+
+
+class TrackView(TrackItemsView):
+    """
+    Come TrackItemsView, ma gli elementi sono i brani (senza 'added_at')
+    """
+    def _item(self, index):
+        return self.snapshot.track(int(self.track_rows[index]))
+
+
+class LibrarySnapshot:
+    """
+    Snapshot colonnare della libreria aperto con mmap
+
+    L'apertura legge solo l'intestazione: ogni colonna è un array NumPy in
+    sola lettura che punta direttamente alla mappa del file, e il sistema
+    operativo carica dal disco solo le pagine delle colonne usate.
+
+    Uso:
+        with LibrarySnapshot('library.snap') as snapshot:
+            summarize_library(snapshot.library_columns(artist_genres))
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path: File dello snapshot (scritto da write_snapshot)
+        """
+        self.path = path
+
+        with open(path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.buffer[:len(MAGIC)] != MAGIC:
+            self.buffer.close()
+            raise ValueError(f"'{path}' non è uno snapshot della libreria")
+
+        (self.data_start,) = struct.unpack_from('<Q', self.buffer, len(MAGIC))
+        header = json.loads(self.buffer[len(MAGIC) + 8:self.data_start].rstrip(b'\0'))
+
+        if header.get('version') != FORMAT_VERSION:
+            self.buffer.close()
+            raise ValueError(f"Versione dello snapshot non supportata: {header.get('version')}")
+
+        self.created = header['created']
+        self.tables = header['tables']
+        self.cache = {}
+
+    @property
+    def saved_count(self):
+        return self.tables['saved']['rows']
+
+    def _spec(self, table, name):
+        return self.tables[table]['columns'][name]
+
+    def column(self, table, name):
+        """
+        Colonna numerica come array NumPy in sola lettura (nessuna copia)
+        """
+        key = (table, name)
+        if key not in self.cache:
+            spec = self._spec(table, name)
+            self.cache[key] = np.frombuffer(self.buffer, dtype=spec['dtype'], count=spec['count'],
+                                            offset=self.data_start + spec['offset'])
+        return self.cache[key]
+
+    def strings(self, table, name):
+        """
+        Colonna di testo (StringColumn, decodificata su richiesta)
+        """
+        key = (table, name)
+        if key not in self.cache:
+            spec = self._spec(table, name)
+            offsets = np.frombuffer(self.buffer, dtype='<u8', count=spec['count'],
+                                    offset=self.data_start + spec['offset'])
+            self.cache[key] = StringColumn(offsets, self.buffer, self.data_start + spec['data'])
+        return self.cache[key]
+
+    def track(self, row):
+        """
+        Brano della tabella tracks nella forma dell'API
+        """
+        track_id = self.strings('tracks', 'id')[row]
+        start = self.column('tracks', 'artist_start')
+        artist_rows = self.column('track_artists', 'artist')[start[row]:start[row + 1]]
+        artist_ids = self.strings('artists', 'id')
+        artist_names = self.strings('artists', 'name')
+
+        return {
+            'id': track_id,
+            'uri': f'spotify:track:{track_id}',
+            'name': self.strings('tracks', 'name')[row],
+            'artists': [{'id': artist_ids[int(a)], 'name': artist_names[int(a)]} for a in artist_rows],
+            'album': {
+                'name': self.strings('tracks', 'album')[row],
+                'release_date': self.strings('tracks', 'release_date')[row]
+            },
+            'duration_ms': int(self.column('tracks', 'duration_ms')[row]),
+            'popularity': int(self.column('tracks', 'popularity')[row]),
+            'external_urls': {'spotify': f'https://open.spotify.com/track/{track_id}'}
+        }
+
+    def saved_tracks(self):
+        """
+        Brani salvati come sequenza di items (TrackItemsView)
+        """
+        return TrackItemsView(self, self.column('saved', 'track'), self.column('saved', 'added_at'))
+
+    def playlists(self):
+        """
+        Playlist salvate nello snapshot, nella forma dell'API
+
+        Returns:
+            list: Lista di playlist (id, name, owner, public, snapshot_id, tracks.total)
+        """
+        ids = self.strings('playlists', 'id')
+        names = self.strings('playlists', 'name')
+        owners = self.strings('playlists', 'owner')
+        snapshot_ids = self.strings('playlists', 'snapshot_id')
+        public = self.column('playlists', 'public')
+        total = self.column('playlists', 'total')
+
+        return [
+            {
+                'id': ids[i],
+                'name': names[i],
+                'owner': {'display_name': owners[i]},
+                'public': bool(public[i]),
+                'snapshot_id': snapshot_ids[i],
+                'tracks': {'total': int(total[i])},
+                'external_urls': {'spotify': f'https://open.spotify.com/playlist/{ids[i]}'}
+            }
+            for i in range(len(ids))
+        ]
+
+    def playlist_tracks(self, playlist_id):
+        """
+        Brani di una playlist come sequenza di items (TrackItemsView)
+
+        Raises:
+            KeyError: Se la playlist non è nello snapshot
+        """
+        ids = self.strings('playlists', 'id')
+        for i in range(len(ids)):
+            if ids[i] == playlist_id:
+                start = self.column('playlists', 'entry_start')
+                rows = slice(int(start[i]), int(start[i + 1]))
+                return TrackItemsView(self, self.column('entries', 'track')[rows],
+                                      self.column('entries', 'added_at')[rows])
+        raise KeyError(playlist_id)
+
+    def library_columns(self, artist_genres=None):
+        """
+        Colonne dei brani salvati per analytics e smart playlist
+
+        Le colonne numeriche sono ricavate dalla mappa del file, i testi
+        restano StringColumn: vengono decodificati solo i valori usati.
+
+        Args:
+            artist_genres: Dizionario {artist_id: macro-genere} (opzionale)
+
+        Returns:
+            LibraryColumns: Colonne della libreria
+        """
+        artist_genres = artist_genres or {}
+        saved = self.saved_tracks()
+        track_rows = saved.track_rows
+        artist_rows = saved.primary_artist_rows()
+
+        # I brani senza artista (rari) vengono esclusi come in from_saved_tracks
+        keep = np.nonzero(artist_rows >= 0)[0]
+        if len(keep) < len(saved):
+            track_rows = track_rows[keep]
+            artist_rows = artist_rows[keep]
+            added_at = saved.added_at[keep]
+        else:
+            added_at = saved.added_at
+
+        artist_ids = self.strings('artists', 'id')
+        artist_genre_labels = np.array(
+            [artist_genres.get(artist_id, UNKNOWN_GENRE) for artist_id in artist_ids] or [UNKNOWN_GENRE],
+            dtype=object
+        )
+        genre_names, artist_genre_codes = np.unique(artist_genre_labels, return_inverse=True)
+
+        return LibraryColumns(
+            track_ids=self.strings('tracks', 'id').take(track_rows),
+            track_names=self.strings('tracks', 'name').take(track_rows),
+            duration_ms=self.column('tracks', 'duration_ms')[track_rows].astype(np.int64),
+            popularity=self.column('tracks', 'popularity')[track_rows],
+            added_at=added_at.view('datetime64[s]'),
+            release_year=self.column('tracks', 'release_year')[track_rows],
+            artist_codes=artist_rows.astype(np.int32),
+            artist_ids=artist_ids,
+            artist_names=self.strings('artists', 'name'),
+            genre_codes=artist_genre_codes[artist_rows].astype(np.int32),
+            genre_names=genre_names
+        )
+
+    def artist_genres(self, client):
+        """
+        Macro-genere degli artisti principali dei brani salvati
+
+        Args:
+            client: SpotifyClient
+
+        Returns:
+            dict: Dizionario {artist_id: macro-genere}
+        """
+        artist_rows = self.saved_tracks().primary_artist_rows()
+        artist_ids = self.strings('artists', 'id')
+        return macro_genres_for_artists(client, [artist_ids[int(r)] for r in np.unique(artist_rows[artist_rows >= 0])])
+
+    def close(self):
+        self.cache = {}
+        try:
+            self.buffer.close()
+        except BufferError:
+            # Qualche array punta ancora alla mappa: verrà chiusa quando sarà liberato
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,271 @@
+"""
+Test di carico: molti utenti simulati (un SpotifyClient ciascuno) contro il server locale di stub_server.py
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import resource
+import threading
+import time
+
+import numpy as np
+
+from spotify_client import SpotifyClient
+from retry import RetryPolicy, CircuitBreaker
+from stub_server import StubSpotifyServer, RemoteStub
+
+
+OPERATIONS = ('search', 'library', 'genre_split')
+
+
+def current_rss():
+    """
+    Memoria residente attuale del processo in byte (0 se non disponibile)
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def peak_rss():
+    """
+    Picco di memoria residente dall'avvio del processo in byte
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux restituisce kilobyte, macOS byte
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+class _RSSSampler:
+    """
+    Thread che registra il massimo della memoria residente durante una fase
+    """
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.max_rss = current_rss()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.max_rss = max(self.max_rss, current_rss())
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+
+def _serve_stub(options, ready):
+    """
+    Avvia lo stub in un processo separato, così non contende il GIL ai client
+    """
+    stub = StubSpotifyServer(**options)
+    ready.put(stub.base_url)
+    stub.server.serve_forever()
+
+
+@contextlib.contextmanager
+def stub_process(**options):
+    """
+    Context manager che avvia StubSpotifyServer in un altro processo
+
+    Args:
+        **options: Argomenti di StubSpotifyServer
+
+    Yields:
+        RemoteStub: Controllo dello stub
+    """
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve_stub, args=(options, ready), daemon=True)
+    process.start()
+    try:
+        yield RemoteStub(ready.get(timeout=10))
+    finally:
+        process.terminate()
+        process.join()
+
+
+def simulate_user(client, user_index, iterations, min_tracks, latencies, errors):
+    """
+    Sessione di un utente: ricerche, lettura della libreria e divisione per genere
+
+    Args:
+        client: SpotifyClient dell'utente
+        user_index: Indice dell'utente (varia le ricerche)
+        iterations: Numero di ripetizioni dello scenario
+        min_tracks: Minimo di brani per genere nella divisione
+        latencies: Dizionario {operazione: lista} dove aggiungere le durate
+        errors: Lista dove aggiungere gli errori
+    """
+    for iteration in range(iterations):
+        steps = (
+            ('search', lambda: client.search_artist(f'artist {(user_index + iteration) % 50}', limit=10)),
+            ('library', client.get_all_saved_tracks),
+        )
+
+        saved_tracks = None
+        for name, step in steps:
+            start = time.perf_counter()
+            try:
+                result = step()
+                latencies[name].append(time.perf_counter() - start)
+                if name == 'library':
+                    saved_tracks = result
+            except Exception as e:
+                errors.append(f"{name}: {e!r}")
+
+        if saved_tracks is None:
+            continue
+
+        start = time.perf_counter()
+        try:
+            client.group_tracks_by_genre(saved_tracks, min_tracks)
+            latencies['genre_split'].append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(f"genre_split: {e!r}")
+
+
+def run_stage(stub, users, iterations=1, min_tracks=5, retry_policy=None):
+    """
+    Esegue lo scenario con un certo numero di utenti contemporanei
+
+    Ogni utente ha il suo client (token, sessione HTTP e cache degli artisti
+    separati), come utenti diversi dello stesso processo.
+
+    Args:
+        stub: StubSpotifyServer o RemoteStub in esecuzione
+        users: Numero di utenti simulati
+        iterations: Ripetizioni dello scenario per utente
+        min_tracks: Minimo di brani per genere
+        retry_policy: RetryPolicy dei client (default: RetryPolicy())
+
+    Returns:
+        dict: Statistiche della fase
+    """
+    stub.reset_stats()
+    latencies = {name: [] for name in OPERATIONS}
+    errors = []
+
+    clients = [
+        SpotifyClient('load-id', 'load-secret', api_url=stub.api_url, auth_url=stub.auth_url,
+                      user_access_token=f'stub-user-{i}', retry_policy=retry_policy,
+                      circuit_breaker=CircuitBreaker(failure_threshold=50))
+        for i in range(users)
+    ]
+
+    barrier = threading.Barrier(users + 1)
+
+    def worker(index):
+        barrier.wait()
+        simulate_user(clients[index], index, iterations, min_tracks, latencies, errors)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(users)]
+    rss_before = current_rss()
+
+    # I client stampano l'avanzamento: con centinaia di utenti si silenzia l'output
+    with contextlib.redirect_stdout(io.StringIO()), _RSSSampler() as sampler:
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+    server_stats = stub.stats()
+    operations = sum(len(values) for values in latencies.values())
+    http_requests = sum(client.request_count for client in clients)
+
+    return {
+        'users': users,
+        'elapsed': elapsed,
+        'operations': operations,
+        'throughput': operations / elapsed if elapsed else 0.0,
+        'http_requests': http_requests,
+        'http_per_second': http_requests / elapsed if elapsed else 0.0,
+        'rate_limited': server_stats['counts'].get('rate_limited', 0),
+        'max_concurrent': server_stats['max_active'],
+        'errors': errors,
+        'latency': {
+            name: np.percentile(values, [50, 95, 99]) if values else None
+            for name, values in latencies.items()
+        },
+        'rss_before': rss_before,
+        'rss_max': sampler.max_rss,
+        'peak_rss': peak_rss()
+    }
+
+
+def display_stage(stats):
+    """
+    Stampa le statistiche di una fase
+    """
+    mb = 1024 * 1024
+    print(f"\n👥 {stats['users']} utenti — {stats['elapsed']:.1f}s")
+    print(f"   Operazioni: {stats['operations']} ({stats['throughput']:.1f}/s), "
+          f"richieste HTTP: {stats['http_requests']} ({stats['http_per_second']:.0f}/s)")
+    print(f"   Risposte 429: {stats['rate_limited']}, richieste contemporanee al server (max): {stats['max_concurrent']}")
+    print(f"   RSS: {stats['rss_before'] / mb:.0f} MB -> max {stats['rss_max'] / mb:.0f} MB "
+          f"(picco del processo {stats['peak_rss'] / mb:.0f} MB)")
+
+    print(f"   {'Operazione':<12} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, percentiles in stats['latency'].items():
+        if percentiles is None:
+            print(f"   {name:<12} {'-':>9} {'-':>9} {'-':>9}")
+        else:
+            p50, p95, p99 = percentiles * 1000
+            print(f"   {name:<12} {p50:>7.0f}ms {p95:>7.0f}ms {p99:>7.0f}ms")
+
+    if stats['errors']:
+        print(f"   ❌ {len(stats['errors'])} errori (es. {stats['errors'][0]})")
+
+
+def main():
+    """
+    Funzione principale
+    """
+    parser = argparse.ArgumentParser(description="Test di carico multi-utente contro un'API simulata")
+    parser.add_argument('--users', default='50,100,200,500', help="Numeri di utenti da provare, separati da virgole")
+    parser.add_argument('--iterations', type=int, default=1, help="Ripetizioni dello scenario per utente")
+    parser.add_argument('--library-size', type=int, default=500, help="Brani salvati di ogni utente")
+    parser.add_argument('--latency', type=float, default=0.02, help="Latenza aggiunta dal server (secondi)")
+    parser.add_argument('--rate-limit-ratio', type=float, default=0.01, help="Frazione di risposte 429")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After delle risposte 429 (secondi)")
+    parser.add_argument('--in-process', action='store_true',
+                        help="Esegue lo stub nello stesso processo (più semplice, ma contende il GIL ai client)")
+    args = parser.parse_args()
+
+    user_counts = [int(n) for n in args.users.split(',') if n.strip()]
+
+    options = {'library_size': args.library_size, 'latency': args.latency,
+               'rate_limit_ratio': args.rate_limit_ratio, 'retry_after': args.retry_after}
+    stub_context = StubSpotifyServer(**options) if args.in_process else stub_process(**options)
+
+    print(f"🏋️  Test di carico: {args.library_size} brani per utente, latenza {args.latency * 1000:.0f} ms, "
+          f"{args.rate_limit_ratio * 100:.1f}% di risposte 429")
+
+    with stub_context as stub:
+        results = []
+        for users in user_counts:
+            stats = run_stage(stub, users, args.iterations, retry_policy=RetryPolicy(max_attempts=8))
+            display_stage(stats)
+            results.append(stats)
+
+    print(f"\n{'Utenti':>7} {'op/s':>8} {'HTTP/s':>8} {'p99 libreria':>13} {'429':>6} {'RSS max':>9}")
+    for stats in results:
+        library = stats['latency']['library']
+        p99 = f"{library[2] * 1000:.0f}ms" if library is not None else '-'
+        print(f"{stats['users']:>7} {stats['throughput']:>8.1f} {stats['http_per_second']:>8.0f} "
+              f"{p99:>13} {stats['rate_limited']:>6} {stats['rss_max'] / 1024 / 1024:>7.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
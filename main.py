@@ -1,15 +1,34 @@
 """
 Script principale per cercare artisti e canzoni su Spotify
 """
+import os
+import sys
+
 from spotify_client import SpotifyClient
 from utils import (
     display_artists, 
     display_tracks, 
     display_saved_tracks, 
     display_top_items,
-    display_playlists
+    display_playlists,
+    display_library_summary,
+    display_cost_plan,
+    display_albums
 )
-from config import CLIENT_ID, CLIENT_SECRET, REDIRECT_URI
+from analytics import LibraryColumns, artist_macro_genres, summarize_library
+from artist_graph import create_discovery_playlist
+from smart_playlists import load_rules, evaluate_rules, sync_smart_playlists
+from playlist_cache import PlaylistCache
+from cost_planner import plan_saved_tracks_playlist, plan_genre_playlists
+from library_snapshot import LibrarySnapshot, write_snapshot
+from search_engine import SearchEngine, build_query
+from mood_clusters import AudioFeatureCache
+from playlist_reorder import reorder_playlist, SORT_FIELDS
+from library_export import EXPORT_FORMATS, export_library, import_playlist
+from release_radar import RadarState, run_radar
+from profiling import FlowProfiler
+from config import (CLIENT_ID, CLIENT_SECRET, REDIRECT_URI, PLAYLIST_CACHE_DIR, PROFILE, LIBRARY_SNAPSHOT_FILE,
+                    AUDIO_FEATURES_CACHE, EXPORT_DIR, RELEASE_RADAR_STATE)
 
 
 def menu():
@@ -29,10 +48,47 @@ def menu():
     print("8. Crea playlist dai top brani")
     print("9. Crea playlist dai brani salvati")
     print("10. 🎨 Dividi brani per genere (AUTO)")
-    print("11. Esci")
+    print("11. 📊 Analizza la libreria")
+    print("12. 💿 Crea playlist con la discografia di un artista")
+    print("13. 🧭 Crea playlist di scoperta (artisti correlati)")
+    print("14. 🧠 Aggiorna le smart playlist (da file di regole)")
+    print("15. 💾 Salva uno snapshot locale della libreria")
+    print("16. 🔎 Ricerca avanzata (più tipi, filtri, oltre la prima pagina)")
+    print("17. 🎚️  Dividi brani per mood (audio features)")
+    print("18. 🔀 Riordina una playlist")
+    print("19. 📤 Esporta la libreria (JSONL, CSV, M3U)")
+    print("20. 📥 Importa una playlist da file")
+    print("21. 📡 Radar delle nuove uscite degli artisti seguiti")
+    print("22. Esci")
     print("="*60)
     
-    return input("Scegli un'opzione (1-11): ")
+    return input("Scegli un'opzione (1-22): ")
+
+
+def open_library_snapshot():
+    """
+    Propone di usare lo snapshot locale della libreria, se esiste
+    
+    Returns:
+        LibrarySnapshot: Snapshot aperto, oppure None per usare l'API
+    """
+    if not os.path.exists(LIBRARY_SNAPSHOT_FILE):
+        return None
+    
+    try:
+        snapshot = LibrarySnapshot(LIBRARY_SNAPSHOT_FILE)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Snapshot locale non leggibile: {e}")
+        return None
+    
+    answer = input(f"\n💾 Usare lo snapshot locale del {snapshot.created} "
+                   f"({snapshot.saved_count} brani)? (s/n, default s): ").lower()
+    
+    if answer == 'n':
+        snapshot.close()
+        return None
+    
+    return snapshot
 
 
 def search_artist_flow(client):
@@ -63,6 +119,54 @@ def search_track_flow(client):
         print(f"❌ Errore: {e}")
 
 
+def advanced_search_flow(client):
+    """
+    Flusso per la ricerca su più tipi con filtri e più pagine di risultati
+    """
+    print("\n" + "="*60)
+    print("🔎 RICERCA AVANZATA")
+    print("="*60)
+    
+    text = input("\nTesto da cercare (anche vuoto): ").strip()
+    artist = input("Filtro artista (invio per nessuno): ").strip()
+    year = input("Filtro anno o intervallo, es. 1990-1999 (invio per nessuno): ").strip()
+    genre = input("Filtro genere (invio per nessuno): ").strip()
+    
+    types_input = input("Tipi da cercare: artist, album, track (default artist,track): ").strip()
+    types = [t.strip() for t in types_input.split(',') if t.strip()] or ['artist', 'track']
+    
+    max_input = input("Risultati massimi per tipo (default 100, max 1000): ").strip()
+    try:
+        max_results = int(max_input) if max_input else 100
+    except ValueError:
+        max_results = 100
+    
+    try:
+        query = build_query(text, artist=artist, year=year, genre=genre)
+        if not query:
+            print("❌ Inserisci un testo o almeno un filtro.")
+            return
+        
+        print(f"\nCerco '{query}'...")
+        
+        results = {search_type: [] for search_type in types}
+        for search_type, item in SearchEngine(client).stream(query, types, max_results):
+            results[search_type].append(item)
+            
+            found = sum(len(items) for items in results.values())
+            if found % 50 == 0:
+                print(f"  Trovati {found} risultati...")
+        
+        if 'artist' in results:
+            display_artists(results['artist'])
+        if 'album' in results:
+            display_albums(results['album'], compact=True, page_size=50)
+        if 'track' in results:
+            display_tracks(results['track'], compact=True, page_size=50)
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+
+
 def view_saved_tracks_flow(client):
     """
     Flusso per visualizzare i brani preferiti
@@ -75,8 +179,17 @@ def view_saved_tracks_flow(client):
             display_saved_tracks(result['items'])
             print(f"\nTotale brani salvati nel tuo account: {result['total']}")
         else:
-            tracks = client.get_all_saved_tracks()
-            display_saved_tracks(tracks)
+            snapshot = open_library_snapshot()
+            tracks = snapshot.saved_tracks() if snapshot else client.get_all_saved_tracks()
+            
+            mode = input("\nVisualizzazione:\n1. Tabella compatta\n2. A pagine (50 per pagina)\n3. Completa\nScelta (1-3): ")
+            
+            if mode == '1':
+                display_saved_tracks(tracks, compact=True)
+            elif mode == '2':
+                display_saved_tracks(tracks, page_size=50)
+            else:
+                display_saved_tracks(tracks)
     
     except Exception as e:
         print(f"❌ Errore: {e}")
@@ -143,8 +256,14 @@ def view_playlists_flow(client):
     Flusso per visualizzare le playlist
     """
     try:
-        print("\nRecupero le tue playlist...")
-        playlists = client.get_user_playlists(limit=50)
+        snapshot = open_library_snapshot()
+        
+        if snapshot:
+            playlists = snapshot.playlists()
+        else:
+            print("\nRecupero le tue playlist...")
+            playlists = client.get_user_playlists(limit=50)
+        
         display_playlists(playlists)
     except Exception as e:
         print(f"❌ Errore: {e}")
@@ -285,7 +404,13 @@ def create_playlist_from_saved_flow(client):
     except ValueError:
         max_tracks = None
     
+    dry_run = input("Solo stima dei costi, senza creare nulla? (s/n, default n): ").lower() == 's'
+    
     try:
+        if dry_run:
+            display_cost_plan(plan_saved_tracks_playlist(client, name, max_tracks))
+            return
+        
         client.create_playlist_from_saved_tracks(name, max_tracks)
     except Exception as e:
         print(f"❌ Errore: {e}")
@@ -315,8 +440,367 @@ def create_playlists_by_genre_flow(client):
     public_choice = input("Creare playlist pubbliche? (s/n, default n): ").lower()
     make_public = public_choice == 's'
     
+    weighted_choice = input("Considerare tutti gli artisti e tutti i generi di ogni brano? (s/n, default n): ").lower()
+    weighted = weighted_choice == 's'
+    multi_label = False
+    
+    if weighted:
+        multi_choice = input("Un brano può finire in più playlist? (s/n, default n): ").lower()
+        multi_label = multi_choice == 's'
+    
+    dry_run = input("Solo stima dei costi, senza creare nulla? (s/n, default n): ").lower() == 's'
+    
+    try:
+        if dry_run:
+            display_cost_plan(plan_genre_playlists(client, min_tracks, weighted, multi_label))
+            return
+        
+        snapshot = open_library_snapshot()
+        client.create_playlists_by_genre(min_tracks, make_public, weighted=weighted, multi_label=multi_label,
+                                         saved_tracks=snapshot.saved_tracks() if snapshot else None)
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+
+
+def create_playlists_by_mood_flow(client):
+    """
+    Flusso per creare playlist divise per mood
+    """
+    print("\n" + "="*60)
+    print("🎚️  CREAZIONE PLAYLIST PER MOOD")
+    print("="*60)
+    print("\nQuesta funzione:")
+    print("  • Recupera le audio features dei tuoi brani salvati")
+    print("  • Li raggruppa per energia, positività, tempo, ballabilità e acusticità")
+    print("  • Crea una playlist per ogni mood (es. Workout, Focus, Chill)")
+    print("="*60)
+    
+    clusters_input = input("\nNumero di playlist da creare (default 5): ").strip()
+    
+    try:
+        n_clusters = max(1, int(clusters_input)) if clusters_input else 5
+    except ValueError:
+        n_clusters = 5
+    
+    make_public = input("Creare playlist pubbliche? (s/n, default n): ").lower() == 's'
+    
+    try:
+        snapshot = open_library_snapshot()
+        client.create_playlists_by_mood(n_clusters, make_public,
+                                        saved_tracks=snapshot.saved_tracks() if snapshot else None,
+                                        feature_cache=AudioFeatureCache(AUDIO_FEATURES_CACHE))
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+
+
+def reorder_playlist_flow(client):
+    """
+    Flusso per ordinare una playlist spostando il minor numero di brani
+    """
+    print("\n" + "="*60)
+    print("🔀 RIORDINA UNA PLAYLIST")
+    print("="*60)
+    
+    try:
+        print("\nRecupero le tue playlist...")
+        playlists = [p for p in client.get_all_user_playlists() if p]
+        display_playlists(playlists, compact=True)
+        
+        if not playlists:
+            return
+        
+        choice = input(f"\nNumero della playlist (1-{len(playlists)}): ").strip()
+        if not choice.isdigit() or not 1 <= int(choice) <= len(playlists):
+            print("❌ Scelta non valida")
+            return
+        playlist = playlists[int(choice) - 1]
+        
+        print(f"\nCampi disponibili: {', '.join(SORT_FIELDS)}")
+        sort_by = input("Ordina per (default added_at): ").strip() or 'added_at'
+        if sort_by not in SORT_FIELDS:
+            print("❌ Campo non valido")
+            return
+        descending = input("Ordine decrescente? (s/n, default n): ").lower() == 's'
+        
+        plan = reorder_playlist(client, playlist['id'], sort_by, descending, dry_run=True)
+        moves = len(plan['moves'])
+        
+        if not moves:
+            print(f"\n✓ '{playlist['name']}' è già in ordine")
+            return
+        
+        print(f"\n📋 Servono {moves} spostamenti per {plan['tracks']} brani")
+        if input("Procedere? (s/n): ").lower() != 's':
+            print("❌ Operazione annullata")
+            return
+        
+        result = reorder_playlist(client, playlist['id'], sort_by, descending)
+        
+        if result['verified'] is False:
+            print("⚠️  L'ordine finale non corrisponde: la playlist è stata modificata nel frattempo?")
+        else:
+            print(f"\n✓ '{playlist['name']}' riordinata con {len(result['moves'])} spostamenti")
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+
+
+def library_analytics_flow(client):
+    """
+    Flusso per analizzare la libreria dei brani salvati
+    """
+    try:
+        snapshot = open_library_snapshot()
+        
+        if snapshot:
+            print("Recupero i generi degli artisti...")
+            columns = snapshot.library_columns(snapshot.artist_genres(client))
+        else:
+            tracks = client.get_all_saved_tracks()
+            
+            print("Recupero i generi degli artisti...")
+            artist_genres = artist_macro_genres(client, tracks)
+            
+            columns = LibraryColumns.from_saved_tracks(tracks, artist_genres)
+        
+        display_library_summary(summarize_library(columns))
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+
+
+def create_discography_playlist_flow(client):
+    """
+    Flusso per creare una playlist con tutta la discografia di un artista
+    """
+    print("\n" + "="*60)
+    print("💿 PLAYLIST DISCOGRAFIA")
+    print("="*60)
+    
+    artist_name = input("\nNome dell'artista: ").strip()
+    
+    if not artist_name:
+        print("❌ Il nome dell'artista non può essere vuoto")
+        return
+    
+    try:
+        artists = client.search_artist(artist_name, limit=5)
+        
+        if not artists:
+            print("❌ Nessun artista trovato")
+            return
+        
+        print("\nRisultati:")
+        for i, artist in enumerate(artists, 1):
+            print(f"{i}. {artist['name']} ({artist['followers']['total']:,} followers)")
+        
+        choice = input("\nScegli un artista (1-5): ")
+        
+        try:
+            artist = artists[int(choice) - 1]
+        except (ValueError, IndexError):
+            print("❌ Scelta non valida")
+            return
+        
+        include_choice = input("Includere anche i singoli? (s/n, default s): ").lower()
+        include_groups = 'album' if include_choice == 'n' else 'album,single'
+        
+        name = input("Nome della playlist (vuoto per default): ").strip()
+        
+        client.create_discography_playlist(artist['id'], name or None, include_groups)
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+
+
+def create_discovery_playlist_flow(client):
+    """
+    Flusso per creare una playlist di scoperta dagli artisti correlati
+    """
+    print("\n" + "="*60)
+    print("🧭 PLAYLIST DI SCOPERTA")
+    print("="*60)
+    
+    name = input("\nNome della playlist: ").strip()
+    
+    if not name:
+        name = "Discovery Mix"
+    
+    depth_input = input("Livelli di artisti correlati da esplorare (1-3, default 2): ").strip()
+    
+    try:
+        max_depth = int(depth_input) if depth_input else 2
+        max_depth = max(1, min(max_depth, 3))
+    except ValueError:
+        max_depth = 2
+    
+    try:
+        create_discovery_playlist(client, name, max_depth=max_depth)
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+
+
+def smart_playlists_flow(client):
+    """
+    Flusso per creare o aggiornare le smart playlist definite in un file di regole
+    """
+    print("\n" + "="*60)
+    print("🧠 SMART PLAYLIST")
+    print("="*60)
+    
+    path = input("\nFile delle regole (default smart_playlists.json): ").strip() or 'smart_playlists.json'
+    
+    try:
+        rules = load_rules(path)
+        
+        snapshot = open_library_snapshot()
+        
+        if snapshot:
+            columns = snapshot.library_columns(snapshot.artist_genres(client))
+        else:
+            tracks = client.get_all_saved_tracks()
+            columns = LibraryColumns.from_saved_tracks(tracks, artist_macro_genres(client, tracks))
+        
+        results = evaluate_rules(rules, columns)
+        
+        print("\n📊 Risultato delle regole:")
+        for name, track_uris in results.items():
+            print(f"  • {name}: {len(track_uris)} brani")
+        
+        confirm = input("\n✨ Sincronizzare le playlist su Spotify? (s/n): ").lower()
+        
+        if confirm != 's':
+            print("❌ Operazione annullata.")
+            return
+        
+        status = sync_smart_playlists(client, rules, results)
+        
+        print()
+        for name, state in status.items():
+            print(f"  • {name}: {state}")
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+
+
+def save_library_snapshot_flow(client):
+    """
+    Flusso per salvare brani salvati e playlist in uno snapshot locale
+    """
+    print("\n" + "="*60)
+    print("💾 SNAPSHOT LOCALE DELLA LIBRERIA")
+    print("="*60)
+    print(f"\nFile: {LIBRARY_SNAPSHOT_FILE}")
+    print("Visualizzazione, analisi e divisione per genere potranno usarlo")
+    print("invece di riscaricare la libreria.")
+    
+    include_playlists = input("\nIncludere anche le playlist? (s/n, default s): ").lower() != 'n'
+    
     try:
-        client.create_playlists_by_genre(min_tracks, make_public)
+        tracks = client.get_all_saved_tracks()
+        
+        playlists = []
+        playlist_items = {}
+        if include_playlists:
+            print("Recupero le playlist...")
+            playlists = client.get_all_user_playlists()
+            for i, playlist in enumerate(playlists, 1):
+                print(f"  [{i}/{len(playlists)}] {playlist['name']}")
+                playlist_items[playlist['id']] = client.get_playlist_tracks(playlist['id'], playlist.get('snapshot_id'))
+        
+        rows = write_snapshot(LIBRARY_SNAPSHOT_FILE, tracks, playlists, playlist_items)
+        size = os.path.getsize(LIBRARY_SNAPSHOT_FILE) / 1024 / 1024
+        
+        print(f"\n✓ Snapshot salvato: {rows['saved']} brani salvati, {rows['playlists']} playlist, "
+              f"{rows['tracks']} brani distinti ({size:.1f} MB)")
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+
+
+def export_library_flow(client):
+    """
+    Flusso per esportare brani salvati e playlist su file
+    """
+    print("\n" + "="*60)
+    print("📤 ESPORTA LA LIBRERIA")
+    print("="*60)
+    
+    fmt = input(f"\nFormato ({', '.join(EXPORT_FORMATS)}, default jsonl): ").strip().lower() or 'jsonl'
+    if fmt not in EXPORT_FORMATS:
+        print("❌ Formato non valido")
+        return
+    
+    directory = input(f"Cartella di destinazione (default {EXPORT_DIR}): ").strip() or EXPORT_DIR
+    include_saved = input("Esportare i brani salvati? (s/n, default s): ").lower() != 'n'
+    include_playlists = input("Esportare le playlist? (s/n, default s): ").lower() != 'n'
+    
+    try:
+        print("\nEsporto...")
+        exported = export_library(client, directory, fmt, include_saved, include_playlists)
+        tracks = sum(entry['tracks'] for entry in exported)
+        print(f"\n✓ Esportati {len(exported)} file ({tracks} brani) in '{directory}'")
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+
+
+def import_playlist_flow(client):
+    """
+    Flusso per ricreare una playlist da un file esportato
+    """
+    print("\n" + "="*60)
+    print("📥 IMPORTA UNA PLAYLIST")
+    print("="*60)
+    
+    path = input("\nFile da importare (.jsonl, .csv, .m3u): ").strip()
+    if not os.path.isfile(path):
+        print("❌ File non trovato")
+        return
+    
+    name = input("Nome della playlist (lascia vuoto per usare quello del file): ").strip() or None
+    make_public = input("Creare una playlist pubblica? (s/n, default n): ").lower() == 's'
+    
+    try:
+        result = import_playlist(client, path, name, make_public)
+        
+        print(f"\n✓ Importati {result['tracks']} brani")
+        if result['skipped']:
+            print(f"  ⚠️  {result['skipped']} brani non importabili (es. file locali)")
+        for playlist in result['playlists']:
+            print(f"  {playlist['name']}: {playlist['external_urls']['spotify']}")
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+
+
+def release_radar_flow(client):
+    """
+    Flusso per aggiornare la playlist delle nuove uscite degli artisti seguiti
+    """
+    print("\n" + "="*60)
+    print("📡 RADAR DELLE NUOVE USCITE")
+    print("="*60)
+    
+    state = RadarState(RELEASE_RADAR_STATE)
+    if state.updated:
+        print(f"\nUltimo controllo: {state.updated} (vengono cercate solo le uscite successive)")
+    else:
+        print("\nPrimo controllo: vengono cercate le uscite degli ultimi 30 giorni")
+    
+    max_input = input("Brani massimi nella playlist (default 200): ").strip()
+    
+    try:
+        max_tracks = max(1, int(max_input)) if max_input else 200
+    except ValueError:
+        max_tracks = 200
+    
+    try:
+        result = run_radar(client, state, max_tracks=max_tracks)
+        
+        print(f"\n✓ Controllati {result['artists']} artisti: {len(result['releases'])} nuove uscite")
+        for album in result['releases'][:20]:
+            artists = ', '.join(artist['name'] for artist in album.get('artists', []))
+            print(f"  {album.get('release_date')}  {artists} - {album['name']}")
+        if len(result['releases']) > 20:
+            print(f"  ... e altre {len(result['releases']) - 20}")
+        
+        print(f"\n  Brani aggiunti alla playlist: {result['added']}, rimossi: {result['removed']}")
+        if result['errors']:
+            print(f"  ⚠️  {len(result['errors'])} artisti non controllati (verranno ricontrollati la prossima volta)")
     except Exception as e:
         print(f"❌ Errore: {e}")
 
@@ -327,11 +811,17 @@ def main():
     """
     print("🎵 Inizializzazione Spotify Client...\n")
     
+    # Con --profile (o PROFILE=true nel .env) ogni flusso viene profilato
+    profiler = FlowProfiler(enabled=PROFILE or '--profile' in sys.argv[1:])
+    if profiler.enabled:
+        print(f"⏱️  Profilazione attiva: report in '{profiler.report_dir}'\n")
+    
     try:
         client = SpotifyClient(
             CLIENT_ID, 
             CLIENT_SECRET,
-            redirect_uri=REDIRECT_URI
+            redirect_uri=REDIRECT_URI,
+            playlist_cache=PlaylistCache(PLAYLIST_CACHE_DIR)
         )
         
         print("✓ Client inizializzato correttamente")
@@ -340,26 +830,48 @@ def main():
             choice = menu()
             
             if choice == '1':
-                search_artist_flow(client)
+                profiler.run(search_artist_flow, client)
             elif choice == '2':
-                search_track_flow(client)
+                profiler.run(search_track_flow, client)
             elif choice == '3':
-                view_saved_tracks_flow(client)
+                profiler.run(view_saved_tracks_flow, client)
             elif choice == '4':
-                view_top_tracks_flow(client)
+                profiler.run(view_top_tracks_flow, client)
             elif choice == '5':
-                view_top_artists_flow(client)
+                profiler.run(view_top_artists_flow, client)
             elif choice == '6':
-                view_playlists_flow(client)
+                profiler.run(view_playlists_flow, client)
             elif choice == '7':
-                create_playlist_flow(client)
+                profiler.run(create_playlist_flow, client)
             elif choice == '8':
-                create_playlist_from_top_flow(client)
+                profiler.run(create_playlist_from_top_flow, client)
             elif choice == '9':
-                create_playlist_from_saved_flow(client)
+                profiler.run(create_playlist_from_saved_flow, client)
             elif choice == '10':
-                create_playlists_by_genre_flow(client)
+                profiler.run(create_playlists_by_genre_flow, client)
             elif choice == '11':
+                profiler.run(library_analytics_flow, client)
+            elif choice == '12':
+                profiler.run(create_discography_playlist_flow, client)
+            elif choice == '13':
+                profiler.run(create_discovery_playlist_flow, client)
+            elif choice == '14':
+                profiler.run(smart_playlists_flow, client)
+            elif choice == '15':
+                profiler.run(save_library_snapshot_flow, client)
+            elif choice == '16':
+                profiler.run(advanced_search_flow, client)
+            elif choice == '17':
+                profiler.run(create_playlists_by_mood_flow, client)
+            elif choice == '18':
+                profiler.run(reorder_playlist_flow, client)
+            elif choice == '19':
+                profiler.run(export_library_flow, client)
+            elif choice == '20':
+                profiler.run(import_playlist_flow, client)
+            elif choice == '21':
+                profiler.run(release_radar_flow, client)
+            elif choice == '22':
                 print("\n👋 Arrivederci!")
                 break
             else:
@@ -0,0 +1,345 @@
+"""
+Divisione dei brani per mood: k-means vettoriale sulle audio features
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+# Colonne della matrice delle feature, nell'ordine
+FEATURES = ('energy', 'valence', 'tempo', 'danceability', 'acousticness')
+
+# L'endpoint /audio-features accetta al massimo 100 ID per richiesta
+FEATURES_BATCH_SIZE = 100
+
+# Profili dei mood in unità standardizzate (media 0, deviazione 1 sulla
+# libreria) per energy, valence, tempo, danceability, acousticness:
+# ogni cluster prende il nome del profilo più vicino al suo centroide
+MOOD_PROFILES = {
+    'Workout': (1.2, 0.3, 1.0, 0.6, -1.0),
+    'Party': (0.8, 1.0, 0.3, 1.2, -0.6),
+    'Happy': (0.2, 1.2, 0.0, 0.4, 0.0),
+    'Focus': (-0.6, -0.2, -0.3, -0.4, 0.6),
+    'Chill': (-1.0, 0.2, -0.5, 0.0, 1.0),
+    'Melancholy': (-0.6, -1.2, -0.2, -0.5, 0.6),
+    'Intense': (1.0, -1.0, 0.5, -0.3, -0.8)
+}
+
+
+class ClientFeatureSource:
+    """
+    Scarica le audio features dall'API a lotti di 100 ID
+
+    Qualsiasi oggetto con il metodo fetch(track_ids) può sostituirla (es.
+    dati preparati per le prove offline).
+    """
+    def __init__(self, client, max_workers=4):
+        """
+        Args:
+            client: SpotifyClient
+            max_workers: Lotti scaricati contemporaneamente
+        """
+        self.client = client
+        self.max_workers = max_workers
+
+    def fetch(self, track_ids):
+        """
+        Args:
+            track_ids: Lista di ID dei brani
+
+        Returns:
+            list: Audio features nello stesso ordine degli ID (None se non disponibili)
+        """
+        batches = [track_ids[i:i + FEATURES_BATCH_SIZE] for i in range(0, len(track_ids), FEATURES_BATCH_SIZE)]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return [
+                features
+                for batch in executor.map(self.client.get_several_audio_features, batches)
+                for features in batch
+            ]
+
+
+class AudioFeatureCache:
+    """
+    Cache su disco delle audio features come matrice NumPy
+
+    Il file .npz contiene gli ID dei brani e la matrice float32 con una riga
+    per brano e una colonna per feature (NaN per i brani senza feature: non
+    vengono richiesti di nuovo). Le feature di un brano non cambiano, quindi
+    la cache non scade.
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path: File della cache (es. ".cache/audio_features.npz")
+        """
+        self.path = path
+        self.index = {}
+        self.matrix = np.zeros((0, len(FEATURES)), dtype=np.float32)
+        self.lock = threading.Lock()
+
+        if os.path.exists(path):
+            with np.load(path, allow_pickle=False) as data:
+                track_ids = data['track_ids'].tolist()
+                # Una cache con ID e righe non allineati restituirebbe feature di altri brani: si scarta
+                if tuple(data['features']) == FEATURES and len(track_ids) == len(data['matrix']) \
+                        and len(set(track_ids)) == len(track_ids):
+                    self.matrix = data['matrix']
+                    self.index = {track_id: i for i, track_id in enumerate(track_ids)}
+
+    def lookup(self, track_ids):
+        """
+        Cerca i brani in cache
+
+        Args:
+            track_ids: Lista di ID dei brani
+
+        Returns:
+            tuple: (righe della cache per ogni brano, -1 se assente; ID mancanti senza doppioni)
+        """
+        with self.lock:
+            rows = np.array([self.index.get(track_id, -1) for track_id in track_ids], dtype=np.int64)
+        missing = list(dict.fromkeys(track_id for track_id, row in zip(track_ids, rows) if row < 0))
+        return rows, missing
+
+    def add(self, track_ids, matrix):
+        """
+        Aggiunge le feature di nuovi brani e salva la cache
+        """
+        if not track_ids:
+            return
+
+        with self.lock:
+            # Una riga per ID: si saltano i doppioni e i brani aggiunti nel frattempo da un altro thread
+            keep = []
+            for i, track_id in enumerate(track_ids):
+                if track_id not in self.index:
+                    self.index[track_id] = len(self.matrix) + len(keep)
+                    keep.append(i)
+
+            if not keep:
+                return
+            self.matrix = np.vstack([self.matrix, matrix[keep].astype(np.float32)])
+
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            ids = np.array(sorted(self.index, key=self.index.get), dtype=str)
+
+            # Scrittura atomica: prima un file temporaneo, poi la sostituzione
+            tmp_path = f"{self.path}.{threading.get_ident()}.tmp.npz"
+            np.savez(tmp_path, track_ids=ids, matrix=self.matrix, features=np.array(FEATURES))
+            os.replace(tmp_path, self.path)
+
+    def rows(self, rows):
+        with self.lock:
+            return self.matrix[rows]
+
+
+def features_to_matrix(features_list):
+    """
+    Converte le audio features dell'API in una matrice (NaN per i valori mancanti)
+
+    Args:
+        features_list: Lista di dizionari di audio features (o None)
+
+    Returns:
+        numpy.ndarray: Matrice float32 n × len(FEATURES)
+    """
+    matrix = np.full((len(features_list), len(FEATURES)), np.nan, dtype=np.float32)
+
+    for i, features in enumerate(features_list):
+        if features:
+            matrix[i] = [
+                features.get(name) if features.get(name) is not None else np.nan
+                for name in FEATURES
+            ]
+
+    return matrix
+
+
+def load_feature_matrix(track_ids, source, cache=None):
+    """
+    Restituisce la matrice delle feature dei brani, scaricando solo quelli non in cache
+
+    Args:
+        track_ids: Lista di ID dei brani
+        source: Sorgente delle feature (es. ClientFeatureSource)
+        cache: AudioFeatureCache (opzionale)
+
+    Returns:
+        numpy.ndarray: Matrice float32 n × len(FEATURES) (righe NaN per i brani senza feature)
+    """
+    if cache is None:
+        return features_to_matrix(source.fetch(list(track_ids)))
+
+    rows, missing = cache.lookup(track_ids)
+
+    if missing:
+        print(f"🎚️  Scarico le audio features di {len(missing)} brani ({int((rows >= 0).sum())} in cache)...")
+        cache.add(missing, features_to_matrix(source.fetch(missing)))
+        rows, _ = cache.lookup(track_ids)
+
+    return cache.rows(rows)
+
+
+def standardize(matrix):
+    """
+    Porta ogni colonna a media 0 e deviazione standard 1 (tempo e feature 0-1 diventano confrontabili)
+
+    Returns:
+        tuple: (matrice standardizzata, medie, deviazioni)
+    """
+    mean = matrix.mean(axis=0)
+    std = matrix.std(axis=0)
+    std[std == 0] = 1.0
+    return (matrix - mean) / std, mean, std
+
+
+def kmeans(points, n_clusters, iterations=100, seed=0, n_init=4):
+    """
+    K-means vettoriale con inizializzazione k-means++
+
+    Le distanze tra tutti i punti e tutti i centroidi sono calcolate in una
+    sola operazione matriciale (|x|² - 2x·c + |c|²) a ogni iterazione.
+    L'algoritmo viene ripetuto n_init volte da centroidi iniziali diversi e
+    si tiene il risultato con la somma delle distanze più bassa.
+
+    Args:
+        points: Matrice n × d
+        n_clusters: Numero di cluster
+        iterations: Numero massimo di iterazioni
+        seed: Seme per l'inizializzazione
+        n_init: Numero di ripetizioni
+
+    Returns:
+        tuple: (cluster di ogni punto, centroidi k × d)
+    """
+    n = len(points)
+    n_clusters = min(n_clusters, n)
+
+    if n_clusters == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, points.shape[1]))
+
+    rng = np.random.default_rng(seed)
+    points = points.astype(np.float64)
+    squared_norms = (points ** 2).sum(axis=1)
+
+    best = None
+    for _ in range(n_init):
+        labels, centroids, inertia = _lloyd(points, squared_norms, n_clusters, iterations, rng)
+        if best is None or inertia < best[2]:
+            best = (labels, centroids, inertia)
+
+    return best[0], best[1]
+
+
+def _lloyd(points, squared_norms, n_clusters, iterations, rng):
+    """
+    Una esecuzione di k-means (k-means++ e iterazioni di Lloyd)
+
+    Returns:
+        tuple: (cluster di ogni punto, centroidi, somma delle distanze al quadrato)
+    """
+    n = len(points)
+
+    # k-means++: ogni nuovo centroide è scelto con probabilità proporzionale
+    # al quadrato della distanza dal centroide più vicino
+    centroids = [points[rng.integers(n)]]
+    closest = ((points - centroids[0]) ** 2).sum(axis=1)
+    for _ in range(1, n_clusters):
+        total = closest.sum()
+        index = rng.choice(n, p=closest / total) if total > 0 else rng.integers(n)
+        centroids.append(points[index])
+        closest = np.minimum(closest, ((points - points[index]) ** 2).sum(axis=1))
+    centroids = np.array(centroids)
+
+    labels = np.full(n, -1)
+
+    for _ in range(iterations):
+        distances = squared_norms[:, None] - 2 * points @ centroids.T + (centroids ** 2).sum(axis=1)[None, :]
+        new_labels = distances.argmin(axis=1)
+
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.stack([
+            np.bincount(labels, weights=points[:, j], minlength=n_clusters) for j in range(points.shape[1])
+        ], axis=1)
+
+        # Un cluster rimasto vuoto conserva il centroide precedente
+        non_empty = counts > 0
+        centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+
+    inertia = float(np.maximum(distances[np.arange(n), labels], 0).sum())
+    return labels, centroids, inertia
+
+
+def name_moods(centroids):
+    """
+    Assegna a ogni centroide (standardizzato) il nome del profilo di mood più vicino
+
+    Ogni profilo viene usato una sola volta: prima le coppie più vicine.
+
+    Returns:
+        list: Nomi dei cluster nello stesso ordine dei centroidi
+    """
+    profile_names = list(MOOD_PROFILES)
+    profiles = np.array([MOOD_PROFILES[name] for name in profile_names])
+    distances = ((centroids[:, None, :] - profiles[None, :, :]) ** 2).sum(axis=2)
+
+    names = [None] * len(centroids)
+    used = set()
+    for flat in np.argsort(distances, axis=None):
+        cluster, profile = divmod(int(flat), len(profile_names))
+        if names[cluster] is None and profile not in used:
+            names[cluster] = profile_names[profile]
+            used.add(profile)
+
+    # Più cluster che profili: nomi numerati
+    return [name or f'Mood {i + 1}' for i, name in enumerate(names)]
+
+
+def group_tracks_by_mood(client, tracks_items, n_clusters=5, source=None, cache=None, seed=0):
+    """
+    Raggruppa i brani per mood con un k-means sulle audio features
+
+    Args:
+        client: SpotifyClient (usato se source non è indicata)
+        tracks_items: Lista di items dai brani salvati
+        n_clusters: Numero di playlist da ottenere
+        source: Sorgente delle feature con metodo fetch(track_ids) (default: API)
+        cache: AudioFeatureCache (opzionale)
+        seed: Seme del k-means (stesso seme, stessi gruppi)
+
+    Returns:
+        dict: Dizionario {mood: [lista di brani]}, più 'Other' per i brani senza feature
+    """
+    source = source or ClientFeatureSource(client)
+    tracks = [item['track'] for item in tracks_items if item.get('track') and item['track'].get('id')]
+
+    if not tracks:
+        return {}
+
+    print(f"\n🎚️  Analizzo il mood di {len(tracks)} brani...")
+    matrix = load_feature_matrix([track['id'] for track in tracks], source, cache)
+    valid = ~np.isnan(matrix).any(axis=1)
+
+    groups = {}
+    if valid.any():
+        points, _, _ = standardize(matrix[valid])
+        labels, centroids = kmeans(points, n_clusters, seed=seed)
+        names = name_moods(centroids)
+
+        valid_tracks = [track for track, ok in zip(tracks, valid) if ok]
+        for track, label in zip(valid_tracks, labels):
+            groups.setdefault(names[label], []).append(track)
+
+    missing = [track for track, ok in zip(tracks, valid) if not ok]
+    if missing:
+        groups.setdefault('Other', []).extend(missing)
+
+    return groups
@@ -0,0 +1,419 @@
+"""
+Storico locale degli ascolti costruito interrogando periodicamente /me/player/recently-played
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+
+# Un record a dimensione fissa per ogni ascolto
+PLAY_DTYPE = np.dtype([
+    ('played_at', '<i8'),     # Millisecondi Unix
+    ('track', '<u4'),         # Indice nel dizionario dei brani
+    ('artist', '<u4'),        # Indice nel dizionario degli artisti
+    ('duration_ms', '<u4')
+])
+
+WEEK_MS = 7 * 24 * 3600 * 1000
+
+
+def parse_played_at(played_at):
+    """
+    Converte il campo 'played_at' (ISO 8601) in millisecondi Unix
+
+    Args:
+        played_at: Data in formato ISO (es. "2024-05-01T10:00:00.123Z")
+
+    Returns:
+        int: Millisecondi Unix
+    """
+    return int(datetime.fromisoformat(played_at.replace('Z', '+00:00')).timestamp() * 1000)
+
+
+class PlayHistoryStore:
+    """
+    Archivio append-only degli ascolti
+
+    Nella cartella dell'archivio si trovano:
+      - plays.bin: record binari a dimensione fissa (PLAY_DTYPE)
+      - tracks.tsv / artists.tsv: dizionari ID -> indice, una riga per voce
+      - state.json: cursore dell'ultimo ascolto salvato
+    Le interrogazioni leggono plays.bin come array NumPy senza analizzare JSON.
+
+    Il cursore effettivo è il massimo tra state.json e l'ultimo record di
+    plays.bin: se il processo si interrompe tra le due scritture, gli
+    ascolti già salvati non vengono aggiunti di nuovo.
+    """
+    def __init__(self, directory):
+        """
+        Apre (o crea) un archivio
+
+        Args:
+            directory: Cartella dell'archivio
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self.plays_path = os.path.join(directory, 'plays.bin')
+        self.tracks_path = os.path.join(directory, 'tracks.tsv')
+        self.artists_path = os.path.join(directory, 'artists.tsv')
+        self.state_path = os.path.join(directory, 'state.json')
+
+        self.track_ids, self.track_names = self._load_dictionary(self.tracks_path)
+        self.artist_ids, self.artist_names = self._load_dictionary(self.artists_path)
+        self.track_index = {track_id: i for i, track_id in enumerate(self.track_ids)}
+        self.artist_index = {artist_id: i for i, artist_id in enumerate(self.artist_ids)}
+
+        self._drop_partial_record()
+
+        self.cursor = 0
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, encoding='utf-8') as f:
+                    self.cursor = json.load(f).get('cursor', 0)
+            except ValueError:
+                # state.json illeggibile: il cursore viene ricavato da plays.bin
+                pass
+
+        plays = self.plays()
+        if len(plays):
+            self.cursor = max(self.cursor, int(plays['played_at'][-1]))
+
+    def _drop_partial_record(self):
+        """
+        Tronca un record scritto solo in parte (processo interrotto durante l'append)
+
+        Gli ascolti del record troncato non sono coperti dal cursore, quindi
+        vengono scaricati di nuovo alla prossima interrogazione.
+        """
+        if not os.path.exists(self.plays_path):
+            return
+
+        size = os.path.getsize(self.plays_path)
+        complete = size - size % PLAY_DTYPE.itemsize
+        if complete != size:
+            with open(self.plays_path, 'r+b') as f:
+                f.truncate(complete)
+
+    def _load_dictionary(self, path):
+        """
+        Legge un dizionario "id<TAB>nome" (una riga per voce)
+        """
+        ids = []
+        names = []
+
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                lines = f.readlines()
+
+            # Una riga senza a capo è stata scritta solo in parte: nessun
+            # record la usa ancora (i record vengono scritti dopo), quindi si scarta
+            if lines and not lines[-1].endswith('\n'):
+                lines.pop()
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.writelines(lines)
+
+            for line in lines:
+                item_id, _, name = line.rstrip('\n').partition('\t')
+                ids.append(item_id)
+                names.append(name)
+
+        return ids, names
+
+    def _code(self, item_id, name, ids, names, index, new_lines):
+        """
+        Restituisce l'indice di un ID, aggiungendolo al dizionario se nuovo
+        """
+        code = index.get(item_id)
+
+        if code is None:
+            code = len(ids)
+            index[item_id] = code
+            ids.append(item_id)
+            names.append(name)
+            new_lines.append(f"{item_id}\t{name.replace(chr(9), ' ').replace(chr(10), ' ')}\n")
+
+        return code
+
+    def append(self, items):
+        """
+        Aggiunge gli ascolti restituiti da /me/player/recently-played
+
+        Gli ascolti già salvati (played_at <= cursore) o ripetuti vengono ignorati.
+
+        Args:
+            items: Lista di items con 'track' e 'played_at'
+
+        Returns:
+            int: Numero di ascolti effettivamente aggiunti
+        """
+        new_tracks = []
+        new_artists = []
+        records = []
+        seen = set()
+
+        for item in items:
+            track = item.get('track')
+            if not track or not track.get('artists'):
+                continue
+
+            played_at = parse_played_at(item['played_at'])
+            if played_at <= self.cursor or played_at in seen:
+                continue
+            seen.add(played_at)
+
+            artist = track['artists'][0]
+            track_code = self._code(track['id'], track['name'], self.track_ids,
+                                    self.track_names, self.track_index, new_tracks)
+            artist_code = self._code(artist['id'], artist['name'], self.artist_ids,
+                                     self.artist_names, self.artist_index, new_artists)
+            records.append((played_at, track_code, artist_code, track.get('duration_ms') or 0))
+
+        if not records:
+            return 0
+
+        # Prima i dizionari, poi i record: un record non punta mai a una voce mancante
+        with open(self.tracks_path, 'a', encoding='utf-8') as f:
+            f.writelines(new_tracks)
+        with open(self.artists_path, 'a', encoding='utf-8') as f:
+            f.writelines(new_artists)
+
+        plays = np.array(sorted(records), dtype=PLAY_DTYPE)
+        with open(self.plays_path, 'ab') as f:
+            f.write(plays.tobytes())
+
+        self.cursor = int(plays['played_at'][-1])
+
+        # Scrittura atomica: prima un file temporaneo, poi la sostituzione
+        tmp_path = f"{self.state_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'cursor': self.cursor}, f)
+        os.replace(tmp_path, self.state_path)
+
+        return len(plays)
+
+    def plays(self, since=None, until=None):
+        """
+        Restituisce gli ascolti salvati come array NumPy (memory-mapped)
+
+        Args:
+            since: datetime o millisecondi Unix di inizio (opzionale)
+            until: datetime o millisecondi Unix di fine (opzionale)
+
+        Returns:
+            numpy.ndarray: Array con dtype PLAY_DTYPE, ordinato per played_at
+        """
+        if not os.path.exists(self.plays_path) or os.path.getsize(self.plays_path) == 0:
+            return np.zeros(0, dtype=PLAY_DTYPE)
+
+        plays = np.memmap(self.plays_path, dtype=PLAY_DTYPE, mode='r')
+
+        # I record sono in ordine cronologico: basta una ricerca binaria
+        start = 0 if since is None else np.searchsorted(plays['played_at'], self._to_ms(since))
+        end = len(plays) if until is None else np.searchsorted(plays['played_at'], self._to_ms(until))
+
+        return plays[start:end]
+
+    def _to_ms(self, value):
+        """
+        Converte un datetime (o un intero già in millisecondi) in millisecondi Unix
+        """
+        if isinstance(value, datetime):
+            return int(value.timestamp() * 1000)
+        return int(value)
+
+    def plays_per_track(self, since=None, until=None, top_n=20):
+        """
+        Conta gli ascolti per brano
+
+        Returns:
+            list: Lista di tuple (nome brano, artista, ascolti) in ordine decrescente
+        """
+        plays = self.plays(since, until)
+        counts = np.bincount(plays['track'], minlength=len(self.track_ids))
+        order = np.argsort(-counts, kind='stable')[:top_n]
+
+        # Artista principale di ogni brano (dall'ultimo ascolto)
+        track_artist = np.zeros(len(self.track_ids), dtype=np.int64)
+        track_artist[plays['track']] = plays['artist']
+
+        return [
+            (self.track_names[i], self.artist_names[track_artist[i]], int(counts[i]))
+            for i in order if counts[i] > 0
+        ]
+
+    def plays_per_artist(self, since=None, until=None, top_n=20):
+        """
+        Conta gli ascolti per artista
+
+        Returns:
+            list: Lista di tuple (nome artista, ascolti) in ordine decrescente
+        """
+        plays = self.plays(since, until)
+        counts = np.bincount(plays['artist'], minlength=len(self.artist_ids))
+        order = np.argsort(-counts, kind='stable')[:top_n]
+
+        return [(self.artist_names[i], int(counts[i])) for i in order if counts[i] > 0]
+
+    def plays_per_week(self, by='artist', artist_genres=None, since=None, until=None):
+        """
+        Conta gli ascolti per settimana raggruppati per brano, artista o genere
+
+        Args:
+            by: 'track', 'artist' o 'genre'
+            artist_genres: Dizionario {artist_id: genere}, necessario per by='genre'
+
+        Returns:
+            dict: Dizionario {inizio settimana (YYYY-MM-DD): {chiave: ascolti}}
+        """
+        plays = self.plays(since, until)
+        if len(plays) == 0:
+            return {}
+
+        if by == 'track':
+            codes, labels = plays['track'].astype(np.int64), self.track_names
+        elif by == 'artist':
+            codes, labels = plays['artist'].astype(np.int64), self.artist_names
+        elif by == 'genre':
+            artist_genres = artist_genres or {}
+            genre_labels = sorted(set(artist_genres.values()) | {'Other'})
+            genre_index = {genre: i for i, genre in enumerate(genre_labels)}
+            artist_to_genre = np.array(
+                [genre_index[artist_genres.get(artist_id, 'Other')] for artist_id in self.artist_ids],
+                dtype=np.int64
+            )
+            codes, labels = artist_to_genre[plays['artist']], genre_labels
+        else:
+            raise ValueError("by deve essere 'track', 'artist' o 'genre'")
+
+        # Settimane ISO che iniziano di lunedì (l'epoca Unix è un giovedì)
+        weeks = (plays['played_at'] + 3 * 24 * 3600 * 1000) // WEEK_MS
+        week_values, week_codes = np.unique(weeks, return_inverse=True)
+
+        # Conteggio vettoriale delle coppie (settimana, chiave)
+        n_labels = len(labels)
+        pair_counts = np.bincount(week_codes * n_labels + codes, minlength=len(week_values) * n_labels)
+        pair_counts = pair_counts.reshape(len(week_values), n_labels)
+
+        result = {}
+        for w, week in enumerate(week_values):
+            week_start = np.datetime64(int(week * WEEK_MS - 3 * 24 * 3600 * 1000), 'ms').astype('datetime64[D]')
+            nonzero = np.nonzero(pair_counts[w])[0]
+            result[str(week_start)] = {labels[i]: int(pair_counts[w, i]) for i in nonzero}
+
+        return result
+
+
+def poll_once(client, store):
+    """
+    Scarica i nuovi ascolti successivi al cursore e li salva nell'archivio
+
+    Args:
+        client: SpotifyClient con autorizzazione utente
+        store: PlayHistoryStore
+
+    Returns:
+        int: Numero di nuovi ascolti salvati
+    """
+    added = 0
+
+    while True:
+        result = client.get_recently_played(after=store.cursor or None, limit=50)
+        count = store.append(result.get('items', []))
+        added += count
+
+        # Meno di una pagina piena: non ci sono altri ascolti da recuperare
+        if count == 0 or len(result.get('items', [])) < 50:
+            return added
+
+
+def run_daemon(client, store, interval=300):
+    """
+    Interroga periodicamente gli ascolti recenti finché non viene interrotto (Ctrl+C)
+
+    Args:
+        client: SpotifyClient con autorizzazione utente
+        store: PlayHistoryStore
+        interval: Secondi tra un'interrogazione e la successiva
+    """
+    print(f"🎧 Raccolta ascolti ogni {interval}s in '{store.directory}' (Ctrl+C per uscire)")
+
+    try:
+        while True:
+            # Il client rinnova il token prima che scada (refresh token), senza interazione
+            try:
+                added = poll_once(client, store)
+                print(f"  {datetime.now():%Y-%m-%d %H:%M} +{added} ascolti")
+            except Exception as e:
+                print(f"❌ Errore: {e}")
+
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\n👋 Raccolta interrotta")
+
+
+def main():
+    """
+    Funzione principale
+    """
+    from spotify_client import SpotifyClient
+    from config import CLIENT_ID, CLIENT_SECRET, REDIRECT_URI
+
+    parser = argparse.ArgumentParser(description="Storico locale degli ascolti")
+    parser.add_argument('command', choices=['poll', 'report'], help="Raccogli ascolti o mostra il report")
+    parser.add_argument('--dir', default='play_history', help="Cartella dell'archivio")
+    parser.add_argument('--interval', type=int, default=300, help="Secondi tra due interrogazioni")
+    parser.add_argument('--weeks', type=int, default=4, help="Settimane mostrate nel report settimanale")
+    parser.add_argument('--by', choices=['artist', 'track', 'genre'], default='artist',
+                        help="Raggruppamento del report settimanale")
+    args = parser.parse_args()
+
+    store = PlayHistoryStore(args.dir)
+
+    if args.command == 'poll':
+        client = SpotifyClient(CLIENT_ID, CLIENT_SECRET, redirect_uri=REDIRECT_URI)
+        client.authorize_user()
+        run_daemon(client, store, args.interval)
+    else:
+        print(f"\n{'='*70}")
+        print(f"STORICO ASCOLTI ({len(store.plays())} ascolti)")
+        print(f"{'='*70}\n")
+
+        print("🎵 Brani più ascoltati:")
+        for i, (name, artist, count) in enumerate(store.plays_per_track(top_n=10), 1):
+            print(f"   {i}. {name} - {artist} ({count})")
+
+        print("\n🎤 Artisti più ascoltati:")
+        for i, (name, count) in enumerate(store.plays_per_artist(top_n=10), 1):
+            print(f"   {i}. {name} ({count})")
+
+        # Il genere degli artisti richiede l'API (basta il token dell'app)
+        artist_genres = None
+        if args.by == 'genre':
+            from analytics import macro_genres_for_artists
+
+            client = SpotifyClient(CLIENT_ID, CLIENT_SECRET, redirect_uri=REDIRECT_URI)
+            artist_genres = macro_genres_for_artists(client, store.artist_ids)
+
+        since = int(time.time() * 1000) - args.weeks * WEEK_MS
+        weekly = store.plays_per_week(by=args.by, artist_genres=artist_genres, since=since)
+        labels = {'artist': 'artista', 'track': 'brano', 'genre': 'genere'}
+
+        print(f"\n📅 Ascolti per settimana e per {labels[args.by]} (ultime {args.weeks} settimane):")
+        for week_start, counts in weekly.items():
+            top = sorted(counts.items(), key=lambda x: x[1], reverse=True)[:5]
+            print(f"   {week_start} ({sum(counts.values())} ascolti): "
+                  + ", ".join(f"{label} ({count})" for label, count in top))
+
+
+if __name__ == "__main__":
+    # Con PROFILE=true nel .env il comando viene profilato
+    from profiling import FlowProfiler
+
+    with FlowProfiler().profile('play_history'):
+        main()
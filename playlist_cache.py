@@ -0,0 +1,115 @@
+"""
+Cache su disco del contenuto delle playlist, indicizzata per snapshot_id
+"""
+import gzip
+import json
+import os
+import threading
+
+
+# Campi pesanti e inutili per l'app (liste di paesi) che non vengono salvati
+DROPPED_FIELDS = ('available_markets',)
+
+
+def _compact(value):
+    """
+    Rimuove ricorsivamente i campi in DROPPED_FIELDS
+    """
+    if isinstance(value, dict):
+        return {k: _compact(v) for k, v in value.items() if k not in DROPPED_FIELDS}
+    if isinstance(value, list):
+        return [_compact(v) for v in value]
+    return value
+
+
+class PlaylistCache:
+    """
+    Cache {playlist_id: (snapshot_id, brani)} salvata su disco
+
+    Lo snapshot_id di una playlist cambia solo quando cambia il suo
+    contenuto: se coincide con quello salvato, i brani in cache sono validi.
+    Ogni playlist è salvata in un file JSON compresso con gzip; un piccolo
+    indice {playlist_id: snapshot_id} evita di aprire i file non necessari.
+    """
+    def __init__(self, directory):
+        """
+        Apre (o crea) la cache
+
+        Args:
+            directory: Cartella della cache
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self.index_path = os.path.join(directory, 'index.json')
+        self.index = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding='utf-8') as f:
+                self.index = json.load(f)
+
+    def _path(self, playlist_id):
+        return os.path.join(self.directory, f"{playlist_id}.json.gz")
+
+    def get(self, playlist_id, snapshot_id):
+        """
+        Restituisce i brani in cache se lo snapshot coincide
+
+        Args:
+            playlist_id: ID della playlist
+            snapshot_id: snapshot_id attuale della playlist
+
+        Returns:
+            list: Brani della playlist, oppure None se non in cache o non aggiornati
+        """
+        with self.lock:
+            if self.index.get(playlist_id) != snapshot_id:
+                self.misses += 1
+                return None
+
+        try:
+            with gzip.open(self._path(playlist_id), 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+
+        # L'indice può essere più vecchio del file (put concorrenti): vale lo snapshot nel file
+        if data is None or data.get('snapshot_id') != snapshot_id:
+            with self.lock:
+                self.misses += 1
+            return None
+
+        with self.lock:
+            self.hits += 1
+
+        return data['items']
+
+    def put(self, playlist_id, snapshot_id, items):
+        """
+        Salva i brani di una playlist
+
+        Args:
+            playlist_id: ID della playlist
+            snapshot_id: snapshot_id della versione scaricata
+            items: Brani della playlist
+        """
+        data = {'snapshot_id': snapshot_id, 'items': _compact(items)}
+
+        # Scrittura atomica: prima un file temporaneo, poi la sostituzione
+        path = self._path(playlist_id)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+
+        # File e indice vengono aggiornati insieme: con più put concorrenti
+        # l'indice indica sempre lo snapshot del file
+        with self.lock:
+            os.replace(tmp_path, path)
+            self.index[playlist_id] = snapshot_id
+            tmp_index = f"{self.index_path}.tmp"
+            with open(tmp_index, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f)
+            os.replace(tmp_index, self.index_path)
@@ -0,0 +1,213 @@
+"""
+Riordinamento di una playlist con pochi spostamenti (sottosequenza crescente più lunga)
+"""
+from bisect import bisect_left
+
+from analytics import macro_genres_for_artists, UNKNOWN_GENRE
+
+
+SORT_FIELDS = ('added_at', 'popularity', 'name', 'artist', 'release_date', 'duration', 'genre')
+
+
+def longest_increasing_subsequence(values):
+    """
+    Trova una sottosequenza strettamente crescente di lunghezza massima (O(n log n))
+
+    Args:
+        values: Sequenza di valori confrontabili
+
+    Returns:
+        list: Indici degli elementi della sottosequenza, in ordine
+    """
+    tails = []       # tails[k]: indice dell'ultimo elemento della migliore sequenza lunga k + 1
+    tail_values = []
+    parents = [-1] * len(values)
+
+    for i, value in enumerate(values):
+        k = bisect_left(tail_values, value)
+        parents[i] = tails[k - 1] if k > 0 else -1
+
+        if k == len(tails):
+            tails.append(i)
+            tail_values.append(value)
+        else:
+            tails[k] = i
+            tail_values[k] = value
+
+    indices = []
+    i = tails[-1] if tails else -1
+    while i >= 0:
+        indices.append(i)
+        i = parents[i]
+
+    return indices[::-1]
+
+
+def plan_moves(ranks):
+    """
+    Calcola gli spostamenti che portano la playlist nell'ordine voluto
+
+    I brani della sottosequenza crescente più lunga dei ranghi restano dove
+    sono; gli altri vengono spostati, in ordine di rango, subito dopo il
+    brano che deve precederli. Brani consecutivi con ranghi consecutivi
+    vengono spostati insieme con un solo intervallo.
+
+    Args:
+        ranks: Posizione finale di ogni brano, nell'ordine attuale (permutazione di 0..n-1)
+
+    Returns:
+        list: Spostamenti {'range_start', 'insert_before', 'range_length'} da applicare
+              in ordine, con le posizioni riferite alla playlist prima di ogni spostamento
+    """
+    n = len(ranks)
+    anchored = {ranks[i] for i in longest_increasing_subsequence(ranks)}
+    order = list(ranks)
+    moves = []
+
+    rank = 0
+    while rank < n:
+        if rank in anchored:
+            rank += 1
+            continue
+
+        start = order.index(rank)
+        insert_before = order.index(rank - 1) + 1 if rank > 0 else 0
+
+        # Già subito dopo il brano che lo precede: non serve spostarlo
+        if start == insert_before:
+            rank += 1
+            continue
+
+        # Allunga l'intervallo con i brani successivi già nell'ordine giusto
+        length = 1
+        while (start + length < n and order[start + length] == rank + length
+               and rank + length not in anchored):
+            length += 1
+
+        moves.append({'range_start': start, 'insert_before': insert_before, 'range_length': length})
+        order = apply_move(order, start, insert_before, length)
+        rank += length
+
+    return moves
+
+
+def apply_move(sequence, range_start, insert_before, range_length=1):
+    """
+    Applica uno spostamento a una lista come l'endpoint di riordinamento
+
+    Returns:
+        list: Nuova lista
+    """
+    moved = sequence[range_start:range_start + range_length]
+    rest = sequence[:range_start] + sequence[range_start + range_length:]
+    target = insert_before - range_length if insert_before > range_start else insert_before
+    return rest[:target] + moved + rest[target:]
+
+
+def _sort_key(field, artist_genres):
+    """
+    Funzione che estrae da un item della playlist il valore su cui ordinare
+    """
+    def track_value(item):
+        track = item.get('track') or {}
+        artists = track.get('artists') or [{}]
+
+        if field == 'added_at':
+            return item.get('added_at') or ''
+        if field == 'popularity':
+            return track.get('popularity') or 0
+        if field == 'name':
+            return (track.get('name') or '').lower()
+        if field == 'artist':
+            return (artists[0].get('name') or '').lower()
+        if field == 'release_date':
+            return (track.get('album') or {}).get('release_date') or ''
+        if field == 'duration':
+            return track.get('duration_ms') or 0
+        return artist_genres.get(artists[0].get('id'), UNKNOWN_GENRE)
+
+    return track_value
+
+
+def target_ranks(items, sort_by='added_at', descending=False, artist_genres=None):
+    """
+    Calcola la posizione finale di ogni brano ordinando per un campo
+
+    L'ordinamento è stabile: i brani con lo stesso valore mantengono l'ordine
+    attuale, così non vengono spostati inutilmente.
+
+    Args:
+        items: Items della playlist (con 'track' e 'added_at')
+        sort_by: Campo (tra SORT_FIELDS)
+        descending: Se True, ordine decrescente
+        artist_genres: Dizionario {artist_id: macro-genere}, necessario per sort_by='genre'
+
+    Returns:
+        list: Posizione finale di ogni brano, nell'ordine attuale
+    """
+    if sort_by not in SORT_FIELDS:
+        raise ValueError(f"Campo di ordinamento non valido: '{sort_by}'")
+
+    key = _sort_key(sort_by, artist_genres or {})
+    order = sorted(range(len(items)), key=lambda i: key(items[i]), reverse=descending)
+
+    ranks = [0] * len(items)
+    for position, i in enumerate(order):
+        ranks[i] = position
+    return ranks
+
+
+def reorder_playlist(client, playlist_id, sort_by='added_at', descending=False, dry_run=False, verify=True):
+    """
+    Ordina una playlist spostando i brani, senza rimuoverli e riaggiungerli
+
+    Spostare invece di riscrivere conserva la data di aggiunta dei brani e
+    richiede una chiamata per intervallo spostato: una playlist quasi in
+    ordine si sistema con pochissime chiamate. Ogni spostamento usa lo
+    snapshot_id restituito dal precedente.
+
+    Args:
+        client: SpotifyClient con autorizzazione utente
+        playlist_id: ID della playlist
+        sort_by: Campo di ordinamento (tra SORT_FIELDS)
+        descending: Se True, ordine decrescente
+        dry_run: Se True, calcola solo il piano senza modificare la playlist
+        verify: Se True, alla fine riscarica la playlist e controlla l'ordine
+
+    Returns:
+        dict: 'tracks', 'moves' (spostamenti), 'snapshot_id' e 'verified' (None se non controllato)
+    """
+    snapshot_id = client.get_playlist_snapshot_id(playlist_id)
+    items = client.get_playlist_tracks(playlist_id, snapshot_id)
+
+    artist_genres = None
+    if sort_by == 'genre':
+        artist_genres = macro_genres_for_artists(client, [
+            item['track']['artists'][0]['id']
+            for item in items
+            if item.get('track') and item['track'].get('artists')
+        ])
+
+    ranks = target_ranks(items, sort_by, descending, artist_genres)
+    moves = plan_moves(ranks)
+    result = {'tracks': len(items), 'moves': moves, 'snapshot_id': snapshot_id, 'verified': None}
+
+    if dry_run or not moves:
+        return result
+
+    for i, move in enumerate(moves, 1):
+        snapshot_id = client.reorder_playlist_tracks(playlist_id, move['range_start'], move['insert_before'],
+                                                     move['range_length'], snapshot_id)
+        if i % 10 == 0 or i == len(moves):
+            print(f"  Spostamenti: {i}/{len(moves)}")
+
+    result['snapshot_id'] = snapshot_id
+
+    if verify:
+        expected = [None] * len(items)
+        for item, rank in zip(items, ranks):
+            expected[rank] = (item.get('track') or {}).get('uri')
+        final = client.get_playlist_tracks(playlist_id, snapshot_id)
+        result['verified'] = [(item.get('track') or {}).get('uri') for item in final] == expected
+
+    return result
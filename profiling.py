@@ -0,0 +1,174 @@
+"""
+Profilazione CPU (cProfile) e memoria (tracemalloc) dei flussi del menu e dei comandi
+"""
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+from config import PROFILE, PROFILE_DIR, PROFILE_TOP_N
+
+
+class FlowProfiler:
+    """
+    Esegue un flusso sotto cProfile e tracemalloc e ne salva il report
+
+    Per ogni esecuzione vengono scritti in report_dir due file:
+    "<flusso>-<data>.txt" con le funzioni più costose (tempo cumulativo e
+    proprio) e le righe che occupano più memoria, e "<flusso>-<data>.prof"
+    con le statistiche complete (apribili con pstats o snakeviz).
+
+    La memoria di un flusso viene quasi tutta liberata alla fine: un thread
+    campiona periodicamente le allocazioni e il report mostra il campione
+    preso con più memoria occupata, oltre a quella rimasta al termine.
+    Se disabilitato, il flusso viene eseguito senza alcun costo aggiuntivo.
+    """
+    def __init__(self, enabled=PROFILE, report_dir=PROFILE_DIR, top_n=PROFILE_TOP_N, frames=1,
+                 sample_interval=0.5):
+        """
+        Inizializza il profiler
+
+        Args:
+            enabled: Se False, run() e profile() non profilano nulla
+            report_dir: Cartella dei report
+            top_n: Numero di funzioni e di righe di allocazione nei report
+            frames: Frame salvati da tracemalloc per ogni allocazione (più frame = più costo)
+            sample_interval: Secondi tra due campioni della memoria
+        """
+        self.enabled = enabled
+        self.report_dir = report_dir
+        self.top_n = top_n
+        self.frames = frames
+        self.sample_interval = sample_interval
+
+    def run(self, flow, *args, **kwargs):
+        """
+        Esegue una funzione, profilandola se il profiler è abilitato
+
+        Args:
+            flow: Funzione da eseguire (il nome del report è flow.__name__)
+            *args, **kwargs: Argomenti della funzione
+
+        Returns:
+            Il valore restituito dalla funzione
+        """
+        with self.profile(flow.__name__):
+            return flow(*args, **kwargs)
+
+    @contextmanager
+    def profile(self, name):
+        """
+        Context manager che profila il blocco di codice
+
+        Args:
+            name: Nome del flusso (usato nel nome del report)
+        """
+        if not self.enabled:
+            yield
+            return
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(self.frames)
+        tracemalloc.reset_peak()
+
+        before = tracemalloc.take_snapshot()
+        sampler = _MemorySampler(self.sample_interval)
+        sampler.start()
+        profiler = cProfile.Profile()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+
+            sampler.stop()
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+
+            path = self._write_report(name, profiler, before, sampler.snapshot or after, after,
+                                      wall, cpu, current, peak)
+            print(f"\n📝 Profilo di '{name}' salvato in {path}")
+
+    def _write_report(self, name, profiler, before, sampled, after, wall, cpu, current, peak):
+        """
+        Scrive il report testuale e le statistiche cProfile
+
+        Returns:
+            str: Percorso del report testuale
+        """
+        os.makedirs(self.report_dir, exist_ok=True)
+        base = os.path.join(self.report_dir, f"{name}-{datetime.now():%Y%m%d-%H%M%S}")
+
+        profiler.dump_stats(f"{base}.prof")
+
+        # Solo le allocazioni del codice profilato, non di tracemalloc stesso
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        before = before.filter_traces(filters)
+        sampled = sampled.filter_traces(filters).compare_to(before, 'lineno')
+        retained = after.filter_traces(filters).compare_to(before, 'lineno')
+
+        out = io.StringIO()
+        out.write(f"Flusso: {name}\n")
+        out.write(f"Data: {datetime.now():%Y-%m-%d %H:%M:%S}\n")
+        out.write(f"Tempo reale: {wall:.3f}s\n")
+        out.write(f"Tempo CPU: {cpu:.3f}s ({cpu / wall * 100 if wall else 0:.0f}% del tempo reale)\n")
+        out.write(f"Memoria allocata al termine: {current / 1024 / 1024:.1f} MB\n")
+        out.write(f"Picco di memoria: {peak / 1024 / 1024:.1f} MB\n")
+
+        for sort_key, title in (('cumulative', 'TEMPO CUMULATIVO'), ('tottime', 'TEMPO PROPRIO')):
+            out.write(f"\n{'=' * 80}\nTOP {self.top_n} FUNZIONI PER {title}\n{'=' * 80}\n")
+            stats = pstats.Stats(profiler, stream=out)
+            stats.strip_dirs().sort_stats(sort_key).print_stats(self.top_n)
+
+        for stats, title in ((sampled, 'AL PICCO CAMPIONATO'), (retained, 'RIMASTA AL TERMINE')):
+            out.write(f"\n{'=' * 80}\nTOP {self.top_n} RIGHE PER MEMORIA OCCUPATA {title}\n{'=' * 80}\n")
+            for stat in stats[:self.top_n]:
+                out.write(f"{stat.size_diff / 1024:>10.1f} KB  {stat.count_diff:>+8} blocchi  {stat.traceback}\n")
+
+        path = f"{base}.txt"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(out.getvalue())
+
+        return path
+
+
+class _MemorySampler:
+    """
+    Thread che conserva lo snapshot di tracemalloc con più memoria occupata
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self.snapshot = None
+        self.max_size = -1
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        size, _ = tracemalloc.get_traced_memory()
+        if size > self.max_size:
+            self.max_size = size
+            self.snapshot = tracemalloc.take_snapshot()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
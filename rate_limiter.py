@@ -0,0 +1,56 @@
+"""
+Rate limiter condiviso per le chiamate all'API di Spotify
+"""
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket thread-safe: più client (anche su thread diversi)
+    possono condividere lo stesso budget globale di richieste
+    """
+    def __init__(self, rate, burst=None):
+        """
+        Inizializza il rate limiter
+
+        Args:
+            rate: Numero di richieste consentite al secondo
+            burst: Numero massimo di richieste consecutive senza attesa (default = rate)
+        """
+        if rate <= 0:
+            raise ValueError("Il rate deve essere maggiore di zero")
+
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1, rate))
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        """
+        Ricarica i token in base al tempo trascorso (da chiamare con il lock acquisito)
+        """
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.last_refill = now
+
+    def acquire(self, tokens=1):
+        """
+        Attende finché non è disponibile il budget per una richiesta
+
+        Args:
+            tokens: Numero di token da consumare
+        """
+        while True:
+            with self.lock:
+                self._refill()
+
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+
+                wait = (tokens - self.tokens) / self.rate
+
+            time.sleep(wait)
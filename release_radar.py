@@ -0,0 +1,260 @@
+"""
+Radar delle nuove uscite degli artisti seguiti, con stato incrementale e playlist a scorrimento
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+
+# Uscite considerate al primo controllo di un artista (nessuna data salvata)
+DEFAULT_LOOKBACK_DAYS = 30
+
+# Pagina di album per artista e tipo: di solito basta la prima
+ALBUMS_PAGE_SIZE = 10
+
+
+def release_day(album):
+    """
+    Data di uscita completa (AAAA-MM-GG) anche per le date con precisione anno o mese
+
+    Returns:
+        str: Data confrontabile come stringa ('' se assente)
+    """
+    value = album.get('release_date') or ''
+    if len(value) == 4:
+        return f"{value}-01-01"
+    if len(value) == 7:
+        return f"{value}-01"
+    return value
+
+
+class RadarState:
+    """
+    Stato del radar salvato in un file JSON
+
+    Per ogni artista sono salvati la data dell'ultima uscita già vista e gli
+    ID degli album usciti in quella data: al controllo successivo vengono
+    considerate le uscite più recenti e quelle della stessa data non ancora
+    viste. Il file ricorda anche la playlist del radar.
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path: File dello stato (es. ".cache/release_radar.json")
+        """
+        self.path = path
+        self.last_seen = {}
+        self.seen_ids = {}   # {artist_id: ID degli album usciti nella data di last_seen}
+        self.playlist_id = None
+        self.updated = None
+        self.lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.last_seen = data.get('last_seen', {})
+            self.seen_ids = data.get('seen_ids', {})
+            self.playlist_id = data.get('playlist_id')
+            self.updated = data.get('updated')
+
+    def since(self, artist_id, default):
+        with self.lock:
+            return self.last_seen.get(artist_id, default)
+
+    def seen_on_boundary(self, artist_id):
+        with self.lock:
+            return set(self.seen_ids.get(artist_id, []))
+
+    def mark_seen(self, artist_id, albums):
+        """
+        Aggiorna la data dell'ultima uscita vista e gli album di quella data
+
+        Args:
+            artist_id: ID dell'artista
+            albums: Album dell'artista appena controllati
+        """
+        day = max((release_day(album) for album in albums), default='')
+        ids = [album['id'] for album in albums if release_day(album) == day]
+
+        with self.lock:
+            current = self.last_seen.get(artist_id, '')
+            if day > current:
+                self.last_seen[artist_id] = day
+                self.seen_ids[artist_id] = ids
+            elif day and day == current:
+                self.seen_ids[artist_id] = list(dict.fromkeys(self.seen_ids.get(artist_id, []) + ids))
+
+    def save(self):
+        with self.lock:
+            self.updated = time.strftime('%Y-%m-%dT%H:%M:%S')
+            data = {'last_seen': self.last_seen, 'seen_ids': self.seen_ids, 'playlist_id': self.playlist_id,
+                    'updated': self.updated}
+
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+
+            # Scrittura atomica: prima un file temporaneo, poi la sostituzione
+            tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def new_releases(client, artist_id, since, include_groups='album,single', seen_ids=()):
+    """
+    Uscite di un artista non ancora viste
+
+    Gli album di un artista arrivano raggruppati per tipo e dal più recente:
+    per ogni tipo si leggono pagine finché compare un'uscita più vecchia di
+    since, quindi di solito basta una richiesta per tipo. Le uscite della
+    data since sono nuove se il loro ID non è tra quelli già visti.
+
+    Args:
+        client: SpotifyClient
+        artist_id: ID dell'artista
+        since: Data (AAAA-MM-GG) dell'ultima uscita già vista
+        include_groups: Tipi di uscita da controllare
+        seen_ids: ID degli album usciti nella data since già visti
+
+    Returns:
+        list: Album usciti dopo since o in quella data e non ancora visti
+    """
+    releases = []
+
+    for group in include_groups.split(','):
+        offset = 0
+        while True:
+            page = client.get_artist_albums(artist_id, group, limit=ALBUMS_PAGE_SIZE, offset=offset)
+            releases.extend(album for album in page['items']
+                            if release_day(album) > since
+                            or (release_day(album) == since and album['id'] not in seen_ids))
+
+            offset += ALBUMS_PAGE_SIZE
+            if any(release_day(album) < since for album in page['items']) or offset >= page['total']:
+                break
+
+    return releases
+
+
+def run_radar(client, state, playlist_name="Release Radar", max_tracks=200, include_groups='album,single',
+              lookback_days=DEFAULT_LOOKBACK_DAYS, max_workers=8, make_public=False):
+    """
+    Cerca le nuove uscite degli artisti seguiti e le aggiunge alla playlist del radar
+
+    Gli artisti seguiti vengono letti con i cursori, le loro uscite
+    controllate in parallelo. I brani nuovi finiscono in cima alla
+    playlist (a lotti di 100); oltre max_tracks i più vecchi vengono
+    rimossi dal fondo. Le date viste vengono salvate solo dopo aver
+    aggiornato la playlist: se qualcosa va storto, il controllo successivo
+    riprende le stesse uscite.
+
+    Args:
+        client: SpotifyClient con autorizzazione utente
+        state: RadarState
+        playlist_name: Nome della playlist (creata al primo utilizzo)
+        max_tracks: Brani massimi nella playlist
+        include_groups: Tipi di uscita da controllare
+        lookback_days: Giorni considerati per gli artisti mai controllati
+        max_workers: Artisti controllati contemporaneamente
+        make_public: Se True, la playlist creata è pubblica
+
+    Returns:
+        dict: 'artists', 'releases' (album nuovi), 'added', 'removed', 'errors' e 'playlist_id'
+    """
+    print("Recupero gli artisti seguiti...")
+    artists = client.get_all_followed_artists()
+    default_since = (date.today() - timedelta(days=lookback_days)).isoformat()
+
+    def check(artist):
+        try:
+            releases = new_releases(client, artist['id'], state.since(artist['id'], default_since), include_groups,
+                                    state.seen_on_boundary(artist['id']))
+            return artist, releases, None
+        except Exception as e:
+            return artist, [], e
+
+    print(f"Controllo le uscite di {len(artists)} artisti...")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(check, artists))
+
+    errors = [(artist['name'], error) for artist, _, error in results if error]
+    releases = {}
+    for _, albums, _ in results:
+        for album in albums:
+            releases.setdefault(album['id'], album)
+
+    # Dal più recente; lo stesso brano uscito come singolo e nell'album compare una volta sola
+    albums = sorted(releases.values(), key=release_day, reverse=True)
+    full_albums = {album['id']: album for album in client.get_full_albums([album['id'] for album in albums], max_workers)}
+
+    track_uris = []
+    seen_names = set()
+    for album in albums:
+        full = full_albums.get(album['id'])
+        for track in (full['tracks']['items'] if full else []):
+            key = (tuple(a['id'] for a in track.get('artists') or []), client.normalize_track_name(track['name']))
+            if track.get('uri') and key not in seen_names:
+                seen_names.add(key)
+                track_uris.append(track['uri'])
+
+    playlist_id = _radar_playlist(client, state, playlist_name, make_public)
+    added, removed = _update_playlist(client, playlist_id, track_uris, max_tracks)
+
+    for artist, artist_releases, error in results:
+        if not error:
+            state.mark_seen(artist['id'], artist_releases)
+    state.save()
+
+    return {
+        'artists': len(artists),
+        'releases': albums,
+        'added': added,
+        'removed': removed,
+        'errors': errors,
+        'playlist_id': playlist_id
+    }
+
+
+def _radar_playlist(client, state, name, make_public):
+    """
+    ID della playlist del radar; viene ricreata se non esiste più
+    """
+    if state.playlist_id:
+        try:
+            client.get_playlist_snapshot_id(state.playlist_id)
+            return state.playlist_id
+        except Exception:
+            print("⚠️  La playlist del radar non esiste più: ne creo una nuova")
+
+    playlist = client.create_playlist(name, "Nuove uscite degli artisti che segui - Aggiornata automaticamente",
+                                      make_public)
+    state.playlist_id = playlist['id']
+    return playlist['id']
+
+
+def _update_playlist(client, playlist_id, track_uris, max_tracks):
+    """
+    Aggiunge in cima i brani nuovi e toglie dal fondo quelli oltre max_tracks
+
+    Returns:
+        tuple: (brani aggiunti, brani rimossi)
+    """
+    current = [(item.get('track') or {}).get('uri') for item in client.get_playlist_tracks(playlist_id)]
+    present = set(current)
+    new_uris = [uri for uri in track_uris if uri not in present][:max_tracks]
+
+    if new_uris:
+        client.add_tracks_to_playlist(playlist_id, new_uris, position=0)
+
+    # La rimozione toglie tutte le occorrenze di un URI: si rimuovono solo
+    # quelli che non compaiono anche nella parte che resta
+    kept = max(0, max_tracks - len(new_uris))
+    kept_uris = set(current[:kept])
+    overflow = list(dict.fromkeys(uri for uri in current[kept:] if uri and uri not in kept_uris))
+
+    if overflow:
+        client.remove_tracks_from_playlist(playlist_id, overflow)
+
+    return len(new_uris), len(overflow)
@@ -0,0 +1,131 @@
+"""
+Politica di retry con backoff esponenziale e circuit breaker
+"""
+import random
+import threading
+import time
+
+from errors import CircuitOpenError
+
+
+class RetryPolicy:
+    """
+    Backoff esponenziale con jitter ("full jitter") e tempo massimo complessivo
+    """
+    def __init__(self, max_attempts=5, base_delay=0.5, max_delay=30.0, max_elapsed=120.0):
+        """
+        Inizializza la politica di retry
+
+        Args:
+            max_attempts: Numero massimo di tentativi (incluso il primo)
+            base_delay: Attesa base in secondi, raddoppiata a ogni tentativo
+            max_delay: Attesa massima tra due tentativi
+            max_elapsed: Tempo massimo complessivo dedicato ai tentativi
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_elapsed = max_elapsed
+
+    def delay(self, attempt, retry_after=None):
+        """
+        Calcola l'attesa prima del prossimo tentativo
+
+        Args:
+            attempt: Numero del tentativo appena fallito (da 0)
+            retry_after: Attesa suggerita dal server (header Retry-After)
+
+        Returns:
+            float: Secondi di attesa
+        """
+        if retry_after is not None:
+            return min(float(retry_after), self.max_delay)
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def can_retry(self, attempt, started_at, delay):
+        """
+        Indica se è possibile fare un altro tentativo
+
+        Args:
+            attempt: Numero del tentativo appena fallito (da 0)
+            started_at: time.monotonic() del primo tentativo
+            delay: Attesa prevista prima del prossimo tentativo
+
+        Returns:
+            bool: True se c'è ancora margine per riprovare
+        """
+        elapsed = time.monotonic() - started_at
+        return attempt + 1 < self.max_attempts and elapsed + delay <= self.max_elapsed
+
+
+class CircuitBreaker:
+    """
+    Smette di inviare richieste quando l'API è chiaramente non disponibile
+
+    Dopo failure_threshold errori consecutivi il circuito si "apre" e le
+    richieste falliscono subito con CircuitOpenError; dopo reset_timeout
+    secondi viene lasciata passare una richiesta di prova: se riesce il
+    circuito si chiude, altrimenti resta aperto.
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_progress = False
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Da chiamare prima di ogni richiesta
+
+        Returns:
+            bool: True se la richiesta è quella di prova (va poi chiamato release_trial)
+
+        Raises:
+            CircuitOpenError: Se il circuito è aperto
+        """
+        with self.lock:
+            if self.opened_at is None:
+                return False
+
+            waited = time.monotonic() - self.opened_at
+            if waited >= self.reset_timeout and not self.trial_in_progress:
+                # Semi-aperto: passa una sola richiesta di prova
+                self.trial_in_progress = True
+                return True
+
+            raise CircuitOpenError(
+                f"API di Spotify non disponibile: nuove richieste tra {max(0, self.reset_timeout - waited):.0f}s"
+            )
+
+    def record_success(self):
+        """
+        Registra una richiesta riuscita (chiude il circuito)
+        """
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_progress = False
+
+    def record_failure(self):
+        """
+        Registra un errore del server o della connessione
+        """
+        with self.lock:
+            self.failures += 1
+            self.trial_in_progress = False
+
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        """
+        Libera la richiesta di prova qualunque sia stato l'esito
+
+        Senza questa chiamata una prova terminata con un'eccezione imprevista
+        lascerebbe il circuito aperto per sempre.
+        """
+        with self.lock:
+            self.trial_in_progress = False
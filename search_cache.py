@@ -0,0 +1,94 @@
+"""
+Cache dei risultati di ricerca condivisa tra client
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class SearchCache:
+    """
+    Cache thread-safe {(tipo, query, limit): risultati} con scadenza
+
+    I risultati di ricerca cambiano lentamente: per qualche minuto la
+    stessa query può essere servita senza chiamare l'API. Oltre
+    max_entries vengono scartate le voci usate meno di recente.
+    """
+    def __init__(self, ttl=300, max_entries=1000):
+        """
+        Inizializza la cache
+
+        Args:
+            ttl: Secondi di validità di un risultato
+            max_entries: Numero massimo di ricerche in cache
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(search_type, query, limit):
+        return (search_type, ' '.join(query.lower().split()), limit)
+
+    def get(self, search_type, query, limit):
+        """
+        Restituisce i risultati in cache se non scaduti
+
+        Args:
+            search_type: 'artist' o 'track'
+            query: Testo cercato
+            limit: Numero massimo di risultati
+
+        Returns:
+            list: Risultati, oppure None se non in cache o scaduti
+        """
+        key = self._key(search_type, query, limit)
+
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, search_type, query, limit, results):
+        """
+        Salva i risultati di una ricerca
+
+        Args:
+            search_type: 'artist' o 'track'
+            query: Testo cercato
+            limit: Numero massimo di risultati
+            results: Risultati della ricerca
+        """
+        key = self._key(search_type, query, limit)
+
+        with self.lock:
+            self.entries[key] = (time.monotonic(), results)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+    def hit_rate(self):
+        """
+        Calcola la percentuale di ricerche servite dalla cache
+
+        Returns:
+            float: Hit rate tra 0 e 1
+        """
+        with self.lock:
+            total = self.hits + self.misses
+            return self.hits / total if total else 0.0
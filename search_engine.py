@@ -0,0 +1,154 @@
+"""
+Ricerca su più tipi con filtri, oltre la prima pagina di risultati
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+
+SEARCH_TYPES = ('artist', 'album', 'track', 'playlist')
+
+# L'API restituisce al massimo 50 risultati per pagina e non oltre il millesimo
+PAGE_SIZE = 50
+MAX_RESULTS = 1000
+
+# Filtri di campo supportati dall'API (genre vale solo per artisti e brani,
+# year per album, artisti e brani)
+FIELD_FILTERS = ('artist', 'album', 'track', 'year', 'genre', 'isrc', 'upc', 'tag')
+
+
+def build_query(text='', **filters):
+    """
+    Compone il testo di una ricerca con i filtri di campo
+
+    Args:
+        text: Testo libero
+        **filters: Filtri (artist, album, track, year, genre, isrc, upc, tag);
+                   year può essere un anno, "1990-1999" o una coppia (1990, 1999)
+
+    Returns:
+        str: Query per /search (es. 'love artist:"Daft Punk" year:2000-2009')
+
+    Raises:
+        ValueError: Se un filtro non è supportato
+    """
+    parts = [text.strip()] if text and text.strip() else []
+
+    for field, value in filters.items():
+        if field not in FIELD_FILTERS:
+            raise ValueError(f"Filtro non supportato: '{field}'")
+        if value is None or value == '':
+            continue
+
+        if isinstance(value, (tuple, list)):
+            value = f"{value[0]}-{value[1]}"
+        value = str(value).strip()
+
+        # I valori con spazi vanno tra virgolette (es. genre:"indie rock")
+        parts.append(f'{field}:"{value}"' if ' ' in value else f'{field}:{value}')
+
+    return ' '.join(parts)
+
+
+class SearchEngine:
+    """
+    Ricerca su più tipi con una sola query per pagina
+
+    La prima pagina indica quanti risultati esistono per ogni tipo; le pagine
+    successive vengono scaricate in parallelo e chiedono solo i tipi che
+    hanno ancora risultati a quell'offset. I risultati arrivano in ordine di
+    rilevanza, pagina dopo pagina, senza doppioni (tra una pagina e l'altra
+    l'indice dell'API può spostare lo stesso risultato).
+    """
+    def __init__(self, client, max_workers=4, page_size=PAGE_SIZE):
+        """
+        Args:
+            client: SpotifyClient
+            max_workers: Pagine scaricate contemporaneamente
+            page_size: Risultati per tipo in ogni pagina (max 50)
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self.page_size = min(page_size, PAGE_SIZE)
+
+    def stream(self, query, types=('artist', 'track'), max_results=100):
+        """
+        Restituisce i risultati man mano che le pagine arrivano
+
+        Args:
+            query: Testo della ricerca (vedi build_query per i filtri)
+            types: Tipi da cercare (tra SEARCH_TYPES)
+            max_results: Risultati massimi per tipo (max 1000)
+
+        Yields:
+            tuple: (tipo, risultato) in ordine di rilevanza per ogni tipo
+        """
+        types = tuple(types)
+        for search_type in types:
+            if search_type not in SEARCH_TYPES:
+                raise ValueError(f"Tipo di ricerca non valido: '{search_type}'")
+
+        max_results = min(max_results, MAX_RESULTS)
+        seen = {search_type: set() for search_type in types}
+        counts = {search_type: 0 for search_type in types}
+
+        def new_items(page):
+            for search_type in types:
+                for item in (page.get(f'{search_type}s') or {}).get('items') or []:
+                    # L'API a volte restituisce elementi nulli
+                    if not item or item['id'] in seen[search_type] or counts[search_type] >= max_results:
+                        continue
+                    seen[search_type].add(item['id'])
+                    counts[search_type] += 1
+                    yield search_type, item
+
+        first = self.client.search(query, types, limit=min(self.page_size, max_results), offset=0)
+        yield from new_items(first)
+
+        # Risultati da leggere per ogni tipo
+        wanted = {
+            search_type: min((first.get(f'{search_type}s') or {}).get('total', 0), max_results)
+            for search_type in types
+        }
+        end = max(wanted.values(), default=0)
+
+        pages = []
+        for offset in range(self.page_size, end, self.page_size):
+            page_types = tuple(t for t in types if offset < wanted[t])
+            limit = min(self.page_size, max(wanted[t] for t in page_types) - offset)
+            pages.append((page_types, limit, offset))
+
+        if not pages:
+            return
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        futures = [
+            executor.submit(self.client.search, query, page_types, limit, offset)
+            for page_types, limit, offset in pages
+        ]
+
+        try:
+            for future in futures:
+                yield from new_items(future.result())
+        finally:
+            # Se chi legge si ferma prima, le pagine non ancora iniziate vengono annullate
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def search(self, query, types=('artist', 'track'), max_results=100):
+        """
+        Esegue la ricerca e raccoglie tutti i risultati
+
+        Args:
+            query: Testo della ricerca
+            types: Tipi da cercare
+            max_results: Risultati massimi per tipo
+
+        Returns:
+            dict: Dizionario {tipo: lista di risultati in ordine di rilevanza}
+        """
+        results = {search_type: [] for search_type in types}
+
+        for search_type, item in self.stream(query, types, max_results):
+            results[search_type].append(item)
+
+        return results
@@ -0,0 +1,517 @@
+"""
+Servizio HTTP asincrono che espone le funzioni principali del client come endpoint JSON
+
+Avvio:
+    python service.py --port 8080
+
+Le richieste con dati dell'utente devono avere l'header
+"Authorization: Bearer <token utente Spotify>". Le operazioni lunghe
+(divisione per genere) restituiscono eventi JSON uno per riga (NDJSON),
+man mano che procedono.
+"""
+import argparse
+import asyncio
+import json
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+from spotify_client import SpotifyClient
+from artist_cache import ArtistCache
+from search_cache import SearchCache
+from playlist_cache import PlaylistCache
+from rate_limiter import RateLimiter
+from retry import CircuitBreaker
+from errors import AuthenticationError, SpotifyAPIError
+from genre_scoring import group_tracks_by_genre_scores
+from profiling import FlowProfiler
+from config import (
+    CLIENT_ID, CLIENT_SECRET, REDIRECT_URI, SPOTIFY_API_URL, SPOTIFY_AUTH_URL,
+    RATE_LIMIT_PER_SECOND, PLAYLIST_CACHE_DIR, DEFAULT_SEARCH_LIMIT
+)
+
+
+MAX_BODY_SIZE = 1024 * 1024
+REASONS = {200: 'OK', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 429: 'Too Many Requests', 500: 'Internal Server Error',
+           502: 'Bad Gateway', 503: 'Service Unavailable'}
+
+
+class HTTPError(Exception):
+    """
+    Errore da restituire al chiamante con il codice HTTP indicato
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Request:
+    """
+    Richiesta HTTP già interpretata
+    """
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+    def param(self, name, default=None, cast=str):
+        value = self.query.get(name)
+        if value is None:
+            return default
+        try:
+            return cast(value)
+        except ValueError:
+            raise HTTPError(400, f"Parametro non valido: {name}")
+
+    def json(self):
+        if not self.body:
+            return {}
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            raise HTTPError(400, "Corpo JSON non valido")
+
+    def user_token(self):
+        auth = self.headers.get('authorization', '')
+        if not auth.startswith('Bearer ') or not auth[7:].strip():
+            raise HTTPError(401, "Header 'Authorization: Bearer <token utente>' mancante")
+        return auth[7:].strip()
+
+
+class ClientPool:
+    """
+    Un SpotifyClient per utente (indicizzato per token), tutti con le stesse
+    cache, lo stesso rate limiter e lo stesso circuit breaker
+
+    I client sono thread-safe, quindi lo stesso client serve in parallelo
+    tutte le richieste di un utente. Oltre max_clients vengono scartati
+    quelli usati meno di recente.
+    """
+    def __init__(self, max_clients=1000, api_url=SPOTIFY_API_URL, auth_url=SPOTIFY_AUTH_URL,
+                 requests_per_second=RATE_LIMIT_PER_SECOND, playlist_cache_dir=PLAYLIST_CACHE_DIR):
+        self.max_clients = max_clients
+        self.shared = {
+            'artist_cache': ArtistCache(),
+            'search_cache': SearchCache(),
+            'playlist_cache': PlaylistCache(playlist_cache_dir),
+            'rate_limiter': RateLimiter(requests_per_second),
+            'circuit_breaker': CircuitBreaker(),
+            'api_url': api_url,
+            'auth_url': auth_url
+        }
+        self.app_client = self._new_client(None)
+        self.clients = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _new_client(self, user_token):
+        return SpotifyClient(CLIENT_ID, CLIENT_SECRET, redirect_uri=REDIRECT_URI,
+                             user_access_token=user_token, **self.shared)
+
+    def for_user(self, user_token):
+        """
+        Restituisce il client dell'utente, creandolo alla prima richiesta
+
+        Args:
+            user_token: Token utente Spotify
+
+        Returns:
+            SpotifyClient: Client dell'utente
+        """
+        with self.lock:
+            client = self.clients.get(user_token)
+
+            if client is None:
+                client = self._new_client(user_token)
+                # Il servizio non può chiedere l'autorizzazione interattiva
+                client.authorize_user = _no_interactive_auth
+                self.clients[user_token] = client
+
+            self.clients.move_to_end(user_token)
+            while len(self.clients) > self.max_clients:
+                self.clients.popitem(last=False)
+
+            return client
+
+    def stats(self):
+        shared = self.shared
+        with self.lock:
+            clients = len(self.clients)
+            requests = self.app_client.request_count + sum(c.request_count for c in self.clients.values())
+        return {
+            'clients': clients,
+            'api_requests': requests,
+            'artist_cache': {'size': len(shared['artist_cache']), 'hit_rate': shared['artist_cache'].hit_rate()},
+            'search_cache': {'size': len(shared['search_cache']), 'hit_rate': shared['search_cache'].hit_rate()},
+            'playlist_cache': {'hits': shared['playlist_cache'].hits, 'misses': shared['playlist_cache'].misses}
+        }
+
+
+def _no_interactive_auth():
+    raise HTTPError(401, "Token utente non valido o scaduto")
+
+
+def _track_summary(track):
+    return {
+        'id': track.get('id'),
+        'uri': track.get('uri'),
+        'name': track.get('name'),
+        'artists': [artist['name'] for artist in track.get('artists', [])],
+        'duration_ms': track.get('duration_ms')
+    }
+
+
+class SpotifyService:
+    """
+    Endpoint JSON del servizio
+
+    Le chiamate al client sono bloccanti e vengono eseguite in un pool di
+    thread; il ciclo asyncio gestisce solo le connessioni, quindi centinaia
+    di richieste contemporanee non occupano un thread ciascuna. Richieste
+    GET identiche in corso nello stesso momento condividono lo stesso risultato.
+    """
+    def __init__(self, pool, workers=64):
+        self.pool = pool
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='spotify-service')
+        self.inflight = {}
+        self.routes = [
+            ('GET', re.compile(r'^/health$'), self.health),
+            ('GET', re.compile(r'^/stats$'), self.stats),
+            ('GET', re.compile(r'^/search/(artists|tracks)$'), self.search),
+            ('GET', re.compile(r'^/artists/(\w+)$'), self.artist),
+            ('GET', re.compile(r'^/me$'), self.me),
+            ('GET', re.compile(r'^/me/tracks$'), self.saved_tracks),
+            ('GET', re.compile(r'^/me/playlists$'), self.playlists),
+            ('GET', re.compile(r'^/playlists/(\w+)/tracks$'), self.playlist_tracks),
+            ('POST', re.compile(r'^/genres/split$'), self.genre_split)
+        ]
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def _run_shared(self, key, fn, *args):
+        """
+        Esegue fn nel pool; se una chiamata con la stessa chiave è in corso ne attende il risultato
+        """
+        future = self.inflight.get(key)
+
+        if future is None:
+            future = asyncio.ensure_future(self._run(fn, *args))
+            self.inflight[key] = future
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
+
+        return await asyncio.shield(future)
+
+    async def health(self, request):
+        return {'status': 'ok'}
+
+    async def stats(self, request):
+        return self.pool.stats()
+
+    async def _run_app(self, key, fn, *args):
+        """
+        Come _run_shared per le chiamate con il token dell'applicazione
+
+        Un errore di autenticazione con il token dell'applicazione è un
+        problema del servizio, non del chiamante: diventa 502.
+        """
+        try:
+            return await self._run_shared(key, fn, *args)
+        except AuthenticationError as e:
+            raise HTTPError(502, f"Autenticazione del servizio con Spotify non riuscita: {e}") from e
+
+    async def search(self, request, kind):
+        query = request.param('q', '').strip()
+        if not query:
+            raise HTTPError(400, "Parametro 'q' mancante")
+        limit = min(50, request.param('limit', DEFAULT_SEARCH_LIMIT, int))
+
+        client = self.pool.app_client
+        fn = client.search_artist if kind == 'artists' else client.search_track
+        return {'items': await self._run_app(('search', kind, query.lower(), limit), fn, query, limit)}
+
+    async def artist(self, request, artist_id):
+        artist = await self._run_app(('artist', artist_id), self.pool.app_client.get_artist_info, artist_id, True)
+        if artist is None:
+            raise HTTPError(404, "Artista non trovato")
+        return artist
+
+    async def me(self, request):
+        token = request.user_token()
+        return await self._run_shared((token, 'me'), self.pool.for_user(token).get_current_user)
+
+    async def saved_tracks(self, request):
+        token = request.user_token()
+        client = self.pool.for_user(token)
+
+        if 'offset' in request.query or 'limit' in request.query:
+            offset = request.param('offset', 0, int)
+            limit = min(50, request.param('limit', 50, int))
+            return await self._run_shared((token, 'tracks', offset, limit), client.get_saved_tracks, limit, offset)
+
+        items = await self._run_shared((token, 'tracks'), client.get_all_saved_tracks)
+        return {'items': items, 'total': len(items)}
+
+    async def playlists(self, request):
+        token = request.user_token()
+        items = await self._run_shared((token, 'playlists'), self.pool.for_user(token).get_all_user_playlists)
+        return {'items': items, 'total': len(items)}
+
+    async def playlist_tracks(self, request, playlist_id):
+        token = request.user_token()
+        client = self.pool.for_user(token)
+        # La cache delle playlist è condivisa tra gli utenti: lo snapshot_id va
+        # sempre letto con il token di chi chiama (Spotify verifica l'accesso),
+        # mai preso dalla richiesta
+        snapshot_id = await self._run_shared((token, 'snapshot', playlist_id),
+                                             client.get_playlist_snapshot_id, playlist_id)
+        items = await self._run_shared((token, 'playlist', playlist_id, snapshot_id),
+                                       client.get_playlist_tracks, playlist_id, snapshot_id)
+        return {'items': items, 'total': len(items)}
+
+    async def genre_split(self, request):
+        """
+        Divide i brani salvati per genere (ed eventualmente crea le playlist),
+        restituendo un evento per ogni avanzamento e infine il risultato
+        """
+        client = self.pool.for_user(request.user_token())
+        options = request.json()
+        min_tracks = max(1, int(options.get('min_tracks', 5)))
+        weighted = bool(options.get('weighted', False))
+        multi_label = bool(options.get('multi_label', False))
+
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+
+        def progress(stage, done, total):
+            event = {'event': 'progress', 'stage': stage, 'done': done, 'total': total}
+            loop.call_soon_threadsafe(events.put_nowait, event)
+
+        def work():
+            if options.get('create'):
+                playlists = client.create_playlists_by_genre(
+                    min_tracks, bool(options.get('public', False)), confirm=False,
+                    weighted=weighted, multi_label=multi_label, progress_callback=progress
+                )
+                return {'playlists': [
+                    {'id': p['id'], 'name': p['name'], 'url': p['external_urls']['spotify']} for p in playlists
+                ]}
+
+            saved_tracks = client.get_all_saved_tracks(progress)
+            if weighted:
+                groups = group_tracks_by_genre_scores(client, saved_tracks, min_tracks, multi_label,
+                                                      progress_callback=progress)
+            else:
+                groups = client.group_tracks_by_genre(saved_tracks, min_tracks, progress)
+
+            return {'genres': {
+                genre: [_track_summary(track) for track in tracks]
+                for genre, tracks in sorted(groups.items(), key=lambda x: len(x[1]), reverse=True)
+            }}
+
+        future = loop.run_in_executor(self.executor, work)
+        future.add_done_callback(lambda _: events.put_nowait(None))
+
+        async def stream():
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+
+            try:
+                yield {'event': 'result', **future.result()}
+            except Exception as e:
+                yield {'event': 'error', **_error_body(e)[1]}
+
+        return stream()
+
+    async def dispatch(self, request):
+        """
+        Trova l'endpoint della richiesta e lo esegue
+
+        Returns:
+            tuple: (codice HTTP, dict JSON oppure generatore asincrono di eventi)
+        """
+        allowed = False
+        for method, pattern, handler in self.routes:
+            match = pattern.match(request.path)
+            if not match:
+                continue
+            allowed = True
+            if method == request.method:
+                try:
+                    return 200, await handler(request, *match.groups())
+                except Exception as e:
+                    return _error_body(e)
+
+        if allowed:
+            return 405, {'error': {'status': 405, 'message': "Metodo non consentito"}}
+        return 404, {'error': {'status': 404, 'message': "Endpoint non trovato"}}
+
+
+def _error_body(error):
+    """
+    Converte un'eccezione in (codice HTTP, corpo JSON)
+    """
+    if isinstance(error, HTTPError):
+        status = error.status
+    elif isinstance(error, SpotifyAPIError):
+        status = error.status_code if error.status_code in REASONS else 502
+    else:
+        status = 500
+
+    return status, {'error': {'status': status, 'message': str(error)}}
+
+
+async def _read_request(reader):
+    """
+    Legge una richiesta HTTP/1.1 dalla connessione
+
+    Returns:
+        Request: La richiesta, oppure None se la connessione è stata chiusa
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+
+    try:
+        method, target, _ = request_line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise HTTPError(400, "Richiesta non valida")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get('content-length') or 0)
+    if length > MAX_BODY_SIZE:
+        raise HTTPError(413, "Corpo della richiesta troppo grande")
+    body = (await reader.readexactly(length)).decode('utf-8') if length else ''
+
+    parsed = urlparse(target)
+    query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+    return Request(method.upper(), parsed.path.rstrip('/') or '/', query, headers, body)
+
+
+def _head(status, headers):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+async def _write_response(writer, status, payload, keep_alive):
+    """
+    Scrive la risposta: JSON normale oppure eventi NDJSON a blocchi (chunked)
+    """
+    connection = 'keep-alive' if keep_alive else 'close'
+
+    if isinstance(payload, dict):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write(_head(status, {
+            'Content-Type': 'application/json; charset=utf-8',
+            'Content-Length': len(body),
+            'Connection': connection
+        }) + body)
+        await writer.drain()
+        return
+
+    writer.write(_head(status, {
+        'Content-Type': 'application/x-ndjson; charset=utf-8',
+        'Transfer-Encoding': 'chunked',
+        'Connection': connection
+    }))
+
+    async for event in payload:
+        line = (json.dumps(event, ensure_ascii=False) + '\n').encode('utf-8')
+        writer.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        await writer.drain()
+
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+async def _handle_connection(service, reader, writer):
+    """
+    Serve tutte le richieste di una connessione (keep-alive)
+    """
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except HTTPError as e:
+                await _write_response(writer, *_error_body(e), keep_alive=False)
+                break
+
+            if request is None:
+                break
+
+            keep_alive = request.headers.get('connection', '').lower() != 'close'
+            status, payload = await service.dispatch(request)
+            await _write_response(writer, status, payload, keep_alive)
+
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host='127.0.0.1', port=8080, workers=64, pool=None, ready=None):
+    """
+    Avvia il servizio e resta in ascolto finché non viene interrotto
+
+    Args:
+        host: Indirizzo di ascolto
+        port: Porta
+        workers: Thread per le chiamate bloccanti all'API
+        pool: ClientPool (default: uno nuovo con le impostazioni del .env)
+        ready: Funzione chiamata con il server asyncio una volta in ascolto (opzionale)
+    """
+    service = SpotifyService(pool or ClientPool(), workers)
+    server = await asyncio.start_server(
+        lambda r, w: _handle_connection(service, r, w), host, port, backlog=1024
+    )
+
+    if ready:
+        ready(server)
+
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    """
+    Funzione principale
+    """
+    parser = argparse.ArgumentParser(description="Servizio HTTP JSON per le funzioni del client Spotify")
+    parser.add_argument('--host', default='127.0.0.1', help="Indirizzo di ascolto")
+    parser.add_argument('--port', type=int, default=8080, help="Porta")
+    parser.add_argument('--workers', type=int, default=64, help="Thread per le chiamate all'API")
+    parser.add_argument('--rate', type=float, default=RATE_LIMIT_PER_SECOND, help="Richieste al secondo verso Spotify")
+    parser.add_argument('--api-url', default=SPOTIFY_API_URL, help="URL base dell'API (es. stub locale)")
+    parser.add_argument('--auth-url', default=SPOTIFY_AUTH_URL, help="URL per ottenere i token")
+    args = parser.parse_args()
+
+    pool = ClientPool(api_url=args.api_url, auth_url=args.auth_url, requests_per_second=args.rate)
+    print(f"🚀 Servizio in ascolto su http://{args.host}:{args.port} (Ctrl+C per uscire)")
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, pool))
+    except KeyboardInterrupt:
+        print("\n👋 Servizio interrotto")
+
+
+if __name__ == "__main__":
+    # Con PROFILE=true nel .env il comando viene profilato
+    with FlowProfiler().profile('service'):
+        main()
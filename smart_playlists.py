@@ -0,0 +1,323 @@
+"""
+Smart playlist definite da regole, valutate come filtri vettoriali sulle colonne della libreria
+"""
+import json
+import re
+
+import numpy as np
+
+
+# Campi utilizzabili nelle regole
+NUMERIC_FIELDS = ('popularity', 'duration_ms', 'release_year')
+DATE_FIELDS = ('added_at',)
+LABEL_FIELDS = {
+    'genre': ('genre_codes', 'genre_names'),
+    'artist': ('artist_codes', 'artist_names')
+}
+
+CONDITION_PATTERN = re.compile(
+    r'^\s*(?P<field>\w+)\s*(?P<op>not\s+in|in|>=|<=|==|!=|>|<|=)\s*(?P<value>.+?)\s*$',
+    re.IGNORECASE
+)
+
+# Separatori delle clausole e delle condizioni (fuori da {...} e dalle virgolette)
+CLAUSE_SEPARATOR = re.compile(r',')
+OR_SEPARATOR = re.compile(r'\s+or\s+', re.IGNORECASE)
+AND_SEPARATOR = re.compile(r'\s+and\s+', re.IGNORECASE)
+
+
+def _split_outside(text, separator):
+    """
+    Divide il testo sul separatore, ignorando quelli dentro {...} e tra virgolette
+
+    Una virgoletta apre un valore solo a inizio parola (dopo spazio, "{",
+    "," o un operatore), così un apostrofo come in "Guns N' Roses" non
+    viene scambiato per l'inizio di una stringa.
+
+    Args:
+        text: Testo da dividere
+        separator: Espressione regolare compilata del separatore
+
+    Returns:
+        list: Parti del testo
+    """
+    parts = []
+    start = 0
+    depth = 0
+    quote = None
+    i = 0
+
+    while i < len(text):
+        char = text[i]
+
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'' and (i == 0 or text[i - 1] in ' \t{,=<>!'):
+            quote = char
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth = max(0, depth - 1)
+        elif depth == 0:
+            match = separator.match(text, i)
+            if match and match.end() > i:
+                parts.append(text[start:i])
+                start = i = match.end()
+                continue
+
+        i += 1
+
+    parts.append(text[start:])
+    return parts
+
+
+def parse_rule(text):
+    """
+    Interpreta una regola testuale
+
+    Esempio:
+        "genre in {Rock, Indie} and added_at >= 2023 and popularity < 40, sorted by added_at, max 200"
+
+    Args:
+        text: Regola testuale
+
+    Returns:
+        dict: Regola con 'where', 'sort', 'descending' e 'max'
+    """
+    parts = [part.strip() for part in _split_outside(text, CLAUSE_SEPARATOR)]
+    rule = {'where': parts[0], 'sort': None, 'descending': False, 'max': None}
+
+    for part in parts[1:]:
+        sort_match = re.match(r'sorted\s+by\s+(\w+)(\s+desc)?$', part, re.IGNORECASE)
+        max_match = re.match(r'max\s+(\d+)$', part, re.IGNORECASE)
+
+        if sort_match:
+            rule['sort'] = sort_match.group(1)
+            rule['descending'] = bool(sort_match.group(2))
+        elif max_match:
+            rule['max'] = int(max_match.group(1))
+        else:
+            raise ValueError(f"Clausola non riconosciuta: '{part}'")
+
+    return rule
+
+
+def load_rules(path):
+    """
+    Carica le smart playlist da un file JSON
+
+    Il file contiene una lista di oggetti con 'name' e 'rule' (testo) oppure
+    'where', 'sort', 'descending' e 'max' già separati.
+
+    Args:
+        path: Percorso del file
+
+    Returns:
+        list: Lista di regole (dict con 'name', 'where', 'sort', 'descending', 'max')
+    """
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+
+    rules = []
+    for entry in entries:
+        rule = parse_rule(entry['rule']) if 'rule' in entry else {
+            'where': entry['where'],
+            'sort': entry.get('sort'),
+            'descending': entry.get('descending', False),
+            'max': entry.get('max')
+        }
+        rule['name'] = entry['name']
+        rule['description'] = entry.get('description', '')
+        rules.append(rule)
+
+    return rules
+
+
+def _parse_values(value):
+    """
+    Converte "{Rock, Indie}" o "Rock" in una lista di stringhe
+    """
+    value = value.strip()
+    if value.startswith('{') and value.endswith('}'):
+        value = value[1:-1]
+    return [v.strip().strip('\'"') for v in value.split(',') if v.strip()]
+
+
+def _compare(column, op, value):
+    """
+    Applica un operatore di confronto a una colonna NumPy
+    """
+    if op in ('==', '='):
+        return column == value
+    if op == '!=':
+        return column != value
+    if op == '>':
+        return column > value
+    if op == '>=':
+        return column >= value
+    if op == '<':
+        return column < value
+    if op == '<=':
+        return column <= value
+    raise ValueError(f"Operatore non valido: '{op}'")
+
+
+def compile_condition(condition, columns):
+    """
+    Calcola la maschera booleana di una singola condizione
+
+    Args:
+        condition: Condizione testuale (es. "popularity < 40")
+        columns: LibraryColumns
+
+    Returns:
+        numpy.ndarray: Maschera booleana con un elemento per brano
+    """
+    match = CONDITION_PATTERN.match(condition)
+    if not match:
+        raise ValueError(f"Condizione non valida: '{condition}'")
+
+    field = match.group('field').lower()
+    op = re.sub(r'\s+', ' ', match.group('op').lower())
+    value = match.group('value')
+
+    if field in LABEL_FIELDS:
+        codes_attr, names_attr = LABEL_FIELDS[field]
+        names = [str(name).lower() for name in getattr(columns, names_attr)]
+        wanted = {v.lower() for v in _parse_values(value)}
+        wanted_codes = [code for code, name in enumerate(names) if name in wanted]
+        mask = np.isin(getattr(columns, codes_attr), wanted_codes)
+
+        if op in ('in', '==', '='):
+            return mask
+        if op in ('not in', '!='):
+            return ~mask
+        raise ValueError(f"Operatore '{op}' non valido per il campo '{field}'")
+
+    if field in DATE_FIELDS:
+        column = getattr(columns, field)
+        return _compare(column, op, np.datetime64(value.strip('\'"'), 's'))
+
+    if field in NUMERIC_FIELDS:
+        column = getattr(columns, field)
+        if op in ('in', 'not in'):
+            mask = np.isin(column, [float(v) for v in _parse_values(value)])
+            return mask if op == 'in' else ~mask
+        return _compare(column, op, float(value))
+
+    raise ValueError(f"Campo sconosciuto: '{field}'")
+
+
+def _sort_column(field, columns):
+    """
+    Restituisce la colonna su cui ordinare (i campi genre/artist per nome)
+    """
+    if field in LABEL_FIELDS:
+        codes_attr, names_attr = LABEL_FIELDS[field]
+        return getattr(columns, names_attr)[getattr(columns, codes_attr)].astype(str)
+
+    if field in NUMERIC_FIELDS or field in DATE_FIELDS:
+        return getattr(columns, field)
+
+    raise ValueError(f"Campo di ordinamento sconosciuto: '{field}'")
+
+
+def evaluate_rules(rules, columns):
+    """
+    Valuta più smart playlist in un solo passaggio sulle colonne della libreria
+
+    Le condizioni uguali usate da più regole vengono calcolate una sola volta.
+
+    Args:
+        rules: Lista di regole (da load_rules)
+        columns: LibraryColumns
+
+    Returns:
+        dict: Dizionario {nome playlist: lista di URI dei brani}
+    """
+    condition_cache = {}
+    results = {}
+
+    for rule in rules:
+        mask = np.zeros(len(columns), dtype=bool)
+
+        # "or" separa gruppi di condizioni unite da "and"
+        for group in _split_outside(rule['where'], OR_SEPARATOR):
+            group_mask = np.ones(len(columns), dtype=bool)
+
+            for condition in _split_outside(group, AND_SEPARATOR):
+                key = condition.strip().lower()
+                if key not in condition_cache:
+                    condition_cache[key] = compile_condition(condition, columns)
+                group_mask &= condition_cache[key]
+
+            mask |= group_mask
+
+        indices = np.nonzero(mask)[0]
+
+        if rule.get('sort'):
+            sort_column = _sort_column(rule['sort'], columns)[indices]
+            if rule.get('descending'):
+                # Ordina sul rango negato: a parità di valore resta l'ordine della libreria
+                _, ranks = np.unique(sort_column, return_inverse=True)
+                order = np.argsort(-ranks.ravel(), kind='stable')
+            else:
+                order = np.argsort(sort_column, kind='stable')
+            indices = indices[order]
+
+        if rule.get('max'):
+            indices = indices[:rule['max']]
+
+        results[rule['name']] = ['spotify:track:' + track_id for track_id in columns.track_ids[indices]]
+
+    return results
+
+
+def sync_smart_playlists(client, rules, results, make_public=False):
+    """
+    Crea o aggiorna le smart playlist su Spotify, solo se il contenuto è cambiato
+
+    Args:
+        client: SpotifyClient
+        rules: Lista di regole (per le descrizioni)
+        results: Dizionario {nome playlist: lista di URI} da evaluate_rules
+        make_public: Se True, le nuove playlist sono pubbliche
+
+    Returns:
+        dict: Dizionario {nome playlist: 'creata' | 'aggiornata' | 'invariata'}
+    """
+    user_id = client.get_current_user()['id']
+    existing = {
+        playlist['name']: playlist
+        for playlist in client.get_all_user_playlists()
+        if playlist['owner']['id'] == user_id
+    }
+    descriptions = {rule['name']: rule.get('description') for rule in rules}
+
+    status = {}
+
+    for name, track_uris in results.items():
+        playlist = existing.get(name)
+
+        if playlist is None:
+            description = descriptions.get(name) or f"Smart playlist ({len(track_uris)} brani) - Creata automaticamente"
+            playlist = client.create_playlist(name, description, make_public)
+            if track_uris:
+                client.add_tracks_to_playlist(playlist['id'], track_uris)
+            status[name] = 'creata'
+            continue
+
+        current_uris = [
+            item['track']['uri']
+            for item in client.get_playlist_tracks(playlist['id'], playlist.get('snapshot_id'))
+            if item.get('track')
+        ]
+
+        if current_uris == track_uris:
+            status[name] = 'invariata'
+        else:
+            client.replace_playlist_tracks(playlist['id'], track_uris)
+            status[name] = 'aggiornata'
+
+    return status
@@ -5,15 +5,58 @@ import requests
 import base64
 import webbrowser
 from urllib.parse import urlencode, parse_qs, urlparse
+import re
 import secrets
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from artist_cache import ArtistCache
+from batch_loader import BatchLoader
+from errors import AuthenticationError, TransientError, api_error
+from retry import RetryPolicy, CircuitBreaker
+from transport import default_transport
+from genre_scoring import group_tracks_by_genre_scores
+from mood_clusters import group_tracks_by_mood
 from config import GENRE_MAPPING, SPOTIFY_AUTH_URL, SPOTIFY_API_URL, DEFAULT_SEARCH_LIMIT
 
+# Parti del titolo che indicano una ristampa dello stesso brano
+RERELEASE_PATTERN = re.compile(
+    r'\s*(-\s*|\(|\[)[^-()\[\]]*(remaster|deluxe|anniversary|edition|mono|stereo)[^-()\[\]]*(\)|\])?\s*$',
+    re.IGNORECASE
+)
+
+# Differenza massima di durata tra due versioni con lo stesso titolo considerate
+# una ristampa (oltre, es. versioni live o edit radio, sono brani diversi)
+RERELEASE_DURATION_TOLERANCE_MS = 3000
+
+# Numero massimo di brani in una playlist: oltre, i brani vengono divisi in più playlist
+PLAYLIST_MAX_ITEMS = 10000
+
+
+def shard_names(name, count):
+    """
+    Nomi delle playlist in cui vengono divisi i brani (es. "Backup (1/3)")
+    
+    Args:
+        name: Nome della playlist
+        count: Numero di playlist
+        
+    Returns:
+        list: Nomi delle playlist (solo il nome se la playlist è una)
+    """
+    if count <= 1:
+        return [name]
+    return [f"{name} ({i}/{count})" for i in range(1, count + 1)]
+
+
 class SpotifyClient:
     """
     Client per effettuare ricerche su Spotify
     """
-    def __init__(self, client_id, client_secret, redirect_uri='http://localhost:8888/callback'):
+    def __init__(self, client_id, client_secret, redirect_uri='http://localhost:8888/callback',
+                 user_access_token=None, artist_cache=None, rate_limiter=None, playlist_cache=None,
+                 retry_policy=None, circuit_breaker=None, api_url=SPOTIFY_API_URL, auth_url=SPOTIFY_AUTH_URL,
+                 search_cache=None, transport=None):
         """
         Inizializza il client Spotify
         
@@ -21,13 +64,181 @@ class SpotifyClient:
             client_id: Client ID di Spotify
             client_secret: Client Secret di Spotify
             redirect_uri: URI di redirect per OAuth (deve essere configurato nella dashboard Spotify)
+            user_access_token: Token utente già ottenuto (evita l'autorizzazione interattiva)
+            artist_cache: ArtistCache condivisa per le info degli artisti (default: cache privata)
+            rate_limiter: RateLimiter condiviso che limita le richieste al secondo (opzionale)
+            playlist_cache: PlaylistCache per non riscaricare le playlist non modificate (opzionale)
+            retry_policy: RetryPolicy per gli errori temporanei (default: RetryPolicy())
+            circuit_breaker: CircuitBreaker, condivisibile tra più client (default: uno privato)
+            api_url: URL base dell'API (es. un server locale per i test)
+            auth_url: URL per ottenere i token
+            search_cache: SearchCache condivisa per i risultati di ricerca (opzionale)
+            transport: Trasporto HTTP (default: reale, o registrazione/riproduzione secondo il .env)
         """
         self.client_id = client_id
         self.client_secret = client_secret
         self.redirect_uri = redirect_uri
         self.access_token = None
-        self.user_access_token = None  # Token per accesso ai dati utente
+        self.access_token_expires_at = None  # Scadenza di access_token (time.time())
+        self.user_access_token = user_access_token  # Token per accesso ai dati utente
+        self.refresh_token = None  # Token per rinnovare user_access_token senza riautorizzare
+        self.user_token_expires_at = None  # Scadenza di user_access_token (time.time())
+        self.artist_cache = artist_cache if artist_cache is not None else ArtistCache()
+        self.rate_limiter = rate_limiter
+        self.playlist_cache = playlist_cache
+        self.search_cache = search_cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.api_url = api_url.rstrip('/')
+        self.auth_url = auth_url
+        self.request_count = 0  # Numero di chiamate HTTP effettuate
+        
+        self.transport = transport or default_transport()
+        
+        # Il client può essere condiviso tra thread: i token vengono ottenuti
+        # o rinnovati una sola volta sotto token_lock
+        self.token_lock = threading.RLock()
+        self.count_lock = threading.Lock()
+        
+        # Le richieste per singolo ID vengono raggruppate negli endpoint multi-ID
+        self.artist_loader = BatchLoader(self.get_several_artists, max_batch_size=50)
+        self.track_loader = BatchLoader(self.get_several_tracks, max_batch_size=50)
+        self.album_loader = BatchLoader(self.get_several_albums, max_batch_size=20)
+    
+    def _request(self, method, url, idempotent=None, **kwargs):
+        """
+        Esegue una richiesta HTTP rispettando il rate limit e contando le chiamate
+        
+        Gli errori temporanei (connessione, 429, 5xx) vengono ritentati con
+        backoff esponenziale secondo self.retry_policy. Le richieste non
+        idempotenti (POST) vengono ritentate solo quando è certo che il server
+        non le ha eseguite: 429 o connessione mai stabilita.
+        
+        Args:
+            method: Metodo HTTP ('GET', 'POST', ...)
+            url: URL completo della richiesta
+            idempotent: Se la richiesta si può ripetere senza effetti collaterali
+                        (default: True per GET, PUT e DELETE)
+            **kwargs: Argomenti passati al trasporto (headers, params, json, ...)
+            
+        Returns:
+            requests.Response: Risposta HTTP
+            
+        Raises:
+            TransientError: Se la connessione fallisce anche dopo i tentativi
+            CircuitOpenError: Se l'API risulta non disponibile
+        """
+        if idempotent is None:
+            idempotent = method in ('GET', 'PUT', 'DELETE')
+        
+        started_at = time.monotonic()
+        attempt = 0
+        
+        while True:
+            trial = self.circuit_breaker.before_call()
+            
+            try:
+                if self.rate_limiter:
+                    self.rate_limiter.acquire()
+                
+                with self.count_lock:
+                    self.request_count += 1
+                
+                response = self.transport.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                self.circuit_breaker.record_failure()
+                
+                # Con ConnectTimeout la richiesta non è mai arrivata al server
+                safe = idempotent or isinstance(e, requests.exceptions.ConnectTimeout)
+                delay = self.retry_policy.delay(attempt)
+                
+                if not safe or not self.retry_policy.can_retry(attempt, started_at, delay):
+                    raise TransientError(f"Errore di connessione: {e}") from e
+            else:
+                status = response.status_code
+                
+                # Anche un 429 indica che il servizio è raggiungibile
+                if status < 500:
+                    self.circuit_breaker.record_success()
+                    if status != 429:
+                        return response
+                else:
+                    self.circuit_breaker.record_failure()
+                
+                # Con 429 la richiesta non è stata eseguita: si può sempre ripetere
+                retry_after = response.headers.get('Retry-After') if status == 429 else None
+                delay = self.retry_policy.delay(attempt, retry_after)
+                
+                if not (status == 429 or idempotent) or not self.retry_policy.can_retry(attempt, started_at, delay):
+                    return response
+            finally:
+                if trial:
+                    self.circuit_breaker.release_trial()
+            
+            time.sleep(delay)
+            attempt += 1
+    
+    def _access_token_valid(self):
+        """
+        Indica se il token dell'applicazione è presente e non sta per scadere
+        """
+        if not self.access_token:
+            return False
+        
+        expires_at = self.access_token_expires_at
+        return expires_at is None or time.time() < expires_at - 60
+    
+    def _ensure_access_token(self):
+        """
+        Ottiene o rinnova il token dell'applicazione se necessario (una sola volta anche con più thread)
+        
+        Returns:
+            str: Access token
+        """
+        if self._access_token_valid():
+            return self.access_token
+        
+        with self.token_lock:
+            # Un altro thread potrebbe averlo ottenuto mentre si attendeva il lock
+            if not self._access_token_valid():
+                self.get_access_token()
+            return self.access_token
     
+    def _user_token_valid(self):
+        """
+        Indica se il token utente è presente e non sta per scadere
+        """
+        if not self.user_access_token:
+            return False
+        
+        expires_at = self.user_token_expires_at
+        return expires_at is None or time.time() < expires_at - 60
+    
+    def _ensure_user_token(self):
+        """
+        Ottiene o rinnova il token utente se necessario
+        
+        Il rinnovo (o l'autorizzazione interattiva) avviene una sola volta:
+        gli altri thread attendono il lock e poi usano il token ottenuto.
+        
+        Returns:
+            str: Access token utente
+        """
+        if self._user_token_valid():
+            return self.user_access_token
+        
+        with self.token_lock:
+            if self._user_token_valid():
+                return self.user_access_token
+            
+            if self.refresh_token:
+                return self.refresh_user_access_token()
+            
+            if not self.user_access_token:
+                print("Necessaria l'autorizzazione utente...")
+                return self.authorize_user()
+            
+            return self.user_access_token
     
     def get_access_token(self):
         """
@@ -50,14 +261,16 @@ class SpotifyClient:
         
         data = {'grant_type': 'client_credentials'}
         
-        response = requests.post(SPOTIFY_AUTH_URL, headers=headers, data=data)
+        response = self._request('POST', self.auth_url, idempotent=True, headers=headers, data=data)
         
         if response.status_code == 200:
-            self.access_token = response.json()['access_token']
+            token_data = response.json()
+            self.access_token = token_data['access_token']
+            self.access_token_expires_at = time.time() + token_data.get('expires_in', 3600)
             print("✓ Autenticazione riuscita")
             return self.access_token
         else:
-            raise Exception(f"Errore autenticazione: {response.status_code} - {response.text}")
+            raise api_error(response, f"Errore autenticazione: {response.status_code} - {response.text}")
     
     def search_artist(self, artist_name, limit=DEFAULT_SEARCH_LIMIT):
         """
@@ -70,8 +283,12 @@ class SpotifyClient:
         Returns:
             list: Lista di artisti trovati
         """
-        if not self.access_token:
-            self.get_access_token()
+        if self.search_cache is not None:
+            cached = self.search_cache.get('artist', artist_name, limit)
+            if cached is not None:
+                return cached
+        
+        self._ensure_access_token()
         
         headers = {'Authorization': f'Bearer {self.access_token}'}
         params = {
@@ -80,16 +297,20 @@ class SpotifyClient:
             'limit': limit
         }
         
-        response = requests.get(
-            f"{SPOTIFY_API_URL}/search",
+        response = self._request(
+            'GET',
+            f"{self.api_url}/search",
             headers=headers,
             params=params
         )
         
         if response.status_code == 200:
-            return response.json()['artists']['items']
+            results = response.json()['artists']['items']
+            if self.search_cache is not None:
+                self.search_cache.put('artist', artist_name, limit, results)
+            return results
         else:
-            raise Exception(f"Errore ricerca: {response.status_code}")
+            raise api_error(response, f"Errore ricerca: {response.status_code}")
     
     def search_track(self, track_name, limit=DEFAULT_SEARCH_LIMIT):
         """
@@ -102,8 +323,12 @@ class SpotifyClient:
         Returns:
             list: Lista di canzoni trovate
         """
-        if not self.access_token:
-            self.get_access_token()
+        if self.search_cache is not None:
+            cached = self.search_cache.get('track', track_name, limit)
+            if cached is not None:
+                return cached
+        
+        self._ensure_access_token()
         
         headers = {'Authorization': f'Bearer {self.access_token}'}
         params = {
@@ -112,17 +337,65 @@ class SpotifyClient:
             'limit': limit
         }
         
-        response = requests.get(
-            f"{SPOTIFY_API_URL}/search",
+        response = self._request(
+            'GET',
+            f"{self.api_url}/search",
             headers=headers,
             params=params
         )
         
         if response.status_code == 200:
-            return response.json()['tracks']['items']
+            results = response.json()['tracks']['items']
+            if self.search_cache is not None:
+                self.search_cache.put('track', track_name, limit, results)
+            return results
         else:
-            raise Exception(f"Errore ricerca: {response.status_code}")
+            raise api_error(response, f"Errore ricerca: {response.status_code}")
     
+    def search(self, query, types=('artist', 'track'), limit=50, offset=0):
+        """
+        Esegue una ricerca su più tipi con una sola chiamata a /search
+        
+        Args:
+            query: Testo della ricerca (può contenere filtri come artist:, year:, genre:)
+            types: Tipi da cercare ('artist', 'album', 'track', 'playlist')
+            limit: Risultati per tipo (max 50)
+            offset: Posizione del primo risultato (offset + limit <= 1000)
+            
+        Returns:
+            dict: Risposta dell'API, es. {'artists': {'items', 'total', ...}, 'tracks': {...}}
+        """
+        cache_type = f"{','.join(types)}@{offset}"
+        
+        if self.search_cache is not None:
+            cached = self.search_cache.get(cache_type, query, limit)
+            if cached is not None:
+                return cached
+        
+        self._ensure_access_token()
+        
+        headers = {'Authorization': f'Bearer {self.access_token}'}
+        params = {
+            'q': query,
+            'type': ','.join(types),
+            'limit': min(limit, 50),
+            'offset': offset
+        }
+        
+        response = self._request(
+            'GET',
+            f"{self.api_url}/search",
+            headers=headers,
+            params=params
+        )
+        
+        if response.status_code == 200:
+            results = response.json()
+            if self.search_cache is not None:
+                self.search_cache.put(cache_type, query, limit, results)
+            return results
+        else:
+            raise api_error(response, f"Errore ricerca: {response.status_code}")
     
     
     def get_user_authorization_url(self):
@@ -140,7 +413,9 @@ class SpotifyClient:
             'playlist-modify-public',   # Modificare playlist pubbliche
             'playlist-modify-private',  # Modificare playlist private
             'user-read-private',        # Leggere info profilo utente
-            'user-read-email'           # Leggere email utente
+            'user-read-email',          # Leggere email utente
+            'user-read-recently-played', # Leggere i brani ascoltati di recente
+            'user-follow-read'          # Leggere gli artisti seguiti
         ]
         
         # Genera uno state random per sicurezza
@@ -168,8 +443,6 @@ class SpotifyClient:
         Returns:
             str: Access token utente
         """
-        token_url = 'https://accounts.spotify.com/api/token'
-        
         auth_header = base64.b64encode(
             f"{self.client_id}:{self.client_secret}".encode()
         ).decode()
@@ -185,15 +458,53 @@ class SpotifyClient:
             'redirect_uri': self.redirect_uri
         }
         
-        response = requests.post(token_url, headers=headers, data=data)
+        response = self._request('POST', self.auth_url, headers=headers, data=data)
         
         if response.status_code == 200:
             token_data = response.json()
             self.user_access_token = token_data['access_token']
+            self.refresh_token = token_data.get('refresh_token')
+            self.user_token_expires_at = time.time() + token_data.get('expires_in', 3600)
             print("✓ Autenticazione utente riuscita!")
             return self.user_access_token
         else:
-            raise Exception(f"Errore nell'ottenere il token utente: {response.status_code} - {response.text}")
+            raise api_error(response, f"Errore nell'ottenere il token utente: {response.status_code} - {response.text}")
+    
+    def refresh_user_access_token(self):
+        """
+        Rinnova il token utente usando il refresh token (senza interazione)
+        
+        Returns:
+            str: Nuovo access token utente
+        """
+        if not self.refresh_token:
+            raise AuthenticationError("Nessun refresh token disponibile. Riautorizza l'applicazione.")
+        
+        auth_header = base64.b64encode(
+            f"{self.client_id}:{self.client_secret}".encode()
+        ).decode()
+        
+        headers = {
+            'Authorization': f'Basic {auth_header}',
+            'Content-Type': 'application/x-www-form-urlencoded'
+        }
+        
+        data = {
+            'grant_type': 'refresh_token',
+            'refresh_token': self.refresh_token
+        }
+        
+        response = self._request('POST', self.auth_url, idempotent=True, headers=headers, data=data)
+        
+        if response.status_code == 200:
+            token_data = response.json()
+            self.user_access_token = token_data['access_token']
+            # Spotify può restituire un nuovo refresh token
+            self.refresh_token = token_data.get('refresh_token', self.refresh_token)
+            self.user_token_expires_at = time.time() + token_data.get('expires_in', 3600)
+            return self.user_access_token
+        else:
+            raise api_error(response, f"Errore nel rinnovo del token utente: {response.status_code} - {response.text}")
     
     def authorize_user(self):
         """
@@ -254,9 +565,7 @@ class SpotifyClient:
         Returns:
             list: Lista di brani salvati con informazioni aggiuntive
         """
-        if not self.user_access_token:
-            print("Necessaria l'autorizzazione utente...")
-            self.authorize_user()
+        self._ensure_user_token()
         
         headers = {
             'Authorization': f'Bearer {self.user_access_token}'
@@ -267,8 +576,9 @@ class SpotifyClient:
             'offset': offset
         }
         
-        response = requests.get(
-            f"{SPOTIFY_API_URL}/me/tracks",
+        response = self._request(
+            'GET',
+            f"{self.api_url}/me/tracks",
             headers=headers,
             params=params
         )
@@ -276,14 +586,17 @@ class SpotifyClient:
         if response.status_code == 200:
             return response.json()
         elif response.status_code == 401:
-            raise Exception("Token scaduto o non valido. Riautorizza l'applicazione.")
+            raise api_error(response, "Token scaduto o non valido. Riautorizza l'applicazione.")
         else:
-            raise Exception(f"Errore nel recupero dei preferiti: {response.status_code} - {response.text}")
+            raise api_error(response, f"Errore nel recupero dei preferiti: {response.status_code} - {response.text}")
     
-    def get_all_saved_tracks(self):
+    def get_all_saved_tracks(self, progress_callback=None):
         """
         Ottiene TUTTI i brani salvati dell'utente (gestisce la paginazione automaticamente)
         
+        Args:
+            progress_callback: Funzione chiamata come (fase, completati, totale) dopo ogni pagina (opzionale)
+        
         Returns:
             list: Lista completa di tutti i brani salvati
         """
@@ -303,6 +616,9 @@ class SpotifyClient:
             all_tracks.extend(tracks)
             print(f"  Recuperati {len(all_tracks)}/{result['total']} brani...")
             
+            if progress_callback:
+                progress_callback('saved_tracks', len(all_tracks), result['total'])
+            
             # Se abbiamo recuperato tutti i brani, esci
             if len(all_tracks) >= result['total']:
                 break
@@ -312,6 +628,44 @@ class SpotifyClient:
         print(f"✓ Recuperati tutti i {len(all_tracks)} brani preferiti!\n")
         return all_tracks
     
+    def get_recently_played(self, after=None, limit=50):
+        """
+        Ottiene i brani ascoltati di recente dall'utente
+        
+        Args:
+            after: Timestamp Unix in millisecondi; restituisce solo gli ascolti successivi
+            limit: Numero massimo di ascolti (max 50)
+            
+        Returns:
+            dict: Risposta con 'items' (ognuno con 'track' e 'played_at') e 'cursors'
+        """
+        self._ensure_user_token()
+        
+        headers = {
+            'Authorization': f'Bearer {self.user_access_token}'
+        }
+        
+        params = {
+            'limit': min(limit, 50)
+        }
+        
+        if after is not None:
+            params['after'] = after
+        
+        response = self._request(
+            'GET',
+            f"{self.api_url}/me/player/recently-played",
+            headers=headers,
+            params=params
+        )
+        
+        if response.status_code == 200:
+            return response.json()
+        elif response.status_code == 401:
+            raise api_error(response, "Token scaduto o non valido. Riautorizza l'applicazione.")
+        else:
+            raise api_error(response, f"Errore nel recupero degli ascolti recenti: {response.status_code}")
+    
     def get_top_tracks(self, time_range='medium_term', limit=20):
         """
         Ottiene i brani più ascoltati dell'utente
@@ -326,9 +680,7 @@ class SpotifyClient:
         Returns:
             list: Lista dei brani più ascoltati
         """
-        if not self.user_access_token:
-            print("Necessaria l'autorizzazione utente...")
-            self.authorize_user()
+        self._ensure_user_token()
         
         headers = {
             'Authorization': f'Bearer {self.user_access_token}'
@@ -339,8 +691,9 @@ class SpotifyClient:
             'limit': min(limit, 50)
         }
         
-        response = requests.get(
-            f"{SPOTIFY_API_URL}/me/top/tracks",
+        response = self._request(
+            'GET',
+            f"{self.api_url}/me/top/tracks",
             headers=headers,
             params=params
         )
@@ -348,7 +701,7 @@ class SpotifyClient:
         if response.status_code == 200:
             return response.json()['items']
         else:
-            raise Exception(f"Errore nel recupero dei top brani: {response.status_code}")
+            raise api_error(response, f"Errore nel recupero dei top brani: {response.status_code}")
     
     def get_top_artists(self, time_range='medium_term', limit=20):
         """
@@ -361,9 +714,7 @@ class SpotifyClient:
         Returns:
             list: Lista degli artisti più ascoltati
         """
-        if not self.user_access_token:
-            print("Necessaria l'autorizzazione utente...")
-            self.authorize_user()
+        self._ensure_user_token()
         
         headers = {
             'Authorization': f'Bearer {self.user_access_token}'
@@ -374,8 +725,9 @@ class SpotifyClient:
             'limit': min(limit, 50)
         }
         
-        response = requests.get(
-            f"{SPOTIFY_API_URL}/me/top/artists",
+        response = self._request(
+            'GET',
+            f"{self.api_url}/me/top/artists",
             headers=headers,
             params=params
         )
@@ -383,7 +735,74 @@ class SpotifyClient:
         if response.status_code == 200:
             return response.json()['items']
         else:
-            raise Exception(f"Errore nel recupero dei top artisti: {response.status_code}")
+            raise api_error(response, f"Errore nel recupero dei top artisti: {response.status_code}")
+    
+    def get_followed_artists(self, limit=50, after=None):
+        """
+        Ottiene una pagina degli artisti seguiti dall'utente
+        
+        L'endpoint usa un cursore invece dell'offset: la pagina successiva
+        parte dopo l'ID indicato in 'after'.
+        
+        Args:
+            limit: Numero di artisti (max 50)
+            after: ID dell'ultimo artista della pagina precedente (None = prima pagina)
+            
+        Returns:
+            dict: Pagina con 'items', 'total' e 'cursors' ({'after': ID o None})
+        """
+        self._ensure_user_token()
+        
+        headers = {
+            'Authorization': f'Bearer {self.user_access_token}'
+        }
+        
+        params = {
+            'type': 'artist',
+            'limit': min(limit, 50)
+        }
+        
+        if after:
+            params['after'] = after
+        
+        response = self._request(
+            'GET',
+            f"{self.api_url}/me/following",
+            headers=headers,
+            params=params
+        )
+        
+        if response.status_code == 200:
+            return response.json()['artists']
+        elif response.status_code == 401:
+            raise api_error(response, "Token scaduto o non valido. Riautorizza l'applicazione.")
+        else:
+            raise api_error(response, f"Errore nel recupero degli artisti seguiti: {response.status_code}")
+    
+    def get_all_followed_artists(self):
+        """
+        Ottiene TUTTI gli artisti seguiti (segue i cursori pagina dopo pagina)
+        
+        Gli artisti restituiti vengono salvati nella cache degli artisti.
+        
+        Returns:
+            list: Lista completa degli artisti seguiti
+        """
+        artists = []
+        after = None
+        
+        while True:
+            page = self.get_followed_artists(limit=50, after=after)
+            artists.extend(page['items'])
+            
+            for artist in page['items']:
+                self.artist_cache.put(artist['id'], artist)
+            
+            after = (page.get('cursors') or {}).get('after')
+            if not after or not page['items']:
+                break
+        
+        return artists
         
     def get_current_user(self):
         """
@@ -392,23 +811,22 @@ class SpotifyClient:
         Returns:
             dict: Informazioni dell'utente (id, display_name, ecc.)
         """
-        if not self.user_access_token:
-            print("Necessaria l'autorizzazione utente...")
-            self.authorize_user()
+        self._ensure_user_token()
         
         headers = {
             'Authorization': f'Bearer {self.user_access_token}'
         }
         
-        response = requests.get(
-            f"{SPOTIFY_API_URL}/me",
+        response = self._request(
+            'GET',
+            f"{self.api_url}/me",
             headers=headers
         )
         
         if response.status_code == 200:
             return response.json()
         else:
-            raise Exception(f"Errore nel recupero info utente: {response.status_code}")
+            raise api_error(response, f"Errore nel recupero info utente: {response.status_code}")
 
 
     def create_playlist(self, name, description="", public=True):
@@ -423,9 +841,7 @@ class SpotifyClient:
         Returns:
             dict: Informazioni della playlist creata
         """
-        if not self.user_access_token:
-            print("Necessaria l'autorizzazione utente...")
-            self.authorize_user()
+        self._ensure_user_token()
         
         # Ottieni l'ID dell'utente
         user = self.get_current_user()
@@ -442,8 +858,9 @@ class SpotifyClient:
             'public': public
         }
         
-        response = requests.post(
-            f"{SPOTIFY_API_URL}/users/{user_id}/playlists",
+        response = self._request(
+            'POST',
+            f"{self.api_url}/users/{user_id}/playlists",
             headers=headers,
             json=data
         )
@@ -455,23 +872,23 @@ class SpotifyClient:
             print(f"  URL: {playlist['external_urls']['spotify']}")
             return playlist
         else:
-            raise Exception(f"Errore nella creazione della playlist: {response.status_code} - {response.text}")
+            raise api_error(response, f"Errore nella creazione della playlist: {response.status_code} - {response.text}")
 
 
-    def add_tracks_to_playlist(self, playlist_id, track_uris):
+    def add_tracks_to_playlist(self, playlist_id, track_uris, position=None):
         """
         Aggiunge brani a una playlist
         
         Args:
             playlist_id: ID della playlist
             track_uris: Lista di URI dei brani (es. ['spotify:track:xxx', 'spotify:track:yyy'])
+            position: Posizione in cui inserire i brani (None = in fondo); ogni chunk
+                      viene inserito in una posizione esplicita
             
         Returns:
             dict: Snapshot ID della playlist aggiornata
         """
-        if not self.user_access_token:
-            print("Necessaria l'autorizzazione utente...")
-            self.authorize_user()
+        self._ensure_user_token()
         
         headers = {
             'Authorization': f'Bearer {self.user_access_token}',
@@ -481,6 +898,9 @@ class SpotifyClient:
         # Spotify permette max 100 brani per richiesta
         max_tracks = 100
         
+        # Senza brani non si invia nulla: si restituisce lo snapshot attuale
+        response = None
+        
         # Se ci sono più di 100 brani, dividili in chunk
         for i in range(0, len(track_uris), max_tracks):
             chunk = track_uris[i:i + max_tracks]
@@ -488,45 +908,128 @@ class SpotifyClient:
             data = {
                 'uris': chunk
             }
+            chunk_position = None if position is None else position + i
+            if chunk_position is not None:
+                data['position'] = chunk_position
             
-            response = requests.post(
-                f"{SPOTIFY_API_URL}/playlists/{playlist_id}/tracks",
-                headers=headers,
-                json=data
-            )
+            # Un POST fallito con 5xx o per la connessione potrebbe essere stato
+            # eseguito lo stesso: prima di riprovare si controlla la playlist
+            # (la fine o la posizione del chunk), così un chunk non viene mai
+            # aggiunto due volte
+            started_at = time.monotonic()
+            attempt = 0
             
-            if response.status_code not in [200, 201]:
-                raise Exception(f"Errore nell'aggiungere brani: {response.status_code} - {response.text}")
+            while True:
+                try:
+                    response = self._request(
+                        'POST',
+                        f"{self.api_url}/playlists/{playlist_id}/tracks",
+                        headers=headers,
+                        json=data
+                    )
+                    error = None
+                    
+                    if response.status_code in [200, 201]:
+                        break
+                    
+                    error = api_error(response, f"Errore nell'aggiungere brani: {response.status_code} - {response.text}")
+                except TransientError as e:
+                    error = e
+                
+                delay = self.retry_policy.delay(attempt)
+                
+                if not error.retryable or not self.retry_policy.can_retry(attempt, started_at, delay):
+                    raise error
+                
+                if self._playlist_has_tracks_at(playlist_id, chunk, chunk_position):
+                    response = None
+                    break
+                
+                time.sleep(delay)
+                attempt += 1
             
             print(f"✓ Aggiunti {len(chunk)} brani alla playlist")
         
+        if response is None:
+            return {'snapshot_id': self.get_playlist_snapshot_id(playlist_id)}
+        
         return response.json()
+    
+    def _playlist_has_tracks_at(self, playlist_id, track_uris, position=None):
+        """
+        Controlla se una playlist contiene esattamente track_uris a partire da una posizione
+        
+        Args:
+            playlist_id: ID della playlist
+            track_uris: Lista di URI attesi
+            position: Posizione del primo brano (None = in fondo alla playlist)
+            
+        Returns:
+            bool: True se la playlist contiene quei brani in quella posizione
+        """
+        headers = {
+            'Authorization': f'Bearer {self.user_access_token}'
+        }
+        
+        response = self._request(
+            'GET',
+            f"{self.api_url}/playlists/{playlist_id}/tracks",
+            headers=headers,
+            params={'fields': 'total', 'limit': 1}
+        )
+        
+        if response.status_code != 200:
+            return False
+        
+        total = response.json()['total']
+        if position is None:
+            position = total - len(track_uris)
+        if position < 0 or position + len(track_uris) > total:
+            return False
+        
+        response = self._request(
+            'GET',
+            f"{self.api_url}/playlists/{playlist_id}/tracks",
+            headers=headers,
+            params={
+                'fields': 'items(track(uri))',
+                'offset': position,
+                'limit': len(track_uris)
+            }
+        )
+        
+        if response.status_code != 200:
+            return False
+        
+        tail = [item['track']['uri'] for item in response.json()['items'] if item.get('track')]
+        return tail == list(track_uris)
 
 
-    def get_user_playlists(self, limit=50):
+    def get_user_playlists(self, limit=50, offset=0):
         """
         Ottiene le playlist dell'utente
         
         Args:
             limit: Numero massimo di playlist da recuperare
+            offset: Offset per la paginazione
             
         Returns:
             list: Lista delle playlist dell'utente
         """
-        if not self.user_access_token:
-            print("Necessaria l'autorizzazione utente...")
-            self.authorize_user()
+        self._ensure_user_token()
         
         headers = {
             'Authorization': f'Bearer {self.user_access_token}'
         }
         
         params = {
-            'limit': min(limit, 50)
+            'limit': min(limit, 50),
+            'offset': offset
         }
         
-        response = requests.get(
-            f"{SPOTIFY_API_URL}/me/playlists",
+        response = self._request(
+            'GET',
+            f"{self.api_url}/me/playlists",
             headers=headers,
             params=params
         )
@@ -534,70 +1037,332 @@ class SpotifyClient:
         if response.status_code == 200:
             return response.json()['items']
         else:
-            raise Exception(f"Errore nel recupero delle playlist: {response.status_code}")
+            raise api_error(response, f"Errore nel recupero delle playlist: {response.status_code}")
 
 
-    def get_playlist_tracks(self, playlist_id):
+    def get_all_user_playlists(self):
         """
-        Ottiene i brani di una playlist
+        Ottiene TUTTE le playlist dell'utente (gestisce la paginazione automaticamente)
         
-        Args:
-            playlist_id: ID della playlist
-            
         Returns:
-            list: Lista dei brani nella playlist
+            list: Lista completa delle playlist dell'utente
         """
-        if not self.user_access_token:
-            print("Necessaria l'autorizzazione utente...")
-            self.authorize_user()
-        
-        headers = {
-            'Authorization': f'Bearer {self.user_access_token}'
-        }
-        
-        all_tracks = []
+        all_playlists = []
         offset = 0
-        limit = 100
+        limit = 50
         
         while True:
-            params = {
-                'limit': limit,
-                'offset': offset
-            }
+            playlists = self.get_user_playlists(limit=limit, offset=offset)
+            all_playlists.extend(playlists)
             
-            response = requests.get(
-                f"{SPOTIFY_API_URL}/playlists/{playlist_id}/tracks",
-                headers=headers,
-                params=params
-            )
+            if len(playlists) < limit:
+                break
             
-            if response.status_code == 200:
-                data = response.json()
-                tracks = data['items']
-                
-                if not tracks:
-                    break
-                
-                all_tracks.extend(tracks)
-                
-                if len(all_tracks) >= data['total']:
-                    break
-                
-                offset += limit
-            else:
-                raise Exception(f"Errore nel recupero dei brani: {response.status_code}")
+            offset += limit
         
-        return all_tracks
+        return all_playlists
 
 
-    def create_playlist_from_top_tracks(self, name="My Top Tracks", time_range='medium_term', limit=50):
+    def replace_playlist_tracks(self, playlist_id, track_uris):
         """
-        Crea automaticamente una playlist con i tuoi top brani
+        Sostituisce tutti i brani di una playlist
         
         Args:
-            name: Nome della playlist
-            time_range: Periodo di tempo ('short_term', 'medium_term', 'long_term')
-            limit: Numero di brani da includere
+            playlist_id: ID della playlist
+            track_uris: Lista di URI dei nuovi brani
+            
+        Returns:
+            dict: Snapshot ID della playlist aggiornata
+        """
+        self._ensure_user_token()
+        
+        headers = {
+            'Authorization': f'Bearer {self.user_access_token}',
+            'Content-Type': 'application/json'
+        }
+        
+        # Il PUT accetta al massimo 100 brani: gli altri vengono aggiunti dopo
+        response = self._request(
+            'PUT',
+            f"{self.api_url}/playlists/{playlist_id}/tracks",
+            headers=headers,
+            json={'uris': track_uris[:100]}
+        )
+        
+        if response.status_code not in [200, 201]:
+            raise api_error(response, f"Errore nella sostituzione dei brani: {response.status_code} - {response.text}")
+        
+        if len(track_uris) > 100:
+            return self.add_tracks_to_playlist(playlist_id, track_uris[100:])
+        
+        return response.json()
+
+
+    def reorder_playlist_tracks(self, playlist_id, range_start, insert_before, range_length=1, snapshot_id=None):
+        """
+        Sposta un intervallo di brani all'interno di una playlist
+        
+        Le posizioni si riferiscono alla playlist prima dello spostamento
+        (come nell'API). Con snapshot_id lo spostamento viene applicato a
+        quella versione della playlist.
+        
+        Args:
+            playlist_id: ID della playlist
+            range_start: Posizione del primo brano da spostare
+            insert_before: Posizione davanti alla quale inserire i brani
+            range_length: Numero di brani consecutivi da spostare
+            snapshot_id: Versione della playlist su cui applicare lo spostamento (opzionale)
+            
+        Returns:
+            str: snapshot_id della playlist aggiornata
+        """
+        self._ensure_user_token()
+        
+        headers = {
+            'Authorization': f'Bearer {self.user_access_token}',
+            'Content-Type': 'application/json'
+        }
+        
+        data = {
+            'range_start': range_start,
+            'insert_before': insert_before,
+            'range_length': range_length
+        }
+        if snapshot_id:
+            data['snapshot_id'] = snapshot_id
+        
+        # Ripetere uno spostamento già eseguito sposterebbe altri brani: non è idempotente
+        response = self._request(
+            'PUT',
+            f"{self.api_url}/playlists/{playlist_id}/tracks",
+            idempotent=False,
+            headers=headers,
+            json=data
+        )
+        
+        if response.status_code == 200:
+            return response.json()['snapshot_id']
+        else:
+            raise api_error(response, f"Errore nello spostamento dei brani: {response.status_code} - {response.text}")
+
+
+    def remove_tracks_from_playlist(self, playlist_id, track_uris, snapshot_id=None):
+        """
+        Rimuove brani da una playlist (tutte le occorrenze di ogni URI)
+        
+        Args:
+            playlist_id: ID della playlist
+            track_uris: Lista di URI dei brani da rimuovere
+            snapshot_id: Versione della playlist su cui applicare la rimozione (opzionale)
+            
+        Returns:
+            str: snapshot_id della playlist aggiornata
+        """
+        self._ensure_user_token()
+        
+        headers = {
+            'Authorization': f'Bearer {self.user_access_token}',
+            'Content-Type': 'application/json'
+        }
+        
+        # Spotify permette max 100 brani per richiesta
+        for i in range(0, len(track_uris), 100):
+            data = {
+                'tracks': [{'uri': uri} for uri in track_uris[i:i + 100]]
+            }
+            if snapshot_id:
+                data['snapshot_id'] = snapshot_id
+            
+            response = self._request(
+                'DELETE',
+                f"{self.api_url}/playlists/{playlist_id}/tracks",
+                headers=headers,
+                json=data
+            )
+            
+            if response.status_code != 200:
+                raise api_error(response, f"Errore nella rimozione dei brani: {response.status_code} - {response.text}")
+            
+            snapshot_id = response.json()['snapshot_id']
+        
+        return snapshot_id
+
+
+    def get_playlist_snapshot_id(self, playlist_id):
+        """
+        Ottiene solo lo snapshot_id di una playlist (richiesta limitata con 'fields')
+        
+        Args:
+            playlist_id: ID della playlist
+            
+        Returns:
+            str: snapshot_id attuale della playlist
+        """
+        self._ensure_user_token()
+        
+        headers = {
+            'Authorization': f'Bearer {self.user_access_token}'
+        }
+        
+        response = self._request(
+            'GET',
+            f"{self.api_url}/playlists/{playlist_id}",
+            headers=headers,
+            params={'fields': 'snapshot_id'}
+        )
+        
+        if response.status_code == 200:
+            return response.json()['snapshot_id']
+        else:
+            raise api_error(response, f"Errore nel recupero della playlist: {response.status_code}")
+
+
+    def get_playlist_tracks(self, playlist_id, snapshot_id=None):
+        """
+        Ottiene i brani di una playlist
+        
+        Se il client ha una PlaylistCache, i brani vengono riscaricati solo
+        quando lo snapshot_id della playlist è cambiato.
+        
+        Args:
+            playlist_id: ID della playlist
+            snapshot_id: snapshot_id attuale, se già noto (es. dall'elenco delle playlist)
+            
+        Returns:
+            list: Lista dei brani nella playlist
+        """
+        if self.playlist_cache is None:
+            return self._download_playlist_tracks(playlist_id)
+        
+        if snapshot_id is None:
+            snapshot_id = self.get_playlist_snapshot_id(playlist_id)
+        
+        cached = self.playlist_cache.get(playlist_id, snapshot_id)
+        if cached is not None:
+            return cached
+        
+        all_tracks = self._download_playlist_tracks(playlist_id)
+        self.playlist_cache.put(playlist_id, snapshot_id, all_tracks)
+        return all_tracks
+
+
+    def verify_playlist_tracks(self, playlist_id, track_uris):
+        """
+        Confronta i brani di una playlist con l'elenco atteso
+        
+        Args:
+            playlist_id: ID della playlist
+            track_uris: Lista di URI attesi, nell'ordine
+            
+        Returns:
+            bool: True se la playlist contiene esattamente quei brani in quell'ordine
+        """
+        snapshot_id = self.get_playlist_snapshot_id(playlist_id)
+        actual = [(item.get('track') or {}).get('uri') for item in self.get_playlist_tracks(playlist_id, snapshot_id)]
+        
+        if actual == list(track_uris):
+            return True
+        
+        mismatch = next(
+            (i for i, (expected, found) in enumerate(zip(track_uris, actual)) if expected != found),
+            min(len(actual), len(track_uris))
+        )
+        print(f"⚠️  La playlist {playlist_id} ha {len(actual)} brani invece di {len(track_uris)}, "
+              f"primo brano diverso in posizione {mismatch}")
+        return False
+
+
+    def get_all_playlists_tracks(self):
+        """
+        Ottiene i brani di tutte le playlist dell'utente
+        
+        Lo snapshot_id di ogni playlist arriva con l'elenco delle playlist:
+        con la cache, solo le playlist modificate vengono riscaricate.
+        
+        Returns:
+            dict: Dizionario {playlist_id: lista dei brani}
+        """
+        return {
+            playlist['id']: self.get_playlist_tracks(playlist['id'], playlist.get('snapshot_id'))
+            for playlist in self.get_all_user_playlists()
+        }
+
+
+    def get_playlist_tracks_page(self, playlist_id, limit=100, offset=0):
+        """
+        Ottiene una pagina dei brani di una playlist
+        
+        Args:
+            playlist_id: ID della playlist
+            limit: Numero massimo di brani (max 100 per richiesta)
+            offset: Offset per la paginazione
+            
+        Returns:
+            dict: Risposta con 'items' e 'total'
+        """
+        self._ensure_user_token()
+        
+        headers = {
+            'Authorization': f'Bearer {self.user_access_token}'
+        }
+        
+        params = {
+            'limit': min(limit, 100),
+            'offset': offset
+        }
+        
+        response = self._request(
+            'GET',
+            f"{self.api_url}/playlists/{playlist_id}/tracks",
+            headers=headers,
+            params=params
+        )
+        
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise api_error(response, f"Errore nel recupero dei brani: {response.status_code}")
+
+
+    def _download_playlist_tracks(self, playlist_id):
+        """
+        Scarica tutte le pagine dei brani di una playlist
+        
+        Args:
+            playlist_id: ID della playlist
+            
+        Returns:
+            list: Lista dei brani nella playlist
+        """
+        all_tracks = []
+        offset = 0
+        limit = 100
+        
+        while True:
+            data = self.get_playlist_tracks_page(playlist_id, limit=limit, offset=offset)
+            tracks = data['items']
+            
+            if not tracks:
+                break
+            
+            all_tracks.extend(tracks)
+            
+            if len(all_tracks) >= data['total']:
+                break
+            
+            offset += limit
+        
+        return all_tracks
+
+
+    def create_playlist_from_top_tracks(self, name="My Top Tracks", time_range='medium_term', limit=50):
+        """
+        Crea automaticamente una playlist con i tuoi top brani
+        
+        Args:
+            name: Nome della playlist
+            time_range: Periodo di tempo ('short_term', 'medium_term', 'long_term')
+            limit: Numero di brani da includere
             
         Returns:
             dict: Informazioni della playlist creata
@@ -636,16 +1401,74 @@ class SpotifyClient:
         return playlist
 
 
+    def create_sharded_playlist(self, name, track_uris, description="", public=False, max_workers=4, verify=True):
+        """
+        Crea una playlist con i brani indicati, divisa in più playlist se supera il limite di Spotify
+        
+        Oltre PLAYLIST_MAX_ITEMS brani vengono create le playlist "Nome (1/3)",
+        "Nome (2/3)", ... e caricate in parallelo. Dentro ogni playlist i chunk
+        sono inseriti in posizioni esplicite: l'ordine è garantito anche
+        quando un chunk viene riprovato. Alla fine ogni playlist viene
+        riscaricata e confrontata con l'elenco atteso.
+        
+        I chunk di una stessa playlist vengono inviati uno dopo l'altro: ogni
+        inserimento sposta gli indici dei successivi, quindi due scritture
+        contemporanee potrebbero scambiarsi di posizione qualunque sia
+        l'ordine di invio. Il parallelismo è solo tra playlist diverse: sotto
+        PLAYLIST_MAX_ITEMS brani il caricamento resta sequenziale.
+        
+        Args:
+            name: Nome della playlist
+            track_uris: Lista di URI dei brani, nell'ordine
+            description: Descrizione delle playlist
+            public: Se True, le playlist sono pubbliche
+            max_workers: Playlist caricate contemporaneamente
+            verify: Se True, controlla il contenuto finale di ogni playlist
+            
+        Returns:
+            list: Playlist create, con 'verified' (None se non controllata)
+            
+        Raises:
+            ValueError: Se non ci sono brani (nessuna playlist viene creata)
+        """
+        if not track_uris:
+            raise ValueError(f"Nessun brano da aggiungere alla playlist '{name}'")
+        
+        shards = [track_uris[i:i + PLAYLIST_MAX_ITEMS] for i in range(0, len(track_uris), PLAYLIST_MAX_ITEMS)]
+        
+        if len(shards) > 1:
+            print(f"⚠️  {len(track_uris)} brani superano il limite di {PLAYLIST_MAX_ITEMS} per playlist: "
+                  f"li divido in {len(shards)} playlist")
+        
+        playlists = [
+            self.create_playlist(shard_name, description, public)
+            for shard_name in shard_names(name, len(shards))
+        ]
+        
+        def upload(playlist, uris):
+            self.add_tracks_to_playlist(playlist['id'], uris, position=0)
+            playlist['verified'] = self.verify_playlist_tracks(playlist['id'], uris) if verify else None
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # list() propaga il primo errore di caricamento
+            list(executor.map(upload, playlists, shards))
+        
+        return playlists
+
+
     def create_playlist_from_saved_tracks(self, name="My Liked Songs Backup", max_tracks=None):
         """
         Crea una playlist con tutti (o alcuni) i tuoi brani salvati
         
+        Se i brani superano il limite di una playlist vengono divisi in più
+        playlist "Nome (1/N)".
+        
         Args:
             name: Nome della playlist
             max_tracks: Numero massimo di brani (None = tutti)
             
         Returns:
-            dict: Informazioni della playlist creata
+            list: Playlist create (una sola se i brani stanno in una playlist)
         """
         print(f"\nCreo playlist '{name}'...")
         
@@ -660,49 +1483,524 @@ class SpotifyClient:
         if max_tracks:
             saved_tracks = saved_tracks[:max_tracks]
         
-        # Crea la playlist
-        description = f"Backup di {len(saved_tracks)} brani dai miei preferiti - Creata automaticamente"
-        playlist = self.create_playlist(name, description, public=False)
-        
         # Estrai gli URI dei brani
         track_uris = [item['track']['uri'] for item in saved_tracks if item['track']]
         
-        # Aggiungi i brani alla playlist
-        print(f"Aggiungo {len(track_uris)} brani alla playlist...")
-        self.add_tracks_to_playlist(playlist['id'], track_uris)
+        if not track_uris:
+            raise Exception("Nessun brano salvato disponibile (tutti rimossi da Spotify)")
+        
+        # Crea le playlist e aggiungi i brani
+        description = f"Backup di {len(saved_tracks)} brani dai miei preferiti - Creata automaticamente"
+        print(f"Aggiungo {len(track_uris)} brani...")
+        playlists = self.create_sharded_playlist(name, track_uris, description, public=False)
         
         print(f"\n✓ Playlist completata!")
         print(f"  {len(track_uris)} brani aggiunti")
-        print(f"  Apri su Spotify: {playlist['external_urls']['spotify']}")
+        for playlist in playlists:
+            status = "✓" if playlist['verified'] else "⚠️  contenuto diverso dall'atteso"
+            print(f"  {playlist['name']}: {playlist['external_urls']['spotify']} {status}")
         
-        return playlist
+        return playlists
     
-    def get_artist_info(self, artist_id):
+    def get_artist_info(self, artist_id, strict=False):
         """
         Ottiene informazioni dettagliate su un artista (inclusi i generi)
         
+        Le richieste di più chiamanti vengono raggruppate automaticamente
+        in un'unica chiamata a /artists?ids=...
+        
         Args:
             artist_id: ID dell'artista
+            strict: Se True, gli errori dell'API vengono sollevati invece di restituire None
             
         Returns:
-            dict: Informazioni complete dell'artista
+            dict: Informazioni complete dell'artista, None se non trovato
         """
-        if not self.access_token:
-            self.get_access_token()
+        cached = self.artist_cache.get(artist_id)
+        if cached is not None:
+            return cached
+        
+        try:
+            return self.artist_loader.get(artist_id)
+        except Exception:
+            if strict:
+                raise
+            return None
+    
+    def get_track_info(self, track_id):
+        """
+        Ottiene le informazioni di un brano (raggruppate in /tracks?ids=...)
+        
+        Args:
+            track_id: ID del brano
+            
+        Returns:
+            dict: Informazioni del brano, None se non trovato
+        """
+        return self.track_loader.get(track_id)
+    
+    def get_album_info(self, album_id):
+        """
+        Ottiene le informazioni di un album (raggruppate in /albums?ids=...)
+        
+        Args:
+            album_id: ID dell'album
+            
+        Returns:
+            dict: Informazioni dell'album, None se non trovato
+        """
+        return self.album_loader.get(album_id)
+    
+    def prefetch_artists(self, artist_ids):
+        """
+        Carica in anticipo le info di più artisti con richieste multi-ID
+        
+        Args:
+            artist_ids: Lista di ID degli artisti
+            
+        Returns:
+            dict: Dizionario {artist_id: info artista} (None se non trovato)
+        """
+        unique_ids = list(dict.fromkeys(artist_ids))
+        
+        artists = {}
+        missing_ids = []
+        for artist_id in unique_ids:
+            # Artisti senza ID (es. file locali): il loader non li accetta
+            if not artist_id:
+                artists[artist_id] = None
+                continue
+            cached = self.artist_cache.get(artist_id)
+            if cached is not None:
+                artists[artist_id] = cached
+            else:
+                missing_ids.append(artist_id)
+        
+        futures = self.artist_loader.load_many(missing_ids)
+        
+        for artist_id, future in zip(missing_ids, futures):
+            try:
+                artists[artist_id] = future.result()
+            except Exception:
+                artists[artist_id] = None
+        
+        return artists
+    
+    def _get_several(self, endpoint, result_key, ids):
+        """
+        Esegue una richiesta a un endpoint multi-ID (/artists, /tracks, /albums)
+        
+        Args:
+            endpoint: Percorso dell'endpoint (es. '/artists')
+            result_key: Chiave della lista nella risposta (es. 'artists')
+            ids: Lista di ID
+            
+        Returns:
+            list: Risultati nello stesso ordine degli ID (None per quelli non trovati)
+        """
+        self._ensure_access_token()
         
         headers = {
             'Authorization': f'Bearer {self.access_token}'
         }
         
-        response = requests.get(
-            f"{SPOTIFY_API_URL}/artists/{artist_id}",
+        response = self._request(
+            'GET',
+            f"{self.api_url}{endpoint}",
+            headers=headers,
+            params={'ids': ','.join(ids)}
+        )
+        
+        if response.status_code == 200:
+            return response.json()[result_key]
+        else:
+            raise api_error(response, f"Errore nel recupero di {result_key}: {response.status_code}")
+    
+    def get_several_artists(self, artist_ids):
+        """
+        Ottiene le informazioni di più artisti con una sola richiesta
+        
+        Args:
+            artist_ids: Lista di ID degli artisti (max 50)
+            
+        Returns:
+            list: Lista di artisti nello stesso ordine degli ID
+        """
+        artists = self._get_several('/artists', 'artists', artist_ids)
+        
+        for artist_id, artist_info in zip(artist_ids, artists):
+            if artist_info:
+                self.artist_cache.put(artist_id, artist_info)
+        
+        return artists
+    
+    def get_several_tracks(self, track_ids):
+        """
+        Ottiene le informazioni di più brani con una sola richiesta
+        
+        Args:
+            track_ids: Lista di ID dei brani (max 50)
+            
+        Returns:
+            list: Lista di brani nello stesso ordine degli ID
+        """
+        return self._get_several('/tracks', 'tracks', track_ids)
+    
+    def get_several_audio_features(self, track_ids):
+        """
+        Ottiene le audio features (energy, valence, tempo, ...) di più brani con una sola richiesta
+        
+        Args:
+            track_ids: Lista di ID dei brani (max 100)
+            
+        Returns:
+            list: Audio features nello stesso ordine degli ID (None se non disponibili)
+        """
+        return self._get_several('/audio-features', 'audio_features', track_ids)
+    
+    def get_several_albums(self, album_ids):
+        """
+        Ottiene le informazioni di più album con una sola richiesta
+        
+        Args:
+            album_ids: Lista di ID degli album (max 20)
+            
+        Returns:
+            list: Lista di album nello stesso ordine degli ID
+        """
+        return self._get_several('/albums', 'albums', album_ids)
+
+
+    def get_related_artists(self, artist_id):
+        """
+        Ottiene gli artisti correlati a un artista
+        
+        Gli artisti restituiti vengono salvati nella cache degli artisti.
+        
+        Args:
+            artist_id: ID dell'artista
+            
+        Returns:
+            list: Lista di artisti correlati (max 20)
+        """
+        self._ensure_access_token()
+        
+        headers = {
+            'Authorization': f'Bearer {self.access_token}'
+        }
+        
+        response = self._request(
+            'GET',
+            f"{self.api_url}/artists/{artist_id}/related-artists",
             headers=headers
         )
         
+        if response.status_code == 200:
+            artists = response.json()['artists']
+            for artist in artists:
+                self.artist_cache.put(artist['id'], artist)
+            return artists
+        else:
+            raise api_error(response, f"Errore nel recupero degli artisti correlati: {response.status_code}")
+    
+    def get_artist_top_tracks(self, artist_id, market='IT'):
+        """
+        Ottiene i brani più popolari di un artista
+        
+        Args:
+            artist_id: ID dell'artista
+            market: Codice paese ISO (es. 'IT')
+            
+        Returns:
+            list: Lista dei brani più popolari (max 10)
+        """
+        self._ensure_access_token()
+        
+        headers = {
+            'Authorization': f'Bearer {self.access_token}'
+        }
+        
+        response = self._request(
+            'GET',
+            f"{self.api_url}/artists/{artist_id}/top-tracks",
+            headers=headers,
+            params={'market': market}
+        )
+        
+        if response.status_code == 200:
+            return response.json()['tracks']
+        else:
+            raise api_error(response, f"Errore nel recupero dei top brani dell'artista: {response.status_code}")
+    
+    def get_artist_albums(self, artist_id, include_groups='album,single', limit=50, offset=0):
+        """
+        Ottiene una pagina degli album di un artista
+        
+        Args:
+            artist_id: ID dell'artista
+            include_groups: Tipi di album ('album', 'single', 'appears_on', 'compilation')
+            limit: Numero di album per pagina (max 50)
+            offset: Offset per la paginazione
+            
+        Returns:
+            dict: Pagina di album (con 'items' e 'total')
+        """
+        self._ensure_access_token()
+        
+        headers = {
+            'Authorization': f'Bearer {self.access_token}'
+        }
+        
+        params = {
+            'include_groups': include_groups,
+            'limit': min(limit, 50),
+            'offset': offset
+        }
+        
+        response = self._request(
+            'GET',
+            f"{self.api_url}/artists/{artist_id}/albums",
+            headers=headers,
+            params=params
+        )
+        
         if response.status_code == 200:
             return response.json()
         else:
-            return None
+            raise api_error(response, f"Errore nel recupero degli album: {response.status_code}")
+    
+    def get_album_tracks(self, album_id, limit=50, offset=0):
+        """
+        Ottiene una pagina dei brani di un album
+        
+        Args:
+            album_id: ID dell'album
+            limit: Numero di brani per pagina (max 50)
+            offset: Offset per la paginazione
+            
+        Returns:
+            dict: Pagina di brani (con 'items' e 'total')
+        """
+        self._ensure_access_token()
+        
+        headers = {
+            'Authorization': f'Bearer {self.access_token}'
+        }
+        
+        params = {
+            'limit': min(limit, 50),
+            'offset': offset
+        }
+        
+        response = self._request(
+            'GET',
+            f"{self.api_url}/albums/{album_id}/tracks",
+            headers=headers,
+            params=params
+        )
+        
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise api_error(response, f"Errore nel recupero dei brani dell'album: {response.status_code}")
+    
+    def get_all_artist_albums(self, artist_id, include_groups='album,single', max_workers=8):
+        """
+        Ottiene TUTTI gli album di un artista (pagine successive in parallelo)
+        
+        Args:
+            artist_id: ID dell'artista
+            include_groups: Tipi di album da includere
+            max_workers: Numero massimo di richieste contemporanee
+            
+        Returns:
+            list: Lista di album semplificati
+        """
+        limit = 50
+        first_page = self.get_artist_albums(artist_id, include_groups, limit=limit)
+        albums = list(first_page['items'])
+        
+        offsets = range(limit, first_page['total'], limit)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pages = executor.map(
+                lambda offset: self.get_artist_albums(artist_id, include_groups, limit, offset),
+                offsets
+            )
+            for page in pages:
+                albums.extend(page['items'])
+        
+        return albums
+    
+    def get_full_albums(self, album_ids, max_workers=8):
+        """
+        Ottiene gli album completi di tutti i brani
+        
+        Gli album vengono richiesti a gruppi di 20 con /albums?ids=..., gli
+        album con più di 50 brani vengono completati pagina per pagina.
+        
+        Args:
+            album_ids: Lista di ID degli album (i doppioni vengono ignorati)
+            max_workers: Numero massimo di richieste contemporanee
+            
+        Returns:
+            list: Album completi (con tutti i brani in 'tracks'), nello stesso ordine
+        """
+        album_ids = list(dict.fromkeys(album_ids))
+        batches = [album_ids[i:i + 20] for i in range(0, len(album_ids), 20)]
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            full_albums = [
+                album
+                for batch in executor.map(self.get_several_albums, batches)
+                for album in batch
+                if album
+            ]
+            
+            # Pagine mancanti degli album lunghi
+            extra_pages = [
+                (album, offset)
+                for album in full_albums
+                for offset in range(len(album['tracks']['items']), album['tracks']['total'], 50)
+            ]
+            pages = executor.map(
+                lambda job: (job[0], self.get_album_tracks(job[0]['id'], 50, job[1])),
+                extra_pages
+            )
+            for album, page in pages:
+                album['tracks']['items'].extend(page['items'])
+        
+        return full_albums
+    
+    def get_artist_discography(self, artist_id, include_groups='album,single', max_workers=8):
+        """
+        Ottiene tutti i brani di un artista, senza doppioni dovuti alle ristampe
+        
+        Gli album vengono espansi con get_full_albums; i brani degli album non
+        hanno l'ISRC, quindi vengono poi letti completi con /tracks?ids=... a
+        gruppi di 50. Tutte le richieste sono eseguite in parallelo con al
+        massimo max_workers thread.
+        
+        Args:
+            artist_id: ID dell'artista
+            include_groups: Tipi di album da includere
+            max_workers: Numero massimo di richieste contemporanee
+            
+        Returns:
+            list: Lista di brani (semplificati, con il campo 'album' aggiunto)
+        """
+        albums = self.get_all_artist_albums(artist_id, include_groups, max_workers)
+        full_albums = self.get_full_albums([album['id'] for album in albums], max_workers)
+        
+        # Prima le uscite più vecchie, così resta la versione originale del brano
+        type_priority = {'album': 0, 'single': 1, 'compilation': 2}
+        full_albums.sort(key=lambda album: (
+            album.get('release_date') or '',
+            type_priority.get(album.get('album_type'), 3)
+        ))
+        
+        candidates = [
+            (album, track)
+            for album in full_albums
+            for track in album['tracks']['items']
+            if track and track.get('id') and any(a['id'] == artist_id for a in track.get('artists', []))
+        ]
+        
+        # ISRC dei brani completi (i brani semplificati degli album non lo contengono)
+        track_ids = list(dict.fromkeys(track['id'] for _, track in candidates))
+        batches = [track_ids[i:i + 50] for i in range(0, len(track_ids), 50)]
+        isrcs = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for batch in executor.map(self.get_several_tracks, batches):
+                for full_track in batch:
+                    if full_track:
+                        isrcs[full_track['id']] = (full_track.get('external_ids') or {}).get('isrc')
+        
+        tracks = []
+        seen_isrcs = set()
+        seen_durations = {}   # {titolo normalizzato: durate delle versioni già tenute}
+        
+        for album, track in candidates:
+            # Ristampa: stesso ISRC, oppure stesso titolo normalizzato e durata quasi uguale
+            isrc = isrcs.get(track['id'])
+            name = self.normalize_track_name(track['name'])
+            duration = track.get('duration_ms') or 0
+            durations = seen_durations.setdefault(name, [])
+            
+            if (isrc and isrc in seen_isrcs) or any(
+                    abs(duration - seen) <= RERELEASE_DURATION_TOLERANCE_MS for seen in durations):
+                continue
+            
+            if isrc:
+                seen_isrcs.add(isrc)
+            durations.append(duration)
+            track['album'] = {
+                'id': album['id'],
+                'name': album['name'],
+                'release_date': album.get('release_date')
+            }
+            tracks.append(track)
+        
+        return tracks
+    
+    def normalize_track_name(self, name):
+        """
+        Normalizza il titolo di un brano togliendo le indicazioni di ristampa
+        
+        Args:
+            name: Titolo del brano (es. "Song - Remastered 2011")
+            
+        Returns:
+            str: Titolo normalizzato (es. "song")
+        """
+        name = name.lower().strip()
+        
+        while True:
+            stripped = RERELEASE_PATTERN.sub('', name)
+            if stripped == name:
+                return name
+            name = stripped
+    
+    def create_discography_playlist(self, artist_id, name=None, include_groups='album,single',
+                                    make_public=False, max_workers=8):
+        """
+        Crea una playlist con tutta la discografia di un artista
+        
+        Args:
+            artist_id: ID dell'artista
+            name: Nome della playlist (default "<Artista> - Discografia")
+            include_groups: Tipi di album da includere
+            make_public: Se True, crea una playlist pubblica
+            max_workers: Numero massimo di richieste contemporanee
+            
+        Returns:
+            dict: Informazioni della playlist creata
+        """
+        print("\nRecupero la discografia...")
+        start = time.perf_counter()
+        tracks = self.get_artist_discography(artist_id, include_groups, max_workers)
+        
+        if not tracks:
+            raise Exception("Nessun brano trovato per questo artista")
+        
+        print(f"✓ {len(tracks)} brani trovati in {time.perf_counter() - start:.1f}s")
+        
+        if not name:
+            artist_info = self.get_artist_info(artist_id)
+            artist_name = artist_info['name'] if artist_info else 'Artista'
+            name = f"{artist_name} - Discografia"
+        
+        description = f"{len(tracks)} brani dalla discografia completa - Creata automaticamente"
+        playlist = self.create_playlist(name, description, make_public)
+        
+        track_uris = [track['uri'] for track in tracks]
+        self.add_tracks_to_playlist(playlist['id'], track_uris)
+        
+        print(f"\n✓ Playlist completata!")
+        print(f"  {len(track_uris)} brani aggiunti")
+        print(f"  Apri su Spotify: {playlist['external_urls']['spotify']}")
+        
+        return playlist
 
 
     def simplify_genre(self, genre):
@@ -719,17 +2017,22 @@ class SpotifyClient:
         return GENRE_MAPPING.get(genre_lower, 'Other')
 
 
-    def group_tracks_by_genre(self, tracks_items, min_tracks=5):
+    def group_tracks_by_genre(self, tracks_items, min_tracks=5, progress_callback=None):
         """
         Raggruppa i brani per genere semplificato
         
         Args:
             tracks_items: Lista di items dai brani salvati
             min_tracks: Numero minimo di brani per creare una playlist
+            progress_callback: Funzione chiamata come (fase, completati, totale) (opzionale)
             
         Returns:
             dict: Dizionario {genere: [lista di brani]}
         """
+        # Le viste dello snapshot locale raggruppano direttamente sulle colonne
+        if hasattr(tracks_items, 'group_by_genre'):
+            return tracks_items.group_by_genre(self, min_tracks)
+        
         genre_groups = {}
         processed = 0
         total = len(tracks_items)
@@ -737,6 +2040,13 @@ class SpotifyClient:
         print(f"\n🔍 Analizzo {total} brani per genere...")
         print("Questo potrebbe richiedere qualche minuto...\n")
         
+        # Carica tutti gli artisti principali in richieste da 50
+        self.prefetch_artists([
+            item['track']['artists'][0]['id']
+            for item in tracks_items
+            if item['track'] and item['track'].get('artists')
+        ])
+        
         for item in tracks_items:
             track = item['track']
             
@@ -746,7 +2056,7 @@ class SpotifyClient:
             # Prendi il primo artista (quello principale)
             artist_id = track['artists'][0]['id']
             
-            # Ottieni info artista (con rate limiting)
+            # Ottieni info artista (già in cache dopo il prefetch)
             artist_info = self.get_artist_info(artist_id)
             
             if artist_info and artist_info.get('genres'):
@@ -768,10 +2078,9 @@ class SpotifyClient:
             if processed % 10 == 0 or processed == total:
                 percentage = (processed / total) * 100
                 print(f"  Progresso: {processed}/{total} ({percentage:.1f}%)")
-            
-            # Rate limiting: piccola pausa ogni 5 richieste
-            if processed % 5 == 0:
-                time.sleep(0.2)
+                
+                if progress_callback:
+                    progress_callback('genres', processed, total)
         
         # Filtra generi con meno di min_tracks brani
         filtered_groups = {
@@ -794,13 +2103,22 @@ class SpotifyClient:
         return filtered_groups
 
 
-    def create_playlists_by_genre(self, min_tracks=5, make_public=False):
+    def create_playlists_by_genre(self, min_tracks=5, make_public=False, confirm=True,
+                                  weighted=False, multi_label=False, progress_callback=None,
+                                  saved_tracks=None):
         """
         Crea playlist separate per ogni genere musicale dai brani salvati
         
         Args:
             min_tracks: Numero minimo di brani per creare una playlist
             make_public: Se True, crea playlist pubbliche
+            confirm: Se True, chiede conferma all'utente prima di creare le playlist
+            weighted: Se True, considera tutti gli artisti e tutti i generi di ogni brano
+            multi_label: Se True (solo con weighted), un brano può finire in più playlist
+            progress_callback: Funzione chiamata come (fase, completati, totale) durante
+                               il recupero, l'analisi e la creazione (opzionale)
+            saved_tracks: Brani salvati già disponibili (es. dallo snapshot locale);
+                          se None vengono scaricati
             
         Returns:
             list: Lista delle playlist create
@@ -810,8 +2128,9 @@ class SpotifyClient:
         print("="*70)
         
         # Step 1: Recupera tutti i brani salvati
-        print("\n📥 Recupero tutti i tuoi brani salvati...")
-        saved_tracks = self.get_all_saved_tracks()
+        if saved_tracks is None:
+            print("\n📥 Recupero tutti i tuoi brani salvati...")
+            saved_tracks = self.get_all_saved_tracks(progress_callback)
         
         if not saved_tracks:
             print("❌ Nessun brano salvato trovato.")
@@ -820,46 +2139,122 @@ class SpotifyClient:
         print(f"✓ Recuperati {len(saved_tracks)} brani")
         
         # Step 2: Raggruppa per genere
-        genre_groups = self.group_tracks_by_genre(saved_tracks, min_tracks)
+        if weighted:
+            genre_groups = group_tracks_by_genre_scores(self, saved_tracks, min_tracks, multi_label,
+                                                        progress_callback=progress_callback)
+        else:
+            genre_groups = self.group_tracks_by_genre(saved_tracks, min_tracks, progress_callback)
         
         if not genre_groups:
             print("\n❌ Nessun genere trovato con abbastanza brani.")
             return []
         
-        # Step 3: Mostra riepilogo
-        print(f"\n" + "="*70)
-        print("📊 RIEPILOGO GENERI")
+        return self._create_grouped_playlists(
+            genre_groups, "GENERI", "My {group} Favorites",
+            "{count} {group_lower} tracks from my liked songs - Auto-generated",
+            make_public, confirm, progress_callback
+        )
+    
+    def create_playlists_by_mood(self, n_clusters=5, make_public=False, confirm=True,
+                                 saved_tracks=None, feature_source=None, feature_cache=None,
+                                 progress_callback=None):
+        """
+        Crea playlist per mood (es. Workout, Focus, Chill) dai brani salvati
+        
+        I brani vengono raggruppati con un k-means sulle audio features
+        (energy, valence, tempo, danceability, acousticness).
+        
+        Args:
+            n_clusters: Numero di playlist da creare
+            make_public: Se True, crea playlist pubbliche
+            confirm: Se True, chiede conferma all'utente prima di creare le playlist
+            saved_tracks: Brani salvati già disponibili; se None vengono scaricati
+            feature_source: Sorgente delle audio features con metodo fetch(track_ids)
+                            (default: API)
+            feature_cache: AudioFeatureCache su disco (opzionale)
+            progress_callback: Funzione chiamata come (fase, completati, totale) (opzionale)
+            
+        Returns:
+            list: Lista delle playlist create
+        """
+        print("\n" + "="*70)
+        print("CREAZIONE PLAYLIST PER MOOD")
         print("="*70)
         
-        sorted_genres = sorted(genre_groups.items(), key=lambda x: len(x[1]), reverse=True)
+        if saved_tracks is None:
+            print("\n📥 Recupero tutti i tuoi brani salvati...")
+            saved_tracks = self.get_all_saved_tracks(progress_callback)
         
-        for genre, tracks in sorted_genres:
-            print(f"  • {genre}: {len(tracks)} brani")
+        if not saved_tracks:
+            print("❌ Nessun brano salvato trovato.")
+            return []
+        
+        mood_groups = group_tracks_by_mood(self, saved_tracks, n_clusters, feature_source, feature_cache)
+        
+        if not mood_groups:
+            print("\n❌ Nessun brano da dividere per mood.")
+            return []
+        
+        return self._create_grouped_playlists(
+            mood_groups, "MOOD", "My {group} Mix",
+            "{count} {group_lower} tracks from my liked songs, grouped by audio features - Auto-generated",
+            make_public, confirm, progress_callback
+        )
+    
+    def _create_grouped_playlists(self, groups, title, name_format, description_format,
+                                  make_public=False, confirm=True, progress_callback=None):
+        """
+        Mostra il riepilogo dei gruppi, chiede conferma e crea una playlist per gruppo
         
-        total_tracks = sum(len(tracks) for tracks in genre_groups.values())
-        print(f"\nTotale: {len(genre_groups)} playlist da creare con {total_tracks} brani")
+        Args:
+            groups: Dizionario {gruppo: [lista di brani]}
+            title: Titolo del riepilogo (es. "GENERI")
+            name_format: Nome delle playlist con {group}
+            description_format: Descrizione con {count}, {group} e {group_lower}
+            make_public: Se True, crea playlist pubbliche
+            confirm: Se True, chiede conferma all'utente
+            progress_callback: Funzione chiamata come ('playlists', completate, totale) (opzionale)
+            
+        Returns:
+            list: Lista delle playlist create
+        """
+        # Riepilogo
+        print(f"\n" + "="*70)
+        print(f"📊 RIEPILOGO {title}")
         print("="*70)
         
-        # Step 4: Conferma dall'utente
-        confirm = input("\n✨ Procedere con la creazione delle playlist? (s/n): ").lower()
+        sorted_groups = sorted(groups.items(), key=lambda x: len(x[1]), reverse=True)
         
-        if confirm != 's':
-            print("❌ Operazione annullata.")
-            return []
+        for group, tracks in sorted_groups:
+            print(f"  • {group}: {len(tracks)} brani")
+        
+        total_tracks = sum(len(tracks) for tracks in groups.values())
+        print(f"\nTotale: {len(groups)} playlist da creare con {total_tracks} brani")
+        print("="*70)
         
-        # Step 5: Crea le playlist
+        # Conferma dall'utente
+        if confirm:
+            answer = input("\n✨ Procedere con la creazione delle playlist? (s/n): ").lower()
+            
+            if answer != 's':
+                print("❌ Operazione annullata.")
+                return []
+        
+        # Creazione delle playlist
         print("\n🎵 Creazione playlist in corso...\n")
         
         created_playlists = []
         
-        for i, (genre, tracks) in enumerate(sorted_genres, 1):
+        for i, (group, tracks) in enumerate(sorted_groups, 1):
             try:
                 # Nome e descrizione della playlist
-                playlist_name = f"My {genre} Favorites"
-                playlist_description = f"{len(tracks)} {genre.lower()} tracks from my liked songs - Auto-generated"
+                playlist_name = name_format.format(group=group)
+                playlist_description = description_format.format(
+                    count=len(tracks), group=group, group_lower=group.lower()
+                )
                 
                 # Crea la playlist
-                print(f"[{i}/{len(sorted_genres)}] Creo '{playlist_name}'...")
+                print(f"[{i}/{len(sorted_groups)}] Creo '{playlist_name}'...")
                 playlist = self.create_playlist(playlist_name, playlist_description, make_public)
                 
                 # Aggiungi i brani
@@ -868,14 +2263,17 @@ class SpotifyClient:
                 
                 created_playlists.append(playlist)
                 
+                if progress_callback:
+                    progress_callback('playlists', i, len(sorted_groups))
+                
                 # Piccola pausa tra playlist
                 time.sleep(0.5)
                 
             except Exception as e:
-                print(f"❌ Errore nella creazione della playlist '{genre}': {e}")
+                print(f"❌ Errore nella creazione della playlist '{group}': {e}")
                 continue
         
-        # Step 6: Riepilogo finale
+        # Riepilogo finale
         print("\n" + "="*70)
         print("✅ COMPLETATO!")
         print("="*70)
@@ -0,0 +1,119 @@
+"""
+Stress test del SpotifyClient condiviso tra molti thread, contro il server locale di stub_server.py
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from spotify_client import SpotifyClient
+from stub_server import StubSpotifyServer
+
+
+def _operation(client, rng):
+    """
+    Esegue un'operazione a caso tra quelle che usano token diversi
+    """
+    choice = rng.randrange(4)
+
+    if choice == 0:
+        return client.search_artist(f'artist {rng.randrange(100)}', limit=5)
+    if choice == 1:
+        return client.get_artist_info(f'a{rng.randrange(500)}')
+    if choice == 2:
+        return client.get_saved_tracks(limit=50, offset=50 * rng.randrange(20))
+    return client.get_current_user()
+
+
+def run_stress(threads=32, calls_per_thread=50, seed=0):
+    """
+    Condivide un solo client tra più thread e verifica che i token vengano
+    ottenuti una sola volta e che nessuna richiesta vada persa
+
+    Il token utente iniziale è già scaduto: tutti i thread provano a
+    rinnovarlo nello stesso momento.
+
+    Args:
+        threads: Numero di thread
+        calls_per_thread: Operazioni eseguite da ogni thread
+        seed: Seme per la scelta delle operazioni
+
+    Returns:
+        dict: Risultati con 'errors', 'counts', 'elapsed' e 'problems'
+    """
+    with StubSpotifyServer() as stub:
+        client = SpotifyClient('stub-id', 'stub-secret', api_url=stub.api_url, auth_url=stub.auth_url,
+                               user_access_token='expired-token')
+        client.refresh_token = 'stub-refresh-token'
+        client.user_token_expires_at = 0
+
+        def no_prompt():
+            raise RuntimeError("authorize_user() chiamato durante lo stress test")
+
+        client.authorize_user = no_prompt
+
+        barrier = threading.Barrier(threads)
+        errors = []
+
+        def worker(index):
+            rng = random.Random(seed * 1000 + index)
+            barrier.wait()  # Partenza simultanea per massimizzare la contesa
+            for _ in range(calls_per_thread):
+                try:
+                    _operation(client, rng)
+                except Exception as e:
+                    errors.append(repr(e))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(worker, range(threads)))
+        elapsed = time.perf_counter() - start
+
+        counts = dict(stub.counts)
+        problems = []
+
+        if counts.get('token:client_credentials', 0) != 1:
+            problems.append(f"token dell'applicazione richiesto {counts.get('token:client_credentials', 0)} volte")
+        if counts.get('token:refresh_token', 0) != 1:
+            problems.append(f"token utente rinnovato {counts.get('token:refresh_token', 0)} volte")
+        if counts.get('unauthorized'):
+            problems.append(f"{counts['unauthorized']} richieste con token non valido")
+        if client.request_count != stub.total_requests():
+            problems.append(f"richieste contate dal client {client.request_count}, dal server {stub.total_requests()}")
+        if errors:
+            problems.append(f"{len(errors)} operazioni fallite (es. {errors[0]})")
+
+    return {'errors': errors, 'counts': counts, 'elapsed': elapsed, 'problems': problems,
+            'operations': threads * calls_per_thread, 'requests': client.request_count}
+
+
+def main():
+    """
+    Funzione principale
+    """
+    parser = argparse.ArgumentParser(description="Stress test del client condiviso tra thread")
+    parser.add_argument('--threads', type=int, default=32, help="Numero di thread")
+    parser.add_argument('--calls', type=int, default=50, help="Operazioni per thread")
+    parser.add_argument('--seed', type=int, default=0, help="Seme casuale")
+    args = parser.parse_args()
+
+    result = run_stress(args.threads, args.calls, args.seed)
+
+    print(f"\n🧵 {args.threads} thread, {result['operations']} operazioni, "
+          f"{result['requests']} richieste HTTP in {result['elapsed']:.2f}s")
+    for key, count in sorted(result['counts'].items()):
+        print(f"   {key}: {count}")
+
+    if result['problems']:
+        print("\n❌ Problemi rilevati:")
+        for problem in result['problems']:
+            print(f"   • {problem}")
+        sys.exit(1)
+
+    print("\n✓ Nessun problema: token ottenuti una sola volta, nessuna richiesta persa")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,632 @@
+"""
+Server HTTP locale che imita un sottoinsieme dell'API di Spotify (per stress test e prove offline)
+
+Avvio come processo separato:
+    python stub_server.py --port 8900 --latency 0.02 --rate-limit-ratio 0.01
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from urllib.request import Request, urlopen
+
+
+GENRES = ['rock', 'indie rock', 'pop', 'hip hop', 'jazz', 'metal', 'techno', 'folk']
+
+# Come l'API reale: offset + limit delle ricerche non può superare 1000
+SEARCH_MAX_OFFSET = 1000
+
+# Uscite di ogni artista (pari: album, dispari: singoli), una ogni 45 giorni
+RELEASES_PER_ARTIST = 20
+
+
+def stub_artist(artist_id):
+    """
+    Artista deterministico ricavato dall'ID (es. "a12")
+    """
+    i = int(artist_id[1:]) if artist_id[1:].isdigit() else 0
+    return {
+        'id': artist_id,
+        'name': f'Artist {i}',
+        'genres': [GENRES[i % len(GENRES)], GENRES[(i + 3) % len(GENRES)]],
+        'popularity': i % 100,
+        'followers': {'total': i * 10},
+        'images': [],
+        'external_urls': {'spotify': f'https://open.spotify.com/artist/{artist_id}'}
+    }
+
+
+def stub_album(i):
+    """
+    Album deterministico con indice i
+    """
+    return {
+        'id': f'al{i}',
+        'name': f'Album {i}',
+        'album_type': 'album',
+        'release_date': f'{1970 + i % 55}-01-01',
+        'total_tracks': 8 + i % 7,
+        'artists': [{'id': f'a{i % 97}', 'name': f'Artist {i % 97}'}],
+        'external_urls': {'spotify': f'https://open.spotify.com/album/al{i}'}
+    }
+
+
+def stub_track(i):
+    """
+    Brano deterministico con indice i
+    """
+    return {
+        'id': f't{i}',
+        'uri': f'spotify:track:t{i}',
+        'name': f'Song {i}',
+        'duration_ms': 150000 + (i * 7919) % 120000,
+        'popularity': (i * 31) % 100,
+        'artists': [{'id': f'a{i % 97}', 'name': f'Artist {i % 97}'}],
+        'album': {'id': f'al{i % 211}', 'name': f'Album {i % 211}', 'release_date': f'{1970 + i % 55}-01-01'},
+        'external_ids': {'isrc': f'STUB{i:08d}'},
+        'external_urls': {'spotify': f'https://open.spotify.com/track/t{i}'}
+    }
+
+
+def stub_release(artist_index, j, shift_days=0):
+    """
+    j-esima uscita (0 = la più recente) dell'artista con indice artist_index
+
+    L'uscita più recente dell'artista k è di 3k giorni fa; shift_days sposta
+    avanti il calendario (le uscite con data futura non esistono ancora).
+
+    Returns:
+        dict: Album completo di brani, None se non ancora uscito
+    """
+    days_ago = artist_index * 3 + j * 45 - shift_days
+    if days_ago < 0:
+        return None
+
+    album_id = f'r{artist_index}x{j}'
+    artist = {'id': f'a{artist_index}', 'name': f'Artist {artist_index}'}
+    album_type = 'album' if j % 2 == 0 else 'single'
+    tracks = [
+        {'id': f'{album_id}n{n}', 'uri': f'spotify:track:{album_id}n{n}', 'name': f'Release {album_id} #{n}',
+         'duration_ms': 180000, 'artists': [artist]}
+        for n in range(6 if album_type == 'album' else 1)
+    ]
+    return {
+        'id': album_id,
+        'name': f'Release {album_id}',
+        'album_type': album_type,
+        'album_group': album_type,
+        'release_date': (date.today() - timedelta(days=days_ago)).isoformat(),
+        'release_date_precision': 'day',
+        'total_tracks': len(tracks),
+        'artists': [artist],
+        'tracks': {'items': tracks, 'total': len(tracks)},
+        'external_urls': {'spotify': f'https://open.spotify.com/album/{album_id}'}
+    }
+
+
+def stub_track_for_uri(uri):
+    """
+    Brano corrispondente a un URI (quelli come "spotify:track:t12" sono brani stub)
+    """
+    track_id = uri.rsplit(':', 1)[-1]
+    if track_id[:1] == 't' and track_id[1:].isdigit():
+        return stub_track(int(track_id[1:]))
+    return {'id': track_id, 'uri': uri, 'name': track_id, 'duration_ms': 0, 'popularity': 0,
+            'artists': [], 'album': {'name': '', 'release_date': ''}, 'external_urls': {'spotify': ''}}
+
+
+def stub_audio_features(track_id):
+    """
+    Audio features deterministiche ricavate dall'ID del brano (es. "t12")
+    """
+    i = int(track_id[1:]) if track_id[1:].isdigit() else 0
+    rng = random.Random(i)
+    # Quattro profili distinti, più un po' di rumore
+    energy, valence, tempo, danceability, acousticness = (
+        (0.9, 0.5, 150, 0.6, 0.05),
+        (0.7, 0.9, 120, 0.9, 0.1),
+        (0.3, 0.4, 90, 0.4, 0.7),
+        (0.2, 0.1, 70, 0.3, 0.8)
+    )[i % 4]
+    return {
+        'id': track_id,
+        'energy': min(1.0, max(0.0, energy + rng.gauss(0, 0.05))),
+        'valence': min(1.0, max(0.0, valence + rng.gauss(0, 0.05))),
+        'tempo': tempo + rng.gauss(0, 5),
+        'danceability': min(1.0, max(0.0, danceability + rng.gauss(0, 0.05))),
+        'acousticness': min(1.0, max(0.0, acousticness + rng.gauss(0, 0.05)))
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Gestisce le richieste; lo stato condiviso è nel server (self.server.stub)
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length).decode() if length else ''
+
+    def _playlist_write(self, method):
+        """
+        Scritture sulle playlist (POST, PUT, DELETE): risponde True se gestita
+        """
+        stub = self.server.stub
+        path = urlparse(self.path).path
+        parts = path.strip('/').split('/')
+
+        if len(parts) == 4 and parts[:2] == ['v1', 'users'] and parts[3] == 'playlists' and method == 'POST':
+            body = json.loads(self._read_body() or '{}')
+            stub.record('create_playlist')
+            self._send(201, stub.create_playlist(body.get('name', ''), body.get('description', ''),
+                                                 body.get('public', True)))
+            return True
+
+        if len(parts) == 4 and parts[:2] == ['v1', 'playlists'] and parts[3] == 'tracks':
+            body = json.loads(self._read_body() or '{}')
+            stub.record(f'{method} /v1/playlists/{{id}}/tracks')
+            if stub.latency:
+                time.sleep(stub.latency)
+            status, data = stub.write_playlist(parts[2], method, body)
+            self._send(status, data)
+            return True
+
+        return False
+
+    def do_PUT(self):
+        if not self._playlist_write('PUT'):
+            self._send(404, {'error': {'status': 404, 'message': 'Not found'}})
+
+    def do_DELETE(self):
+        if not self._playlist_write('DELETE'):
+            self._send(404, {'error': {'status': 404, 'message': 'Not found'}})
+
+    def do_POST(self):
+        stub = self.server.stub
+        path = urlparse(self.path).path
+
+        if self._playlist_write('POST'):
+            return
+
+        body = self._read_body()
+
+        if path == '/_stub/reset':
+            stub.reset_stats()
+            self._send(200, {'status': 'ok'})
+            return
+
+        if path == '/api/token':
+            grant_type = parse_qs(body).get('grant_type', [''])[0]
+            stub.record(f'token:{grant_type}')
+            self._send(200, {
+                'access_token': f'stub-{grant_type}-{stub.next_token()}',
+                'token_type': 'Bearer',
+                'expires_in': 3600
+            })
+            return
+
+        stub.record(path)
+        self._send(404, {'error': {'status': 404, 'message': 'Not found'}})
+
+    def do_GET(self):
+        stub = self.server.stub
+
+        if self.path == '/_stub/stats':
+            self._send(200, stub.stats())
+            return
+
+        stub.enter()
+        try:
+            self._get(stub)
+        finally:
+            stub.leave()
+
+    def _get(self, stub):
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        if stub.should_rate_limit():
+            stub.record('rate_limited')
+            body = json.dumps({'error': {'status': 429, 'message': 'API rate limit exceeded'}}).encode()
+            self.send_response(429)
+            self.send_header('Retry-After', str(stub.retry_after))
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        parsed = urlparse(self.path)
+        path = parsed.path
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+
+        if not self.headers.get('Authorization', '').startswith('Bearer stub-'):
+            stub.record('unauthorized')
+            self._send(401, {'error': {'status': 401, 'message': 'Invalid access token'}})
+            return
+
+        if path.startswith('/v1/artists/'):
+            stub.record('/v1/artists/{id}/albums' if path.endswith('/albums') else '/v1/artists/{id}')
+        else:
+            stub.record(path)
+
+        if path == '/v1/me':
+            self._send(200, {'id': 'stub-user', 'display_name': 'Stub User'})
+        elif path == '/v1/me/tracks':
+            offset = int(params.get('offset', 0))
+            limit = int(params.get('limit', 20))
+            items = [
+                {'added_at': f'20{10 + i % 15:02d}-{1 + i % 12:02d}-01T00:00:00Z', 'track': stub_track(i)}
+                for i in range(offset, min(stub.library_size, offset + limit))
+            ]
+            self._send(200, {'items': items, 'total': stub.library_size, 'offset': offset, 'limit': limit})
+        elif path == '/v1/search':
+            offset = int(params.get('offset', 0))
+            limit = int(params.get('limit', 20))
+            if offset + limit > SEARCH_MAX_OFFSET:
+                self._send(400, {'error': {'status': 400, 'message': 'Invalid offset'}})
+                return
+
+            result = {}
+            for search_type in params.get('type', 'track').split(','):
+                total, make_item = {
+                    'artist': (97, lambda i: stub_artist(f'a{i}')),
+                    'album': (211, stub_album),
+                    'track': (stub.library_size, stub_track)
+                }[search_type]
+                result[f'{search_type}s'] = {
+                    'items': [make_item(i) for i in range(offset, min(total, offset + limit))],
+                    'total': total, 'offset': offset, 'limit': limit
+                }
+            self._send(200, result)
+        elif path == '/v1/artists':
+            self._send(200, {'artists': [stub_artist(a) for a in params.get('ids', '').split(',') if a]})
+        elif path.startswith('/v1/artists/') and path.endswith('/albums'):
+            artist_id = path.split('/')[3]
+            artist_index = int(artist_id[1:]) if artist_id[1:].isdigit() else 0
+            groups = params.get('include_groups', 'album,single').split(',')
+            offset = int(params.get('offset', 0))
+            limit = int(params.get('limit', 20))
+            # Come l'API: raggruppati per tipo, dal più recente
+            releases = [
+                release
+                for group in groups
+                for release in (stub_release(artist_index, j, stub.release_shift_days)
+                                for j in range(RELEASES_PER_ARTIST))
+                if release and release['album_group'] == group
+            ]
+            items = [{k: v for k, v in release.items() if k != 'tracks'} for release in releases[offset:offset + limit]]
+            self._send(200, {'items': items, 'total': len(releases), 'offset': offset, 'limit': limit})
+        elif path == '/v1/albums':
+            albums = []
+            for album_id in (a for a in params.get('ids', '').split(',') if a):
+                artist_index, _, j = album_id[1:].partition('x')
+                albums.append(stub_release(int(artist_index), int(j), stub.release_shift_days)
+                              if album_id.startswith('r') and j.isdigit() else None)
+            self._send(200, {'albums': albums})
+        elif path == '/v1/me/following':
+            limit = int(params.get('limit', 20))
+            after = params.get('after')
+            start = int(after[1:]) + 1 if after else 0
+            indices = range(start, min(stub.followed_artists, start + limit))
+            items = [stub_artist(f'a{i}') for i in indices]
+            last = items[-1]['id'] if items and indices[-1] + 1 < stub.followed_artists else None
+            self._send(200, {'artists': {'items': items, 'total': stub.followed_artists, 'limit': limit,
+                                         'cursors': {'after': last}}})
+        elif path.startswith('/v1/artists/') and path.count('/') == 3:
+            self._send(200, stub_artist(path.rsplit('/', 1)[1]))
+        elif path == '/v1/me/playlists':
+            offset = int(params.get('offset', 0))
+            limit = int(params.get('limit', 20))
+            playlists = stub.list_playlists()
+            self._send(200, {'items': playlists[offset:offset + limit], 'total': len(playlists)})
+        elif path.startswith('/v1/playlists/') and path.count('/') == 3:
+            playlist = stub.playlist_info(path.rsplit('/', 1)[1])
+            self._send(200 if playlist else 404, playlist or {'error': {'status': 404, 'message': 'Not found'}})
+        elif path.startswith('/v1/playlists/') and path.endswith('/tracks'):
+            offset = int(params.get('offset', 0))
+            limit = int(params.get('limit', 100))
+            entries = stub.playlist_entries(path.split('/')[3])
+            if entries is None:
+                self._send(404, {'error': {'status': 404, 'message': 'Not found'}})
+                return
+            items = [{'added_at': added_at, 'track': stub_track_for_uri(uri)}
+                     for uri, added_at in entries[offset:offset + limit]]
+            self._send(200, {'items': items, 'total': len(entries), 'offset': offset, 'limit': limit})
+        elif path == '/v1/audio-features':
+            ids = [t for t in params.get('ids', '').split(',') if t]
+            self._send(200, {'audio_features': [stub_audio_features(t) for t in ids]})
+        elif path == '/v1/tracks':
+            self._send(200, {'tracks': [stub_track_for_uri(f'spotify:track:{t}')
+                                        for t in params.get('ids', '').split(',') if t]})
+        else:
+            self._send(404, {'error': {'status': 404, 'message': 'Not found'}})
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # Il default (5) rifiuta connessioni con molti client
+
+
+class StubSpotifyServer:
+    """
+    Server locale con endpoint finti di Spotify, eseguito in un thread
+
+    Alle richieste GET si possono aggiungere una latenza fissa e una quota
+    di risposte 429 (con Retry-After) per simulare un'API sotto carico.
+
+    Uso:
+        with StubSpotifyServer() as stub:
+            client = SpotifyClient(..., api_url=stub.api_url, auth_url=stub.auth_url)
+    """
+    def __init__(self, library_size=1000, host='127.0.0.1', port=0, latency=0.0,
+                 rate_limit_ratio=0.0, retry_after=1, seed=0, max_playlist_items=10000, followed_artists=97):
+        """
+        Args:
+            library_size: Numero di brani salvati dell'utente finto
+            host: Indirizzo di ascolto
+            port: Porta (0 = scelta dal sistema)
+            latency: Secondi di attesa aggiunti a ogni richiesta GET
+            rate_limit_ratio: Frazione delle richieste GET a cui rispondere 429
+            retry_after: Valore dell'header Retry-After delle risposte 429
+            seed: Seme per la scelta delle risposte 429
+            max_playlist_items: Brani massimi per playlist (come il limite dell'API)
+            followed_artists: Numero di artisti seguiti dall'utente finto
+        """
+        self.library_size = library_size
+        self.latency = latency
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.counts = {}
+        self.tokens_issued = 0
+        self.active = 0       # Richieste in corso
+        self.max_active = 0   # Massimo di richieste contemporanee
+        self.lock = threading.Lock()
+
+        # Playlist in memoria: {id: {'name', 'description', 'public', 'version', 'entries': [(uri, added_at)]}}
+        self.playlists = {}
+        self.max_playlist_items = max_playlist_items
+
+        # Artisti seguiti e calendario delle uscite (aumentare release_shift_days fa uscire nuovi album)
+        self.followed_artists = followed_artists
+        self.release_shift_days = 0
+
+        self.server = _Server((host, port), _Handler)
+        self.server.stub = self
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def api_url(self):
+        return f'{self.base_url}/v1'
+
+    @property
+    def auth_url(self):
+        return f'{self.base_url}/api/token'
+
+    def record(self, key):
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def enter(self):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def leave(self):
+        with self.lock:
+            self.active -= 1
+
+    def should_rate_limit(self):
+        if not self.rate_limit_ratio:
+            return False
+        with self.lock:
+            return self.random.random() < self.rate_limit_ratio
+
+    def reset_stats(self):
+        with self.lock:
+            self.counts = {}
+            self.max_active = self.active
+
+    def stats(self):
+        """
+        Contatori delle richieste dall'ultimo reset
+
+        Returns:
+            dict: {'counts': {endpoint: richieste}, 'max_active': richieste contemporanee (max)}
+        """
+        with self.lock:
+            return {'counts': dict(self.counts), 'max_active': self.max_active}
+
+    def _playlist_object(self, playlist_id, playlist):
+        return {
+            'id': playlist_id,
+            'name': playlist['name'],
+            'description': playlist['description'],
+            'public': playlist['public'],
+            'owner': {'id': 'stub-user', 'display_name': 'Stub User'},
+            'snapshot_id': f"{playlist_id}-v{playlist['version']}",
+            'tracks': {'total': len(playlist['entries'])},
+            'external_urls': {'spotify': f'https://open.spotify.com/playlist/{playlist_id}'}
+        }
+
+    def create_playlist(self, name, description='', public=True):
+        with self.lock:
+            playlist_id = f'p{len(self.playlists) + 1}'
+            self.playlists[playlist_id] = {'name': name, 'description': description, 'public': public,
+                                           'version': 1, 'entries': []}
+            return self._playlist_object(playlist_id, self.playlists[playlist_id])
+
+    def list_playlists(self):
+        with self.lock:
+            return [self._playlist_object(pid, p) for pid, p in self.playlists.items()]
+
+    def playlist_info(self, playlist_id):
+        with self.lock:
+            playlist = self.playlists.get(playlist_id)
+            return self._playlist_object(playlist_id, playlist) if playlist else None
+
+    def playlist_entries(self, playlist_id):
+        with self.lock:
+            playlist = self.playlists.get(playlist_id)
+            return list(playlist['entries']) if playlist else None
+
+    def playlist_uris(self, playlist_id):
+        """
+        URI dei brani di una playlist, in ordine
+        """
+        return [uri for uri, _ in self.playlist_entries(playlist_id) or []]
+
+    def write_playlist(self, playlist_id, method, body):
+        """
+        Applica una scrittura ai brani di una playlist come l'API
+
+        POST aggiunge (uris, position opzionale), PUT sostituisce (uris) o
+        sposta un intervallo (range_start, insert_before, range_length),
+        DELETE rimuove tutte le occorrenze dei brani indicati.
+
+        Returns:
+            tuple: (stato HTTP, corpo della risposta)
+        """
+        def error(status, message):
+            return status, {'error': {'status': status, 'message': message}}
+
+        with self.lock:
+            playlist = self.playlists.get(playlist_id)
+            if playlist is None:
+                return error(404, 'Not found')
+
+            entries = playlist['entries']
+            added_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+            if method == 'POST':
+                uris = body.get('uris') or []
+                position = body.get('position', len(entries))
+                if len(uris) > 100:
+                    return error(400, 'Too many ids requested')
+                if not 0 <= position <= len(entries):
+                    return error(400, 'Index out of bounds')
+                if len(entries) + len(uris) > self.max_playlist_items:
+                    return error(400, 'Playlist size limit reached')
+                entries[position:position] = [(uri, added_at) for uri in uris]
+                status = 201
+            elif method == 'PUT' and 'uris' in body:
+                if len(body['uris']) > 100:
+                    return error(400, 'Too many ids requested')
+                playlist['entries'] = [(uri, added_at) for uri in body['uris']]
+                status = 200
+            elif method == 'PUT':
+                start = body.get('range_start', 0)
+                length = body.get('range_length', 1)
+                insert_before = body.get('insert_before', 0)
+                if not (0 <= start and start + length <= len(entries) and 0 <= insert_before <= len(entries)):
+                    return error(400, 'Index out of bounds')
+                moved = entries[start:start + length]
+                del entries[start:start + length]
+                target = insert_before - length if insert_before > start else insert_before
+                entries[target:target] = moved
+                status = 200
+            elif method == 'DELETE':
+                removed = {t['uri'] for t in body.get('tracks') or []}
+                playlist['entries'] = [entry for entry in entries if entry[0] not in removed]
+                status = 200
+            else:
+                return error(405, 'Method not allowed')
+
+            playlist['version'] += 1
+            return status, {'snapshot_id': f"{playlist_id}-v{playlist['version']}"}
+
+    def next_token(self):
+        with self.lock:
+            self.tokens_issued += 1
+            return self.tokens_issued
+
+    def total_requests(self):
+        with self.lock:
+            return sum(self.counts.values())
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class RemoteStub:
+    """
+    Controlla uno stub avviato in un altro processo (stessa interfaccia di StubSpotifyServer)
+    """
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    @property
+    def api_url(self):
+        return f'{self.base_url}/v1'
+
+    @property
+    def auth_url(self):
+        return f'{self.base_url}/api/token'
+
+    def stats(self):
+        with urlopen(f'{self.base_url}/_stub/stats') as response:
+            return json.loads(response.read())
+
+    def reset_stats(self):
+        urlopen(Request(f'{self.base_url}/_stub/reset', data=b'', method='POST')).close()
+
+
+def main():
+    """
+    Funzione principale
+    """
+    parser = argparse.ArgumentParser(description="Server locale che imita l'API di Spotify")
+    parser.add_argument('--host', default='127.0.0.1', help="Indirizzo di ascolto")
+    parser.add_argument('--port', type=int, default=8900, help="Porta")
+    parser.add_argument('--library-size', type=int, default=1000, help="Brani salvati dell'utente finto")
+    parser.add_argument('--latency', type=float, default=0.0, help="Latenza aggiunta a ogni richiesta (secondi)")
+    parser.add_argument('--rate-limit-ratio', type=float, default=0.0, help="Frazione di risposte 429")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After delle risposte 429 (secondi)")
+    args = parser.parse_args()
+
+    stub = StubSpotifyServer(args.library_size, args.host, args.port, args.latency,
+                             args.rate_limit_ratio, args.retry_after)
+    print(f"🧪 Stub in ascolto su {stub.base_url} (API: {stub.api_url})")
+
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Test del circuit breaker nella richiesta di prova (stato semi-aperto)
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SPOTIFY_CLIENT_ID', 'test')
+os.environ.setdefault('SPOTIFY_CLIENT_SECRET', 'test')
+
+from retry import CircuitBreaker, RetryPolicy
+from spotify_client import SpotifyClient
+from transport import ReplayMissError
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+
+class ScriptedTransport:
+    """
+    Restituisce le risposte (o solleva le eccezioni) nell'ordine indicato
+    """
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+
+    def request(self, method, url, **kwargs):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResponse(outcome)
+
+
+class HalfOpenTrialTest(unittest.TestCase):
+    def make_client(self, outcomes):
+        # Il circuito si apre al primo errore e passa subito allo stato semi-aperto
+        return SpotifyClient('id', 'secret', transport=ScriptedTransport(outcomes),
+                             retry_policy=RetryPolicy(max_attempts=1),
+                             circuit_breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0))
+
+    def test_trial_with_429_closes_circuit(self):
+        client = self.make_client([500, 429, 200])
+
+        self.assertEqual(client._request('GET', 'http://api/x').status_code, 500)
+        self.assertEqual(client._request('GET', 'http://api/x').status_code, 429)
+        self.assertEqual(client._request('GET', 'http://api/x').status_code, 200)
+        self.assertFalse(client.circuit_breaker.trial_in_progress)
+
+    def test_trial_with_unexpected_error_is_released(self):
+        client = self.make_client([500, ReplayMissError('assente'), 200])
+
+        client._request('GET', 'http://api/x')
+        with self.assertRaises(ReplayMissError):
+            client._request('GET', 'http://api/x')
+        self.assertEqual(client._request('GET', 'http://api/x').status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,294 @@
+"""
+Trasporto HTTP del client: richieste reali, registrazione del traffico e riproduzione senza rete
+"""
+import atexit
+import gzip
+import json
+import threading
+import time
+from collections import deque
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from config import HTTP_RECORD_FILE, HTTP_REPLAY_FILE, HTTP_REPLAY_TIMING
+
+
+FORMAT_VERSION = 1
+
+# Valori segreti che non vengono mai scritti nelle registrazioni
+SECRET_FIELDS = ('access_token', 'refresh_token', 'code', 'client_secret')
+REDACTED = 'redacted'
+
+# Header delle risposte utili al client (il resto non viene salvato)
+KEPT_HEADERS = ('Content-Type', 'Retry-After')
+
+
+class ReplayMissError(Exception):
+    """
+    La richiesta non è presente nella registrazione
+    """
+
+
+class HTTPTransport:
+    """
+    Trasporto reale: una requests.Session per thread (Session non è thread-safe)
+    """
+    def __init__(self):
+        self.local = threading.local()
+
+    def _session(self):
+        session = getattr(self.local, 'session', None)
+
+        if session is None:
+            session = requests.Session()
+            self.local.session = session
+
+        return session
+
+    def request(self, method, url, **kwargs):
+        """
+        Esegue una richiesta HTTP
+
+        Args:
+            method: Metodo HTTP
+            url: URL completo
+            **kwargs: Argomenti di Session.request (headers, params, json, data, ...)
+
+        Returns:
+            requests.Response: Risposta
+        """
+        return self._session().request(method, url, **kwargs)
+
+
+def _redact(value):
+    """
+    Sostituisce i valori segreti in un dizionario (anche annidato)
+    """
+    if isinstance(value, dict):
+        return {k: REDACTED if k in SECRET_FIELDS else _redact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_redact(v) for v in value]
+    return value
+
+
+def _request_key(method, url, kwargs):
+    """
+    Chiave che identifica una richiesta (senza header, quindi senza token)
+
+    Args:
+        method: Metodo HTTP
+        url: URL completo
+        kwargs: Argomenti della richiesta (params, json, data, ...)
+
+    Returns:
+        str: Chiave della richiesta
+    """
+    params = kwargs.get('params') or {}
+    query = urlencode(sorted((k, str(v)) for k, v in params.items()))
+
+    body = ''
+    if kwargs.get('json') is not None:
+        body = json.dumps(_redact(kwargs['json']), sort_keys=True, separators=(',', ':'))
+    elif isinstance(kwargs.get('data'), dict):
+        body = urlencode(sorted(_redact(kwargs['data']).items()))
+    elif kwargs.get('data'):
+        body = str(kwargs['data'])
+
+    return f"{method.upper()} {url}?{query} {body}"
+
+
+class RecordingTransport:
+    """
+    Inoltra le richieste a un altro trasporto e registra ogni coppia
+    richiesta/risposta con i tempi in un file JSON Lines compresso (gzip)
+
+    Header delle richieste, token e codici di autorizzazione non vengono salvati.
+    """
+    def __init__(self, path, inner=None):
+        """
+        Args:
+            path: File della registrazione (es. "traffico.jsonl.gz")
+            inner: Trasporto che esegue davvero le richieste (default: HTTPTransport)
+        """
+        self.path = path
+        self.inner = inner or HTTPTransport()
+        self.started_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.file = gzip.open(path, 'wt', encoding='utf-8')
+        self._write({'version': FORMAT_VERSION, 'created': time.strftime('%Y-%m-%dT%H:%M:%S')})
+        atexit.register(self.close)
+
+    def _write(self, record):
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.write(line + '\n')
+            # Ogni record resta leggibile anche se il processo si interrompe
+            self.file.flush()
+
+    def request(self, method, url, **kwargs):
+        start = time.monotonic()
+        record = {
+            'method': method.upper(),
+            'url': url,
+            'key': _request_key(method, url, kwargs),
+            'start': round(start - self.started_at, 6)
+        }
+
+        try:
+            response = self.inner.request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            record['elapsed'] = round(time.monotonic() - start, 6)
+            record['error'] = {'type': type(e).__name__, 'message': str(e)}
+            self._write(record)
+            raise
+
+        record['elapsed'] = round(time.monotonic() - start, 6)
+        record['status'] = response.status_code
+        record['headers'] = {h: response.headers[h] for h in KEPT_HEADERS if h in response.headers}
+
+        content = response.text
+        if 'access_token' in content:
+            try:
+                content = json.dumps(_redact(response.json()))
+            except ValueError:
+                pass
+        record['content'] = content
+
+        self._write(record)
+        return response
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+def _read_records(path):
+    """
+    Legge i record di una registrazione
+
+    Una registrazione interrotta (processo terminato senza chiudere il file)
+    viene letta fino all'ultimo record completo.
+
+    Returns:
+        list: Record nell'ordine di registrazione
+    """
+    records = []
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Versione della registrazione non supportata: {header.get('version')}")
+
+        try:
+            for line in f:
+                records.append(json.loads(line))
+        except (EOFError, ValueError):
+            pass
+
+    return records
+
+
+class ReplayTransport:
+    """
+    Risponde alle richieste con una registrazione di RecordingTransport, senza rete
+
+    Le risposte a richieste identiche vengono restituite nell'ordine in cui
+    sono state registrate. Se una richiesta non ha corrispondenze esatte
+    (es. parametri con l'ora attuale, lotti di ID composti diversamente) si
+    usa la successiva risposta registrata con lo stesso metodo e URL.
+
+    Con timing='original' ogni risposta arriva dopo lo stesso tempo della
+    registrazione; con timing='fast' subito.
+    """
+    def __init__(self, path, timing='fast'):
+        """
+        Args:
+            path: File della registrazione
+            timing: 'original' (tempi registrati) o 'fast' (il più veloce possibile)
+        """
+        if timing not in ('original', 'fast'):
+            raise ValueError(f"Modalità di riproduzione non valida: '{timing}'")
+
+        self.timing = timing
+        self.by_key = {}
+        self.by_url = {}
+        self.replayed = 0
+        self.fallbacks = 0
+        self.lock = threading.Lock()
+
+        for record in _read_records(path):
+            record['used'] = False
+            self.by_key.setdefault(record['key'], deque()).append(record)
+            self.by_url.setdefault((record['method'], record['url']), deque()).append(record)
+
+    def _next(self, queue):
+        # I record già usati tramite l'altra coda vengono saltati
+        while queue:
+            record = queue.popleft()
+            if not record['used']:
+                record['used'] = True
+                return record
+        return None
+
+    def request(self, method, url, **kwargs):
+        key = _request_key(method, url, kwargs)
+
+        with self.lock:
+            record = self._next(self.by_key.get(key, deque()))
+            if record is None:
+                record = self._next(self.by_url.get((method.upper(), url), deque()))
+                if record is not None:
+                    self.fallbacks += 1
+            if record is not None:
+                self.replayed += 1
+
+        if record is None:
+            raise ReplayMissError(f"Richiesta non presente nella registrazione: {key}")
+
+        if self.timing == 'original':
+            time.sleep(record['elapsed'])
+
+        if 'error' in record:
+            error_class = getattr(requests.exceptions, record['error']['type'], requests.exceptions.ConnectionError)
+            raise error_class(record['error']['message'])
+
+        response = requests.Response()
+        response.status_code = record['status']
+        response.headers = CaseInsensitiveDict(record['headers'])
+        response._content = record['content'].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = url
+        return response
+
+
+_default_transport = None
+_default_lock = threading.Lock()
+
+
+def default_transport():
+    """
+    Trasporto condiviso da tutti i client del processo
+
+    Con HTTP_REPLAY_FILE nel .env le risposte vengono lette dalla
+    registrazione; con HTTP_RECORD_FILE il traffico reale viene registrato.
+
+    Returns:
+        Trasporto con il metodo request(method, url, **kwargs)
+    """
+    global _default_transport
+
+    with _default_lock:
+        if _default_transport is None:
+            if HTTP_REPLAY_FILE:
+                _default_transport = ReplayTransport(HTTP_REPLAY_FILE, HTTP_REPLAY_TIMING)
+            elif HTTP_RECORD_FILE:
+                _default_transport = RecordingTransport(HTTP_RECORD_FILE)
+            else:
+                _default_transport = HTTPTransport()
+
+        return _default_transport
@@ -1,6 +1,7 @@
 """
 Funzioni di utilità per visualizzare i dati
 """
+import sys
 
 
 def display_artists(artists):
@@ -31,66 +32,225 @@ def display_artists(artists):
         print()
 
 
-def display_tracks(tracks):
+def _format_track(i, track):
+    """
+    Formatta una canzone nel formato esteso (più righe)
+    """
+    artists_names = ', '.join([artist['name'] for artist in track['artists']])
+    
+    return (
+        f"{i}. {track['name']}\n"
+        f"   Artista: {artists_names}\n"
+        f"   Album: {track['album']['name']}\n"
+        f"   Durata: {format_duration(track['duration_ms'])}\n"
+        f"   Popolarità: {track['popularity']}/100\n"
+        f"   Spotify URL: {track['external_urls']['spotify']}\n"
+    )
+
+
+def _format_track_row(i, track):
+    """
+    Formatta una canzone come riga della tabella compatta
+    """
+    artists_names = ', '.join([artist['name'] for artist in track['artists']])
+    
+    return (
+        f"{i:>6}  {_fit(track['name'], 36)}  {_fit(artists_names, 26)}  "
+        f"{format_duration(track['duration_ms']):>6}  {track['popularity']:>3}"
+    )
+
+
+def _format_saved_track(i, item):
+    """
+    Formatta un brano salvato nel formato esteso (più righe)
+    """
+    track = item['track']
+    added_at = item['added_at'][:10]  # Solo la data
+    artists_names = ', '.join([artist['name'] for artist in track['artists']])
+    
+    return (
+        f"{i}. {track['name']}\n"
+        f"   Artista: {artists_names}\n"
+        f"   Album: {track['album']['name']}\n"
+        f"   Durata: {format_duration(track['duration_ms'])}\n"
+        f"   Aggiunto il: {added_at}\n"
+        f"   Popolarità: {track['popularity']}/100\n"
+        f"   URL: {track['external_urls']['spotify']}\n"
+    )
+
+
+def _format_saved_track_row(i, item):
+    """
+    Formatta un brano salvato come riga della tabella compatta
+    """
+    track = item['track']
+    artists_names = ', '.join([artist['name'] for artist in track['artists']])
+    
+    return (
+        f"{i:>6}  {_fit(track['name'], 36)}  {_fit(artists_names, 26)}  "
+        f"{format_duration(track['duration_ms']):>6}  {item['added_at'][:10]}"
+    )
+
+
+def _format_playlist(i, playlist):
+    """
+    Formatta una playlist nel formato esteso (più righe)
+    """
+    owner = playlist['owner']['display_name']
+    tracks_total = playlist['tracks']['total']
+    visibility = "Pubblica" if playlist['public'] else "Privata"
+    
+    lines = [
+        f"{i}. {playlist['name']}",
+        f"   Creata da: {owner}",
+        f"   Brani: {tracks_total}",
+        f"   Visibilità: {visibility}"
+    ]
+    
+    if playlist.get('description'):
+        lines.append(f"   Descrizione: {playlist['description']}")
+    
+    lines.append(f"   URL: {playlist['external_urls']['spotify']}")
+    
+    return '\n'.join(lines) + '\n'
+
+
+def _format_playlist_row(i, playlist):
+    """
+    Formatta una playlist come riga della tabella compatta
+    """
+    visibility = "Pubblica" if playlist['public'] else "Privata"
+    
+    return (
+        f"{i:>6}  {_fit(playlist['name'], 40)}  {_fit(playlist['owner']['display_name'] or '', 20)}  "
+        f"{playlist['tracks']['total']:>6}  {visibility}"
+    )
+
+
+def _format_album(i, album):
+    """
+    Formatta un album nel formato esteso (più righe)
+    """
+    artists_names = ', '.join([artist['name'] for artist in album['artists']])
+    
+    return (
+        f"{i}. {album['name']}\n"
+        f"   Artista: {artists_names}\n"
+        f"   Uscita: {album.get('release_date', 'N/A')} ({album.get('total_tracks', '?')} brani)\n"
+        f"   URL: {album['external_urls']['spotify']}\n"
+    )
+
+
+def _format_album_row(i, album):
+    """
+    Formatta un album come riga della tabella compatta
+    """
+    artists_names = ', '.join([artist['name'] for artist in album['artists']])
+    
+    return (
+        f"{i:>6}  {_fit(album['name'], 36)}  {_fit(artists_names, 26)}  "
+        f"{album.get('release_date', '')[:4]:>4}  {album.get('total_tracks', ''):>5}"
+    )
+
+
+def _fit(text, width):
+    """
+    Tronca o allinea un testo a una larghezza fissa
+    """
+    if len(text) > width:
+        return text[:width - 1] + '…'
+    return text.ljust(width)
+
+
+def render_items(items, formatter, header, compact_header=None, compact=False,
+                 page_size=None, batch_size=500, out=None):
+    """
+    Visualizza una lista di elementi scrivendo sul terminale a blocchi
+    
+    Invece di una print() per riga, gli elementi vengono formattati a lotti
+    in un unico buffer e scritti con una sola operazione per lotto.
+    In modalità pager viene formattata solo la pagina visibile.
+    
+    Args:
+        items: Lista di elementi da visualizzare
+        formatter: Coppia (formato esteso, formato compatto) di funzioni (i, item) -> str
+        header: Intestazione da mostrare prima della lista
+        compact_header: Intestazione delle colonne della tabella compatta
+        compact: Se True, mostra una riga per elemento
+        page_size: Numero di elementi per pagina (None = nessuna paginazione)
+        batch_size: Numero di elementi formattati per ogni scrittura
+        out: Stream di output (default sys.stdout)
+    """
+    out = out or sys.stdout
+    format_item = formatter[1] if compact else formatter[0]
+    
+    out.write(header)
+    if compact and compact_header:
+        out.write(compact_header + '\n' + '-' * len(compact_header) + '\n')
+    
+    step = page_size or batch_size
+    total = len(items)
+    
+    for start in range(0, total, step):
+        chunk = items[start:start + step]
+        out.write(''.join(
+            format_item(i, item) + '\n' for i, item in enumerate(chunk, start + 1)
+        ))
+        out.flush()
+        
+        if page_size and start + step < total:
+            shown = min(start + step, total)
+            answer = input(f"-- {shown}/{total} -- Invio per continuare, 'q' per uscire: ")
+            if answer.strip().lower() == 'q':
+                break
+
+
+def display_tracks(tracks, compact=False, page_size=None):
     """
     Visualizza le informazioni delle canzoni in modo formattato
     
     Args:
         tracks: Lista di canzoni da visualizzare
+        compact: Se True, mostra una riga per canzone
+        page_size: Numero di canzoni per pagina (None = tutte insieme)
     """
     if not tracks:
         print("Nessuna canzone trovata.")
         return
     
-    print(f"\n{'='*70}")
-    print(f"Trovate {len(tracks)} canzoni:")
-    print(f"{'='*70}\n")
+    header = (
+        f"\n{'='*70}\n"
+        f"Trovate {len(tracks)} canzoni:\n"
+        f"{'='*70}\n\n"
+    )
+    compact_header = f"{'#':>6}  {'Titolo':<36}  {'Artista':<26}  {'Durata':>6}  {'Pop':>3}"
     
-    for i, track in enumerate(tracks, 1):
-        artists_names = ', '.join([artist['name'] for artist in track['artists']])
-        duration_min = track['duration_ms'] // 60000
-        duration_sec = (track['duration_ms'] % 60000) // 1000
-        
-        print(f"{i}. {track['name']}")
-        print(f"   Artista: {artists_names}")
-        print(f"   Album: {track['album']['name']}")
-        print(f"   Durata: {duration_min}:{duration_sec:02d}")
-        print(f"   Popolarità: {track['popularity']}/100")
-        print(f"   Spotify URL: {track['external_urls']['spotify']}")
-        print()
+    render_items(tracks, (_format_track, _format_track_row), header,
+                 compact_header, compact, page_size)
 
 
-def display_saved_tracks(saved_tracks_items):
+def display_saved_tracks(saved_tracks_items, compact=False, page_size=None):
     """
     Visualizza i brani salvati (preferiti)
     
     Args:
         saved_tracks_items: Lista di items dai brani salvati
+        compact: Se True, mostra una riga per brano
+        page_size: Numero di brani per pagina (None = tutti insieme)
     """
     if not saved_tracks_items:
         print("Nessun brano salvato trovato.")
         return
     
-    print(f"\n{'='*80}")
-    print(f"I TUOI BRANI PREFERITI ({len(saved_tracks_items)} brani)")
-    print(f"{'='*80}\n")
+    header = (
+        f"\n{'='*80}\n"
+        f"I TUOI BRANI PREFERITI ({len(saved_tracks_items)} brani)\n"
+        f"{'='*80}\n\n"
+    )
+    compact_header = f"{'#':>6}  {'Titolo':<36}  {'Artista':<26}  {'Durata':>6}  Aggiunto"
     
-    for i, item in enumerate(saved_tracks_items, 1):
-        track = item['track']
-        added_at = item['added_at'][:10]  # Solo la data
-        
-        artists_names = ', '.join([artist['name'] for artist in track['artists']])
-        duration_min = track['duration_ms'] // 60000
-        duration_sec = (track['duration_ms'] % 60000) // 1000
-        
-        print(f"{i}. {track['name']}")
-        print(f"   Artista: {artists_names}")
-        print(f"   Album: {track['album']['name']}")
-        print(f"   Durata: {duration_min}:{duration_sec:02d}")
-        print(f"   Aggiunto il: {added_at}")
-        print(f"   Popolarità: {track['popularity']}/100")
-        print(f"   URL: {track['external_urls']['spotify']}")
-        print()
+    render_items(saved_tracks_items, (_format_saved_track, _format_saved_track_row), header,
+                 compact_header, compact, page_size)
 
 
 def display_top_items(items, item_type='tracks'):
@@ -160,33 +320,137 @@ def format_duration(duration_ms):
     seconds = (duration_ms % 60000) // 1000
     return f"{minutes}:{seconds:02d}"
 
-def display_playlists(playlists):
+def display_playlists(playlists, compact=False, page_size=None):
     """
     Visualizza le playlist dell'utente
     
     Args:
         playlists: Lista di playlist
+        compact: Se True, mostra una riga per playlist
+        page_size: Numero di playlist per pagina (None = tutte insieme)
     """
     if not playlists:
         print("Nessuna playlist trovata.")
         return
     
+    header = (
+        f"\n{'='*80}\n"
+        f"LE TUE PLAYLIST ({len(playlists)})\n"
+        f"{'='*80}\n\n"
+    )
+    compact_header = f"{'#':>6}  {'Nome':<40}  {'Creata da':<20}  {'Brani':>6}  Visibilità"
+    
+    render_items(playlists, (_format_playlist, _format_playlist_row), header,
+                 compact_header, compact, page_size)
+
+
+def display_albums(albums, compact=False, page_size=None):
+    """
+    Visualizza una lista di album
+    
+    Args:
+        albums: Lista di album
+        compact: Se True, mostra una riga per album
+        page_size: Numero di album per pagina (None = tutti insieme)
+    """
+    if not albums:
+        print("Nessun album trovato.")
+        return
+    
+    header = (
+        f"\n{'='*80}\n"
+        f"Trovati {len(albums)} album:\n"
+        f"{'='*80}\n\n"
+    )
+    compact_header = f"{'#':>6}  {'Titolo':<36}  {'Artista':<26}  {'Anno':>4}  {'Brani':>5}"
+    
+    render_items(albums, (_format_album, _format_album_row), header,
+                 compact_header, compact, page_size)
+
+
+def display_library_summary(summary):
+    """
+    Visualizza le statistiche della libreria calcolate da analytics.summarize_library
+    
+    Args:
+        summary: Dizionario restituito da summarize_library
+    """
+    if not summary.get('total_tracks'):
+        print("Nessun brano da analizzare.")
+        return
+    
+    total_hours = summary['total_duration_ms'] / 3600000
+    
     print(f"\n{'='*80}")
-    print(f"LE TUE PLAYLIST ({len(playlists)})")
+    print(f"ANALISI DELLA LIBRERIA ({format_number(summary['total_tracks'])} brani, {total_hours:.1f} ore)")
     print(f"{'='*80}\n")
     
-    for i, playlist in enumerate(playlists, 1):
-        owner = playlist['owner']['display_name']
-        tracks_total = playlist['tracks']['total']
-        visibility = "Pubblica" if playlist['public'] else "Privata"
-        
-        print(f"{i}. {playlist['name']}")
-        print(f"   Creata da: {owner}")
-        print(f"   Brani: {tracks_total}")
-        print(f"   Visibilità: {visibility}")
-        
-        if playlist.get('description'):
-            print(f"   Descrizione: {playlist['description']}")
-        
-        print(f"   URL: {playlist['external_urls']['spotify']}")
-        print()
\ No newline at end of file
+    print("🎨 Generi:")
+    for genre in summary['genres']:
+        print(f"   {genre['genre']}: {genre['count']} brani ({genre['duration_ms'] / 3600000:.1f} ore)")
+    
+    print("\n🎤 Top artisti:")
+    for i, (name, count) in enumerate(summary['top_artists'], 1):
+        print(f"   {i}. {name} ({count} brani)")
+    
+    popularity = summary['popularity']
+    percentiles = popularity['percentiles']
+    print("\n📈 Popolarità:")
+    print(f"   Media: {popularity['mean']:.1f}/100")
+    print(f"   Mediana: {percentiles[50]:.0f} (25°: {percentiles[25]:.0f}, 75°: {percentiles[75]:.0f}, 90°: {percentiles[90]:.0f})")
+    for i, count in enumerate(popularity['histogram']):
+        print(f"   {i*10:3d}-{i*10+9:3d}: {count}")
+    
+    years = summary['release_years']
+    if years['min'] is not None:
+        print(f"\n📅 Anni di uscita: {years['min']}-{years['max']} (mediana {years['median']:.0f})")
+    
+    print("\n➕ Brani aggiunti per mese (ultimi 12):")
+    for month, count in summary['added_per_month'][-12:]:
+        print(f"   {month}: {count}")
+
+
+def display_cost_plan(plan):
+    """
+    Visualizza la stima dei costi calcolata da cost_planner
+    
+    Args:
+        plan: Dizionario restituito da plan_saved_tracks_playlist o plan_genre_playlists
+    """
+    minutes, seconds = divmod(int(round(plan['estimated_seconds'])), 60)
+    
+    print(f"\n{'='*80}")
+    print(f"STIMA DEI COSTI (DRY-RUN): {plan['operation']}")
+    print(f"{'='*80}\n")
+    
+    print(f"📚 Brani salvati: {format_number(plan['library_size'])}")
+    
+    if plan.get('genres'):
+        print("\n🎨 Playlist previste:")
+        for genre, count in plan['genres'].items():
+            print(f"   {genre}: ~{format_number(count)} brani")
+    
+    if plan.get('distinct_artists') is not None:
+        print(f"\n🎤 Artisti distinti stimati: ~{format_number(plan['distinct_artists'])} "
+              f"({plan['artist_miss_rate'] * 100:.0f}% da scaricare)")
+    
+    if plan.get('cache_hit_rate') is not None:
+        print(f"   Hit rate della cache artisti finora: {plan['cache_hit_rate'] * 100:.1f}%")
+    
+    print("\n🌐 Richieste previste per endpoint:")
+    for endpoint, count in plan['requests'].items():
+        print(f"   {endpoint:<32} {format_number(count):>8}")
+    print(f"   {'Totale':<32} {format_number(plan['total_requests']):>8} "
+          f"(di cui {format_number(plan['write_requests'])} in scrittura)")
+    
+    print(f"\n✍️  Scritture: {plan['playlists']} playlist, ~{format_number(plan['tracks_written'])} brani")
+    print(f"⏱️  Tempo stimato: ~{minutes} min {seconds} s "
+          f"(budget {plan['requests_per_second']:g} richieste/s, latenza media {plan['latency'] * 1000:.0f} ms)")
+    print(f"🔎 Richieste usate per la stima: {plan['planning_requests']}")
+    
+    if plan['existing_playlists']:
+        print(f"\n⚠️  Esistono già playlist con lo stesso nome (verrebbero duplicate):")
+        for name in plan['existing_playlists']:
+            print(f"   • {name}")
+    
+    print(f"\n💡 Nessuna modifica è stata fatta al tuo account.")